@@ -0,0 +1,183 @@
+from datetime import date, time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from bookings_app.models import Booking, Table, TimeSlot
+from menu_app.models import Category, Combo, Product
+
+User = get_user_model()
+
+
+class MenuApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name="Pastas", description="Caseras")
+        self.inactive = Category.objects.create(name="Viejas", description="-", isActive=False)
+        self.products = [
+            Product.objects.create(
+                name=f"Producto {i}", description="desc", price=100 + i, quantity=10, category=self.category
+            )
+            for i in range(5)
+        ]
+        Product.objects.create(name="Oculto", description="desc", price=10, quantity=1, category=self.inactive)
+        self.combo = Combo.objects.create(name="Combo", description="desc", price=300)
+        self.combo.products.set(self.products[:2])
+        Combo.objects.filter(pk=self.combo.pk).update(price=300)  # distinto del promedio de sus productos
+
+    def test_lista_productos_de_categorias_activas(self):
+        """Test que verifica que solo se listan productos de categorías activas"""
+        response = self.client.get(reverse('api_app:products'))
+        self.assertEqual(response.status_code, 200)
+        names = [p['name'] for p in response.json()['results']]
+        self.assertEqual(names, [p.name for p in self.products])
+
+    def test_seleccion_de_campos(self):
+        """Test que verifica que ?fields devuelve solo los campos pedidos"""
+        response = self.client.get(reverse('api_app:products'), {'fields': 'id,price'})
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'price'})
+
+    def test_campo_desconocido(self):
+        """Test que verifica que un campo desconocido devuelve 400"""
+        response = self.client.get(reverse('api_app:products'), {'fields': 'id,secreto'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()['success'])
+
+    def test_paginacion_por_cursor(self):
+        """Test que verifica que el cursor recorre todos los productos sin repetir"""
+        url = reverse('api_app:products')
+        data = self.client.get(url, {'limit': 2, 'fields': 'id'}).json()
+        ids = [p['id'] for p in data['results']]
+        while data['next_cursor']:
+            data = self.client.get(url, {'limit': 2, 'fields': 'id', 'cursor': data['next_cursor']}).json()
+            ids += [p['id'] for p in data['results']]
+        self.assertEqual(ids, [p.id for p in self.products])
+
+    def test_cursor_invalido(self):
+        """Test que verifica que un cursor inválido devuelve 400"""
+        response = self.client.get(reverse('api_app:products'), {'cursor': 'basura'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_combos_con_productos(self):
+        """Test que verifica que los combos incluyen los ids de sus productos"""
+        response = self.client.get(reverse('api_app:combos'), {'fields': 'id,products'})
+        self.assertEqual(response.json()['results'], [
+            {'id': self.combo.id, 'products': [self.products[0].id, self.products[1].id]}
+        ])
+
+    def test_orden_por_precio_efectivo(self):
+        """Test que verifica el orden por precio con descuento, recorriendo con cursor"""
+        self.products[4].setDiscount(50)  # 104 -> 52
+        url = reverse('api_app:products')
+        data = self.client.get(url, {'limit': 2, 'fields': 'id,discounted_price', 'sort': 'price'}).json()
+        results = data['results']
+        while data['next_cursor']:
+            data = self.client.get(url, {
+                'limit': 2, 'fields': 'id,discounted_price', 'sort': 'price', 'cursor': data['next_cursor']
+            }).json()
+            results += data['results']
+
+        self.assertEqual([p['id'] for p in results], [self.products[i].id for i in (4, 0, 1, 2, 3)])
+        self.assertEqual(results[0]['discounted_price'], '52.00')
+
+        desc = self.client.get(url, {'fields': 'id', 'sort': '-price'}).json()['results']
+        self.assertEqual([p['id'] for p in desc], [self.products[i].id for i in (3, 2, 1, 0, 4)])
+
+    def test_filtro_por_rango_de_precio(self):
+        """Test que verifica el filtro por precio efectivo"""
+        response = self.client.get(reverse('api_app:products'), {'fields': 'id', 'min_price': '101', 'max_price': '103'})
+        self.assertEqual([p['id'] for p in response.json()['results']], [p.id for p in self.products[1:4]])
+
+        response = self.client.get(reverse('api_app:combos'), {'fields': 'id', 'max_price': '299.99'})
+        self.assertEqual(response.json()['results'], [])
+
+    def test_orden_y_precio_invalidos(self):
+        """Test que verifica que un orden o un precio inválido devuelve 400"""
+        for params in ({'sort': 'name'}, {'min_price': 'barato'}, {'max_price': 'NaN'}):
+            with self.subTest(params):
+                self.assertEqual(self.client.get(reverse('api_app:products'), params).status_code, 400)
+
+    def test_304_sin_consultas(self):
+        """Test que verifica que un GET condicional sin cambios responde 304 sin tocar la base"""
+        url = reverse('api_app:products')
+        response = self.client.get(url)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_cambia_con_los_datos(self):
+        """Test que verifica que modificar un producto invalida el ETag"""
+        url = reverse('api_app:products')
+        etag = self.client.get(url)['ETag']
+
+        self.products[0].price = 999
+        self.products[0].save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depende_de_los_parametros(self):
+        """Test que verifica que distintos parámetros producen distintos ETag"""
+        url = reverse('api_app:products')
+        self.assertNotEqual(
+            self.client.get(url, {'fields': 'id'})['ETag'],
+            self.client.get(url, {'fields': 'name'})['ETag'],
+        )
+
+
+class AvailabilityApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="cliente", password="pass")
+        self.slot = TimeSlot.objects.create(name="Noche", start_time=time(20, 0), end_time=time(22, 0))
+        self.table1 = Table.objects.create(capacity=4, number=1)
+        self.table2 = Table.objects.create(capacity=2, number=2)
+        self.fecha = date(2030, 1, 15)
+
+    def get_availability(self, **extra):
+        return self.client.get(
+            reverse('api_app:availability'),
+            {'date': self.fecha.isoformat(), 'time_slot': self.slot.id},
+            **extra
+        )
+
+    def test_franjas_horarias(self):
+        """Test que verifica el listado de franjas horarias"""
+        response = self.client.get(reverse('api_app:time_slots'))
+        self.assertEqual(response.json()['results'][0]['start_time'], '20:00:00')
+
+    def test_mesas_libres(self):
+        """Test que verifica que las mesas reservadas no figuran como disponibles"""
+        self.assertEqual(len(self.get_availability().json()['results']), 2)
+
+        booking = Booking.objects.create(
+            code="RES-1", date=self.fecha, time_slot=self.slot, user=self.user, approved=True
+        )
+        booking.tables.set([self.table1])
+
+        numbers = [t['number'] for t in self.get_availability().json()['results']]
+        self.assertEqual(numbers, [2])
+
+    def test_reserva_invalida_el_etag(self):
+        """Test que verifica que asignar mesas a una reserva invalida el ETag de disponibilidad"""
+        etag = self.get_availability()['ETag']
+        booking = Booking.objects.create(
+            code="RES-2", date=self.fecha, time_slot=self.slot, user=self.user, approved=True
+        )
+        self.assertEqual(self.get_availability(HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.get_availability()['ETag']
+        booking.tables.add(self.table2)
+        self.assertEqual(self.get_availability(HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_parametros_invalidos(self):
+        """Test que verifica que una fecha o franja inválida devuelve 400"""
+        url = reverse('api_app:availability')
+        self.assertEqual(self.client.get(url, {'date': 'ayer', 'time_slot': self.slot.id}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'date': '2030-01-15'}).status_code, 400)
@@ -0,0 +1,18 @@
+from django.urls import path
+from api_app.views import (
+    CategoryListView,
+    ProductListView,
+    ComboListView,
+    TimeSlotListView,
+    TableAvailabilityView,
+)
+
+app_name = 'api_app'
+
+urlpatterns = [
+    path("categories/", CategoryListView.as_view(), name="categories"),
+    path("products/", ProductListView.as_view(), name="products"),
+    path("combos/", ComboListView.as_view(), name="combos"),
+    path("time-slots/", TimeSlotListView.as_view(), name="time_slots"),
+    path("availability/", TableAvailabilityView.as_view(), name="availability"),
+]
@@ -0,0 +1,244 @@
+import hashlib
+from datetime import date, datetime, timezone
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Prefetch
+from django.http import JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views import View
+from django.views.decorators.http import condition
+
+from bookings_app.models import Table, TimeSlot
+from bookings_app.utils import AVAILABILITY_VERSION_KEY
+from menu_app.models import Category, Combo, Product
+from menu_app.utils.menu_cache import MENU_VERSION_KEY
+from menu_app.utils.pagination import InvalidCursor, KeysetPaginator
+from menu_app.utils.promotions import apply_due_promotions
+from menu_app.utils.versions import get_version, get_version_modified
+
+
+class ApiError(Exception):
+    pass
+
+
+class VersionedListView(View):
+    """Listado JSON de solo lectura, paginado por cursor y con GET condicional.
+
+    El ETag sale de la versión de los datos (``version_key``) y de los parámetros
+    del request, así que un cliente que repite la consulta sin que nada haya
+    cambiado recibe un 304 sin que se toque la base de datos.
+
+    ``fields`` mapea cada campo público a las columnas que necesita (para ``only()``)
+    y a la función que lo obtiene del objeto. ``?fields=a,b`` elige un subconjunto.
+    ``queryset`` es el listado base, como en las vistas genéricas de Django.
+    """
+    version_key = None
+    queryset = None
+    fields = {}
+    default_fields = None
+    ordering = ('id',)
+    orderings = {}  # valores admitidos de ?sort= y su ordering (que debe terminar en la pk)
+    page_size = 50
+    max_page_size = 200
+
+    def dispatch(self, request, *args, **kwargs):
+        view = condition(etag_func=self.get_etag, last_modified_func=self.get_last_modified)(super().dispatch)
+        response = view(request, *args, **kwargs)
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    def get_etag(self, request, *args, **kwargs):
+        version = get_version(self.version_key)
+        params = sorted(request.GET.lists())
+        raw = f'{type(self).__name__}:{version}:{params}'
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def get_last_modified(self, request, *args, **kwargs):
+        return datetime.fromtimestamp(get_version_modified(self.version_key), tz=timezone.utc)
+
+    def get_requested_fields(self):
+        raw = self.request.GET.get('fields')
+        if not raw:
+            return list(self.default_fields or self.fields)
+        requested = [name.strip() for name in raw.split(',') if name.strip()]
+        unknown = [name for name in requested if name not in self.fields]
+        if unknown:
+            raise ApiError(f"Campos desconocidos: {', '.join(unknown)}.")
+        return requested
+
+    def get_ordering(self):
+        sort = self.request.GET.get('sort')
+        if not sort:
+            return self.ordering
+        if sort not in self.orderings:
+            raise ApiError(f"Orden desconocido: {sort}.")
+        return self.orderings[sort]
+
+    def get_page_size(self):
+        try:
+            limit = int(self.request.GET.get('limit', self.page_size))
+        except ValueError:
+            raise ApiError("El parámetro limit debe ser un número.")
+        return max(1, min(limit, self.max_page_size))
+
+    def get_queryset(self, fields):
+        return self.queryset.all()
+
+    def get_only(self, fields, ordering):
+        columns = {name.lstrip('-') for name in ordering}
+        for name in fields:
+            columns.update(self.fields[name][0])
+        return columns
+
+    def serialize(self, obj, fields):
+        return {name: self.fields[name][1](obj) for name in fields}
+
+    def get_extra_data(self):
+        return {}
+
+    def get(self, request, *args, **kwargs):
+        try:
+            fields = self.get_requested_fields()
+            ordering = self.get_ordering()
+            queryset = self.get_queryset(fields).only(*self.get_only(fields, ordering))
+            paginator = KeysetPaginator(queryset, ordering, self.get_page_size())
+            items, next_cursor = paginator.get_page(request.GET.get('cursor'))
+        except (ApiError, InvalidCursor) as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+        return JsonResponse({
+            **self.get_extra_data(),
+            "results": [self.serialize(obj, fields) for obj in items],
+            "next_cursor": next_cursor,
+        })
+
+
+class MenuVersionedListView(VersionedListView):
+    version_key = MENU_VERSION_KEY
+
+    def dispatch(self, request, *args, **kwargs):
+        # Antes de calcular ETag y Last-Modified, aplica las promociones programadas que ya correspondan
+        apply_due_promotions()
+        return super().dispatch(request, *args, **kwargs)
+
+
+class EffectivePriceMixin:
+    """Filtro ``?min_price=``/``?max_price=`` y orden ``?sort=price|-price`` por el precio efectivo (indexado)."""
+    orderings = {
+        'price': ('effective_price', 'id'),
+        '-price': ('-effective_price', '-id'),
+    }
+
+    def filter_price_range(self, queryset):
+        for param, lookup in (('min_price', 'gte'), ('max_price', 'lte')):
+            raw = self.request.GET.get(param)
+            if not raw:
+                continue
+            try:
+                value = Decimal(raw)
+            except InvalidOperation:
+                value = None
+            if value is None or not value.is_finite():
+                raise ApiError(f"El parámetro {param} debe ser un número.")
+            queryset = queryset.filter(**{f'effective_price__{lookup}': value})
+        return queryset
+
+
+def image_url(obj):
+    return obj.image.url if obj.image else None
+
+
+class CategoryListView(MenuVersionedListView):
+    fields = {
+        'id': (('id',), lambda c: c.id),
+        'name': (('name',), lambda c: c.name),
+        'description': (('description',), lambda c: c.description),
+    }
+    queryset = Category.objects.filter(isActive=True)
+
+
+class ProductListView(EffectivePriceMixin, MenuVersionedListView):
+    fields = {
+        'id': (('id',), lambda p: p.id),
+        'name': (('name',), lambda p: p.name),
+        'description': (('description',), lambda p: p.description),
+        'category': (('category_id',), lambda p: p.category_id),
+        'price': (('price',), lambda p: p.price),
+        'discounted_price': (('effective_price',), lambda p: p.effective_price),
+        'on_promotion': (('on_promotion',), lambda p: p.on_promotion),
+        'discount_percentage': (('dicount_percentage',), lambda p: p.dicount_percentage),
+        'is_available': (('is_available',), lambda p: p.is_available),
+        'average_rating': (('avarage_rating',), lambda p: p.average_rating),
+        'rating_count': (('rating_count',), lambda p: p.rating_count),
+        'image': (('image',), image_url),
+    }
+    queryset = Product.objects.filter(category__isActive=True)
+
+    def get_queryset(self, fields):
+        queryset = super().get_queryset(fields)
+        category = self.request.GET.get('category')
+        if category:
+            if not category.isdigit():
+                raise ApiError("El parámetro category debe ser un id.")
+            queryset = queryset.filter(category_id=category)
+        return self.filter_price_range(queryset)
+
+
+class ComboListView(EffectivePriceMixin, MenuVersionedListView):
+    fields = {
+        'id': (('id',), lambda c: c.id),
+        'name': (('name',), lambda c: c.name),
+        'description': (('description',), lambda c: c.description),
+        'price': (('price',), lambda c: c.price),
+        'discounted_price': (('effective_price',), lambda c: c.effective_price),
+        'on_promotion': (('on_promotion',), lambda c: c.on_promotion),
+        'discount_percentage': (('dicount_percentage',), lambda c: c.dicount_percentage),
+        'average_rating': (('avarage_rating',), lambda c: c.average_rating),
+        'rating_count': (('rating_count',), lambda c: c.rating_count),
+        'products': ((), lambda c: [p.id for p in c.products.all()]),
+    }
+    queryset = Combo.objects.filter(is_active=True)
+
+    def get_queryset(self, fields):
+        queryset = self.filter_price_range(super().get_queryset(fields))
+        if 'products' in fields:
+            queryset = queryset.prefetch_related(
+                Prefetch('products', queryset=Product.objects.only('id').order_by('id'))
+            )
+        return queryset
+
+
+class TimeSlotListView(VersionedListView):
+    version_key = AVAILABILITY_VERSION_KEY
+    fields = {
+        'id': (('id',), lambda t: t.id),
+        'name': (('name',), lambda t: t.name),
+        'start_time': (('start_time',), lambda t: t.start_time),
+        'end_time': (('end_time',), lambda t: t.end_time),
+    }
+    queryset = TimeSlot.objects.all()
+
+
+class TableAvailabilityView(VersionedListView):
+    """Mesas libres para ``?date=AAAA-MM-DD&time_slot=<id>``."""
+    version_key = AVAILABILITY_VERSION_KEY
+    fields = {
+        'id': (('id',), lambda t: t.id),
+        'number': (('number',), lambda t: t.number),
+        'capacity': (('capacity',), lambda t: t.capacity),
+        'description': (('description',), lambda t: t.description),
+    }
+
+    def get_queryset(self, fields):
+        try:
+            self.date = date.fromisoformat(self.request.GET.get('date', ''))
+        except ValueError:
+            raise ApiError("El parámetro date debe tener el formato AAAA-MM-DD.")
+        time_slot = self.request.GET.get('time_slot', '')
+        if not time_slot.isdigit():
+            raise ApiError("El parámetro time_slot debe ser un id.")
+        self.time_slot_id = int(time_slot)
+        return Table.objects.disponibles_para_fecha_y_timeslot(self.date, self.time_slot_id)
+
+    def get_extra_data(self):
+        return {"date": self.date, "time_slot": self.time_slot_id}
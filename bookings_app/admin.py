@@ -3,7 +3,6 @@ from bookings_app.models import Table, TimeSlot, Booking
 from bookings_app.forms import TableAdminForm, TimeSlotAdminForm, BookingAdminForm
 from django.utils import timezone
 from django.http import HttpResponseRedirect
-from django.db.models import Q
 from django.urls import reverse
 from django.utils.html import format_html
 from django.shortcuts import redirect
@@ -22,19 +21,11 @@ class TableAdmin(admin.ModelAdmin):
         return actions
     
     def eliminar_mesas_controladas(self, request, queryset):
-        local_now = timezone.localtime()
-        hoy = local_now.date()
-        hora_actual = local_now.time()
         bloqueadas = []
         permitidas_ids = []
 
         for mesa in queryset:
-            reservas_activas = Booking.objects.filter(
-                approved=True,
-                tables=mesa,
-            ).filter(
-                Q(date__gt=hoy) | Q(date=hoy, time_slot__start_time__gt=hora_actual)
-            )
+            reservas_activas = Booking.objects.activas_con_mesa(mesa)
 
             if reservas_activas.exists():
                 bloqueadas.append(mesa.number)
@@ -72,16 +63,7 @@ class TableAdmin(admin.ModelAdmin):
     
     def change_view(self, request, object_id, form_url='', extra_context=None):
         obj = self.get_object(request, object_id)
-        local_now = timezone.localtime()
-        hoy = local_now.date()
-        hora_actual = local_now.time()
-
-        reservas_activas = Booking.objects.filter(
-            approved=True,
-            tables=obj,
-        ).filter(
-            Q(date__gt=hoy) | Q(date=hoy, time_slot__start_time__gt=hora_actual)
-        )
+        reservas_activas = Booking.objects.activas_con_mesa(obj)
 
         if reservas_activas.exists():
             messages.error(
@@ -107,17 +89,8 @@ class TableAdmin(admin.ModelAdmin):
             else:
                 obj.number = max_number + 1
 
-        local_now = timezone.localtime()
-        hoy = local_now.date()
-        hora_actual = local_now.time()
-
         if change:
-            reservas_activas = Booking.objects.filter(
-                approved=True,
-                tables=obj,
-            ).filter(
-                Q(date__gt=hoy) | Q(date=hoy, time_slot__start_time__gt=hora_actual)
-            )
+            reservas_activas = Booking.objects.activas_con_mesa(obj)
 
             if reservas_activas.exists():
                 capacidad_vieja = Table.objects.get(pk=obj.pk).capacity
@@ -139,15 +112,7 @@ class TableAdmin(admin.ModelAdmin):
         return super().has_delete_permission(request, obj)
 
     def delete_model(self, request, obj):
-        local_now = timezone.localtime()
-        hoy = local_now.date()
-        hora_actual = local_now.time()
-        reservas_activas = Booking.objects.filter(
-            approved=True,
-            tables=obj,
-        ).filter(
-            Q(date__gt=hoy) | Q(date=hoy, time_slot__start_time__gt=hora_actual)
-        )
+        reservas_activas = Booking.objects.activas_con_mesa(obj)
 
         if reservas_activas.exists():
             messages.error(
@@ -214,17 +179,12 @@ class TimeSlotAdmin(admin.ModelAdmin):
             return campos_controlados
 
         if request.user.groups.filter(name='Administrador').exists() and obj is not None:
-            local_now = timezone.localtime()
-            hoy = local_now.date()
-            hora_actual = local_now.time()
+            ahora = timezone.localtime()
 
             reservas_futuras = obj.tables.filter(
                 booking__approved=True,
                 booking__time_slot=obj
-            ).filter(
-                Q(booking__date__gt=hoy) |
-                Q(booking__date=hoy, booking__time_slot__start_time__gt=hora_actual)
-            ).exists()
+            ).filter(booking__starts_at__gt=ahora).exists()
 
             if reservas_futuras:
                 return campos_controlados
@@ -235,18 +195,13 @@ class TimeSlotAdmin(admin.ModelAdmin):
         obj = self.get_object(request, object_id)
 
         if obj is not None:
-            local_now = timezone.localtime()
-            hoy = local_now.date()
-            hora_actual = local_now.time()
+            ahora = timezone.localtime()
 
             # Filtrar mesas con reservas futuras
             mesas_con_reservas = obj.tables.filter(
                 booking__approved=True,
                 booking__time_slot=obj  # Esto filtra solo reservas en la franja actual
-            ).filter(
-                Q(booking__date__gt=hoy) |
-                Q(booking__date=hoy, booking__time_slot__start_time__gt=hora_actual)
-            ).distinct()
+            ).filter(booking__starts_at__gt=ahora).distinct()
 
             if mesas_con_reservas.exists():
                 nombres_mesas = ", ".join(f"Mesa {mesa.number}" for mesa in mesas_con_reservas)
@@ -281,17 +236,12 @@ class TimeSlotAdmin(admin.ModelAdmin):
         return super().change_view(request, object_id, form_url, extra_context)
     
     def delete_model(self, request, obj):
-        local_now = timezone.localtime()
-        hoy = local_now.date()
-        hora_actual = local_now.time()
+        ahora = timezone.localtime()
 
         reservas_futuras = obj.tables.filter(
             booking__approved=True,
             booking__time_slot=obj
-        ).filter(
-            Q(booking__date__gt=hoy) |
-            Q(booking__date=hoy, booking__time_slot__start_time__gt=hora_actual)
-        ).exists()
+        ).filter(booking__starts_at__gt=ahora).exists()
 
         if reservas_futuras:
             self.message_user(
@@ -311,18 +261,13 @@ class TimeSlotAdmin(admin.ModelAdmin):
         if not request.user.groups.filter(name='Administrador').exists():
             return False
 
-        local_now = timezone.localtime()
-        hoy = local_now.date()
-        hora_actual = local_now.time()
+        ahora = timezone.localtime()
 
         # Verificar si hay reservas futuras en esta franja horaria
         reservas_futuras = obj.tables.filter(
             booking__approved=True,
             booking__time_slot=obj
-        ).filter(
-            Q(booking__date__gt=hoy) |
-            Q(booking__date=hoy, booking__time_slot__start_time__gt=hora_actual)
-        ).exists()
+        ).filter(booking__starts_at__gt=ahora).exists()
 
         # Solo permitir eliminar si NO hay reservas futuras
         return not reservas_futuras
@@ -350,7 +295,7 @@ class PendientesFilter(admin.SimpleListFilter):
             # Si hay cualquier otro filtro activo, no permite combinar
             if request.GET.get('aceptadas') == '1' or request.GET.get('rechazadas') == '1' or request.GET.get('pasadas') == '1':
                 return queryset.none()
-            return queryset.filter(approved=True, approval_date__isnull=True).order_by('date')
+            return queryset.filter(approved=True, approval_date__isnull=True).order_by('starts_at')
         return queryset
 
 
@@ -368,10 +313,8 @@ class AceptadasFilter(admin.SimpleListFilter):
             qs = queryset.filter(approved=True, approval_date__isnull=False)
             if request.GET.get('pasadas') == '1':
                 local_now = timezone.localtime()
-                qs = qs.filter(
-                    Q(date__lt=local_now.date()) | Q(date=local_now.date(), time_slot__start_time__lt=local_now.time())
-                )
-            return qs.order_by('-date')
+                qs = qs.filter(starts_at__lt=local_now)
+            return qs.order_by('-starts_at')
         return queryset
 
 
@@ -389,10 +332,8 @@ class RechazadasFilter(admin.SimpleListFilter):
             qs = queryset.filter(approved=False, approval_date__isnull=False)
             if request.GET.get('pasadas') == '1':
                 local_now = timezone.localtime()
-                qs = qs.filter(
-                    Q(date__lt=local_now.date()) | Q(date=local_now.date(), time_slot__start_time__lt=local_now.time())
-                )
-            return qs.order_by('-date')
+                qs = qs.filter(starts_at__lt=local_now)
+            return qs.order_by('-starts_at')
         return queryset
 
 
@@ -412,19 +353,13 @@ class PasadasFilter(admin.SimpleListFilter):
             if request.GET.get('aceptadas') == '1':
                 return queryset.filter(
                     approved=True, approval_date__isnull=False
-                ).filter(
-                    Q(date__lt=local_now.date()) | Q(date=local_now.date(), time_slot__start_time__lt=local_now.time())
-                ).order_by('-date')
+                ).filter(starts_at__lt=local_now).order_by('-starts_at')
             elif request.GET.get('rechazadas') == '1':
                 return queryset.filter(
                     approved=False, approval_date__isnull=False
-                ).filter(
-                    Q(date__lt=local_now.date()) | Q(date=local_now.date(), time_slot__start_time__lt=local_now.time())
-                ).order_by('-date')
+                ).filter(starts_at__lt=local_now).order_by('-starts_at')
             else:
-                return queryset.filter(
-                    Q(date__lt=local_now.date()) | Q(date=local_now.date(), time_slot__start_time__lt=local_now.time())
-                ).order_by('-date')
+                return queryset.filter(starts_at__lt=local_now).order_by('-starts_at')
         return queryset
 
 
@@ -449,7 +384,7 @@ class BookingAdmin(admin.ModelAdmin):
             next_booking = Booking.objects.filter(
                 approved=True,
                 approval_date__isnull=True
-            ).order_by('date').exclude(pk=obj.pk).first()
+            ).order_by('starts_at').exclude(pk=obj.pk).first()
 
             if next_booking:
                 return redirect(
@@ -467,7 +402,7 @@ class BookingAdmin(admin.ModelAdmin):
             next_booking = Booking.objects.filter(
                 approved=True,
                 approval_date__isnull=True
-            ).order_by('date').exclude(pk=obj.pk).first()
+            ).order_by('starts_at').exclude(pk=obj.pk).first()
 
             if next_booking:
                 return redirect(
@@ -2,7 +2,6 @@ from django import forms
 from bookings_app.models import Table, TimeSlot, Booking
 from django.contrib.admin.widgets import FilteredSelectMultiple
 from django.core.exceptions import ValidationError
-from django.db.models import Q
 from bookings_app.utils import DateTimeUtils
 
 
@@ -59,17 +58,12 @@ class TimeSlotAdminForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
 
         if self.instance.pk:
-            local_now = DateTimeUtils.get_local_datetime()
-            hoy = local_now.date()
-            hora_actual = local_now.time()
+            ahora = DateTimeUtils.get_local_datetime()
 
             # Filtrar mesas con reservas futuras
             mesas_con_reservas = self.instance.tables.filter(
                 booking__approved=True
-            ).filter(
-                Q(booking__date__gt=hoy) |
-                Q(booking__date=hoy, booking__time_slot__start_time__gt=hora_actual)
-            ).distinct()
+            ).filter(booking__starts_at__gt=ahora).distinct()
 
             # Guardar IDs de mesas con reservas futuras
             self.disabled_tables = list(mesas_con_reservas.values_list('id', flat=True))
@@ -115,16 +109,11 @@ class TimeSlotAdminForm(forms.ModelForm):
     
         # Validación de desasignación de mesas con reservas futuras  
         if self.instance.pk and mesas_seleccionadas is not None:
-                local_now = DateTimeUtils.get_local_datetime()
-                hoy = local_now.date()
-                hora_actual = local_now.time()
+                ahora = DateTimeUtils.get_local_datetime()
 
                 mesas_con_reservas = self.instance.tables.filter(
                     booking__approved=True
-                ).filter(
-                    Q(booking__date__gt=hoy) |
-                    Q(booking__date=hoy, booking__time_slot__start_time__gt=hora_actual)
-                ).distinct()
+                ).filter(booking__starts_at__gt=ahora).distinct()
 
                 mesas_asignadas_original = set(self.instance.tables.values_list('id', flat=True))
                 mesas_actuales = set(mesas_seleccionadas.values_list('id', flat=True))
@@ -1,16 +1,24 @@
-from bookings_app.utils import DateTimeUtils
-from bookings_app.models import Booking
+from bookings_app.models import Booking, Table, TimeSlot
+from bookings_app.utils import DateTimeUtils, get_availability_version, get_user_reservations_version
 
+from django.core.cache import cache
+from django.utils.functional import cached_property
+
+import bisect
 import calendar
 from datetime import date
-from django.utils.crypto import get_random_string
+
+MONTH_AVAILABILITY_TIMEOUT = 60 * 60  # las versiones viejas simplemente expiran
+USER_CARDS_TIMEOUT = 60 * 60
+# Por debajo de esta fracción de mesas libres el día se marca como "pocas"
+POCAS_MESAS_RATIO = 0.25
 
 
 class BookingHelpers:
 
     @staticmethod
-    def get_selected_date_from_request(request):
-        today = DateTimeUtils.get_local_datetime()
+    def get_selected_date_from_request(request, today=None):
+        today = today or DateTimeUtils.get_local_datetime()
         year = today.year
         month = int(request.GET.get("month", today.month))
         day = int(request.GET.get("day", today.day))
@@ -28,9 +36,12 @@ class BookingHelpers:
         except (TypeError, ValueError):
             time_slot_id = None
 
-        if time_slot_id and available_timeslots.filter(id=time_slot_id).exists():
-            return available_timeslots.get(id=time_slot_id)
-        return available_timeslots.first()
+        # Se recorre la colección ya evaluada en vez de consultar con exists() + get()
+        available_timeslots = list(available_timeslots)
+        for time_slot in available_timeslots:
+            if time_slot.id == time_slot_id:
+                return time_slot
+        return available_timeslots[0] if available_timeslots else None
 
     @staticmethod
     def get_available_months(today):
@@ -50,8 +61,8 @@ class BookingHelpers:
         return cal.monthdayscalendar(year, month)
 
     @staticmethod
-    def get_availability_status(selected_date, time_slots, available_tables):
-        today = DateTimeUtils.get_local_date()
+    def get_availability_status(selected_date, time_slots, available_tables, today=None):
+        today = today or DateTimeUtils.get_local_date()
 
         if selected_date == today and not time_slots.exists():
             return (
@@ -70,8 +81,159 @@ class BookingHelpers:
         )
 
     @staticmethod
-    def generar_codigo_reserva():
-        while True:
-            codigo = get_random_string(length=9, allowed_chars='ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789')
-            if not Booking.objects.filter(code=codigo).exists():
-                return codigo
\ No newline at end of file
+    def get_month_occupancy(year, month):
+        """Mesas libres y capacidad libre por (día, franja) del mes, sin filtrar por la hora actual.
+
+        Solo depende de los datos, así que se cachea por mes y versión de disponibilidad.
+        """
+        key = f'bookings:availability:month:{get_availability_version()}:{year}:{month}'
+        occupancy = cache.get(key)
+        if occupancy is not None:
+            return occupancy
+
+        ultimo_dia = calendar.monthrange(year, month)[1]
+        franjas, ocupadas = {}, {}
+        for fila in TimeSlot.objects.ocupacion_por_dia(date(year, month, 1), date(year, month, ultimo_dia)):
+            franjas[fila['id']] = (fila['start_time'], fila['mesas_franja'], fila['capacidad_franja'])
+            if fila['ocupadas__date'] is not None:
+                ocupadas[(fila['ocupadas__date'].day, fila['id'])] = (fila['mesas'], fila['capacidad'])
+
+        occupancy = {
+            # (id, hora de inicio, mesas asignadas) de cada franja, por hora de inicio
+            'time_slots': [(slot_id, start_time, mesas) for slot_id, (start_time, mesas, _) in franjas.items()],
+            'days': {
+                dia: {
+                    slot_id: (
+                        mesas - ocupadas.get((dia, slot_id), (0, 0))[0],
+                        capacidad - ocupadas.get((dia, slot_id), (0, 0))[1],
+                    )
+                    for slot_id, (_, mesas, capacidad) in franjas.items()
+                }
+                for dia in range(1, ultimo_dia + 1)
+            },
+        }
+        cache.set(key, occupancy, MONTH_AVAILABILITY_TIMEOUT)
+        return occupancy
+
+    @staticmethod
+    def get_month_availability(year, month, now=None):
+        """Disponibilidad de los días reservables del mes: por franja y el total del día.
+
+        Los días pasados no aparecen y, para hoy, solo las franjas que todavía no empezaron.
+        """
+        occupancy = BookingHelpers.get_month_occupancy(year, month)
+        now = now or DateTimeUtils.get_local_datetime()
+        hoy, ahora = now.date(), now.time()
+        mesas_por_franja = {slot_id: mesas for slot_id, _, mesas in occupancy['time_slots']}
+
+        days = {}
+        for dia, por_franja in occupancy['days'].items():
+            fecha = date(year, month, dia)
+            if fecha < hoy:
+                continue
+            franjas = [
+                {'id': slot_id, 'free_tables': por_franja[slot_id][0], 'free_capacity': por_franja[slot_id][1]}
+                for slot_id, start_time, _ in occupancy['time_slots']
+                if fecha > hoy or start_time > ahora
+            ]
+            if not franjas:
+                continue
+            libres = sum(franja['free_tables'] for franja in franjas)
+            if libres == 0:
+                estado = 'completo'
+            elif libres <= sum(mesas_por_franja[franja['id']] for franja in franjas) * POCAS_MESAS_RATIO:
+                estado = 'pocas'
+            else:
+                estado = 'libre'
+            days[dia] = {
+                'free_tables': libres,
+                'free_capacity': sum(franja['free_capacity'] for franja in franjas),
+                'status': estado,
+                'time_slots': franjas,
+            }
+        return days
+
+    @staticmethod
+    def get_user_time_bucket(user, version, now=None):
+        """Cuántos inicios y finales de reservas del usuario ya pasaron.
+
+        Las cards solo cambian con el tiempo cuando una reserva empieza o termina, así
+        que el bucket junto con la versión del usuario identifica su contenido. Los
+        límites se consultan una vez por versión; después es solo una lectura de cache.
+        """
+        key = f'bookings:user:{user.pk}:bounds:{version}'
+        bounds = cache.get(key)
+        if bounds is None:
+            bounds = sorted(
+                instante.timestamp()
+                for par in Booking.objects.del_usuario(user).filter(starts_at__isnull=False).values_list('starts_at', 'ends_at')
+                for instante in par
+            )
+            cache.set(key, bounds, USER_CARDS_TIMEOUT)
+        now = now or DateTimeUtils.get_local_datetime()
+        return bisect.bisect_right(bounds, now.timestamp())
+
+    @staticmethod
+    def get_next_reservation_etag(user, now=None):
+        """Identifica el contenido de las cards del usuario sin renderizarlas."""
+        version = get_user_reservations_version(user.pk)
+        return f'{user.pk}-{version}-{BookingHelpers.get_user_time_bucket(user, version, now)}'
+
+    @staticmethod
+    def get_reservation_cards(user, names, render):
+        """Fragmentos HTML de las cards ``names`` del usuario, desde el cache si están.
+
+        ``render(faltantes)`` devuelve {nombre: html} para las que no estaban cacheadas.
+        """
+        version = get_user_reservations_version(user.pk)
+        bucket = BookingHelpers.get_user_time_bucket(user, version)
+        keys = {name: f'bookings:user:{user.pk}:card:{name}:{version}:{bucket}' for name in names}
+
+        cached = cache.get_many(list(keys.values()))
+        cards = {name: cached[key] for name, key in keys.items() if key in cached}
+        missing = [name for name in names if name not in cards]
+        if missing:
+            rendered = render(missing)
+            cache.set_many({keys[name]: rendered[name] for name in missing}, USER_CARDS_TIMEOUT)
+            cards.update(rendered)
+        return cards
+
+    @staticmethod
+    def get_calendar_weeks(month_days, availability):
+        """Empareja cada día del calendario con su disponibilidad (None si no se puede reservar)."""
+        return [[(dia, availability.get(dia)) for dia in week] for week in month_days]
+
+
+class ReservationInputs:
+    """Entradas de MakeReservationView calculadas una sola vez por request.
+
+    Todo se calcula con el mismo "ahora" y los querysets se evalúan una vez, así el
+    formulario y el contexto comparten resultados en vez de repetir las consultas.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.now = DateTimeUtils.get_local_datetime()
+
+    @cached_property
+    def selected_date(self):
+        return BookingHelpers.get_selected_date_from_request(self.request, today=self.now)
+
+    @cached_property
+    def time_slots(self):
+        time_slots = TimeSlot.objects.disponibles_para_fecha(self.selected_date, ahora=self.now)
+        len(time_slots)  # evaluarlo ahora deja las filas en el cache del queryset
+        return time_slots
+
+    @cached_property
+    def selected_time_slot(self):
+        return BookingHelpers.get_selected_timeslot_from_request(self.request, self.time_slots)
+
+    @cached_property
+    def available_tables(self):
+        available_tables = Table.objects.disponibles_para_fecha_y_timeslot(
+            self.selected_date,
+            self.selected_time_slot.id if self.selected_time_slot else None
+        )
+        len(available_tables)
+        return available_tables
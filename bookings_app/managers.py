@@ -1,7 +1,8 @@
 from bookings_app.utils import DateTimeUtils
 
 from django.db import models
-from django.db.models import Q, Count
+from django.db.models import Count, Exists, FilteredRelation, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 
 class BookingQuerySet(models.QuerySet):
     def del_usuario(self, user):
@@ -17,34 +18,24 @@ class BookingQuerySet(models.QuerySet):
         return self.filter(approved=False)
 
     def sin_confirmar(self):
-        hoy = DateTimeUtils.get_local_date()
-        ahora = DateTimeUtils.get_local_time()
-        return self.filter(approval_date__isnull=True).filter(
-            Q(date__lt=hoy) | Q(date=hoy, time_slot__start_time__lt=ahora)
-        )
+        ahora = DateTimeUtils.get_local_datetime()
+        return self.filter(approval_date__isnull=True, starts_at__lt=ahora)
 
     def futuras(self):
-        hoy = DateTimeUtils.get_local_date()
-        ahora = DateTimeUtils.get_local_time()
-        return self.aprobadas().filter(
-            Q(date__gt=hoy) | Q(date=hoy, time_slot__start_time__gt=ahora)
-        )
+        ahora = DateTimeUtils.get_local_datetime()
+        return self.aprobadas().filter(starts_at__gt=ahora)
 
     def proxima(self):
-        hoy = DateTimeUtils.get_local_date()
-        ahora = DateTimeUtils.get_local_time()
-        return self.aprobadas().filter(
-            Q(date__gt=hoy) |
-            Q(date=hoy, time_slot__end_time__gte=ahora)
-        ).order_by('date', 'time_slot__start_time')
+        ahora = DateTimeUtils.get_local_datetime()
+        return self.aprobadas().filter(ends_at__gte=ahora).order_by('starts_at')
 
     def historial_aprobadas(self):
-        hoy = DateTimeUtils.get_local_date()
-        ahora = DateTimeUtils.get_local_time()
-        return self.aprobadas().filter(
-            Q(date__lt=hoy) |
-            Q(date=hoy, time_slot__end_time__lt=ahora)
-        ).order_by('-date', '-time_slot__start_time')
+        ahora = DateTimeUtils.get_local_datetime()
+        return self.aprobadas().filter(ends_at__lt=ahora).order_by('-starts_at')
+
+    def activas_con_mesa(self, mesa):
+        """Reservas aprobadas de la mesa que todavía no empezaron."""
+        return self.filter(approved=True, tables=mesa, starts_at__gt=DateTimeUtils.get_local_datetime())
 
     def con_cantidad_pedidos(self):
         return self.annotate(cantidad_pedidos=Count('orders'))
@@ -90,22 +81,89 @@ class BookingManager(models.Manager):
     def pendientes_por_usuario(self, user):
         return self.get_queryset().pendientes_por_usuario(user)
 
+    def activas_con_mesa(self, mesa):
+        return self.get_queryset().activas_con_mesa(mesa)
+
+    def tablero_del_usuario(self, user):
+        """Reservas del usuario repartidas en los grupos de "Mis Reservas".
+
+        Se cargan todas en una consulta (con franja y cantidad de pedidos) y se clasifican
+        en memoria con los mismos criterios que los querysets aprobadas, pendientes, etc.
+        """
+        ahora = DateTimeUtils.get_local_datetime()
+        reservas = list(
+            self.del_usuario(user).select_related('time_slot').prefetch_related('tables')
+            .con_cantidad_pedidos().order_by('starts_at', 'id')
+        )
+
+        aprobadas = [r for r in reservas if r.approved and r.approval_date is not None]
+        vigentes = [r for r in aprobadas if r.ends_at is not None and r.ends_at >= ahora]
+        proxima = vigentes[0] if vigentes else None
+
+        return {
+            'proxima_reserva': proxima,
+            'card_title': proxima.get_card_title(ahora.date(), ahora.time()) if proxima else "Próxima Reserva",
+            'es_reserva_actual': proxima.es_reserva_actual if proxima else False,
+            'cantidad_pedidos_proxima_reserva': proxima.cantidad_pedidos if proxima else 0,
+            'reservas_futuras': [
+                r for r in aprobadas if r.starts_at is not None and r.starts_at > ahora and r is not proxima
+            ],
+            'reservas_pendientes': [r for r in reservas if r.approved and r.approval_date is None],
+            'reservas_historial_aprobadas': [
+                r for r in reversed(aprobadas) if r.ends_at is not None and r.ends_at < ahora
+            ],
+            'reservas_historial_rechazadas': [r for r in reservas if not r.approved],
+            'reservas_sin_confirmar': [
+                r for r in reservas if r.approval_date is None and r.starts_at is not None and r.starts_at < ahora
+            ],
+        }
+
+    def actualizar_horarios_de_franja(self, time_slot):
+        """Recalcula starts_at/ends_at de las reservas de la franja después de cambiar sus horarios."""
+        reservas = list(self.filter(time_slot=time_slot, date__isnull=False).only('id', 'date'))
+        for reserva in reservas:
+            reserva.starts_at = DateTimeUtils.combine(reserva.date, time_slot.start_time)
+            reserva.ends_at = DateTimeUtils.combine(reserva.date, time_slot.end_time)
+        self.bulk_update(reservas, ['starts_at', 'ends_at'], batch_size=500)
+
 
 class TimeSlotQuerySet(models.QuerySet):
-    def disponibles_para_fecha(self, fecha):
+    def disponibles_para_fecha(self, fecha, ahora=None):
+        ahora = ahora or DateTimeUtils.get_local_datetime()
         qs = self.all()
-        if fecha == DateTimeUtils.get_local_date():
-            ahora = DateTimeUtils.get_local_time()
-            qs = qs.filter(start_time__gt=ahora)
+        if fecha == ahora.date():
+            qs = qs.filter(start_time__gt=ahora.time())
         return qs
 
+    def ocupacion_por_dia(self, desde, hasta):
+        """Capacidad de cada franja y lo ocupado por fecha entre dos fechas, en una sola consulta agrupada.
+
+        La capacidad sale de las mesas asignadas a la franja; solo cuentan como ocupadas
+        las ocupaciones de esas mesas. Una fila por (franja, fecha con ocupaciones), o
+        una con fecha None si la franja no tiene ninguna en el rango.
+        """
+        asignadas = self.model.tables.through.objects
+        de_la_franja = asignadas.filter(timeslot=OuterRef('pk')).values('timeslot')
+        mesa_asignada = Q(Exists(asignadas.filter(timeslot=OuterRef('id'), table=OuterRef('ocupadas__table'))))
+        return self.annotate(
+            ocupadas=FilteredRelation('claims', condition=Q(claims__date__range=(desde, hasta))),
+            mesas_franja=Coalesce(Subquery(de_la_franja.annotate(n=Count('*')).values('n')), 0),
+            capacidad_franja=Coalesce(Subquery(de_la_franja.annotate(c=Sum('table__capacity')).values('c')), 0),
+        ).values('id', 'start_time', 'mesas_franja', 'capacidad_franja', 'ocupadas__date').annotate(
+            mesas=Count('ocupadas', filter=mesa_asignada),
+            capacidad=Coalesce(Sum('ocupadas__table__capacity', filter=mesa_asignada), 0),
+        ).order_by('start_time', 'id')
+
 
 class TimeSlotManager(models.Manager):
     def get_queryset(self):
         return TimeSlotQuerySet(self.model, using=self._db)
 
-    def disponibles_para_fecha(self, fecha):
-        return self.get_queryset().disponibles_para_fecha(fecha)
+    def ocupacion_por_dia(self, desde, hasta):
+        return self.get_queryset().ocupacion_por_dia(desde, hasta)
+
+    def disponibles_para_fecha(self, fecha, ahora=None):
+        return self.get_queryset().disponibles_para_fecha(fecha, ahora)
 
 
 class TableQuerySet(models.QuerySet):
@@ -113,19 +171,18 @@ class TableQuerySet(models.QuerySet):
         if time_slot_id is None:
             return self.none()
         else:
-            from bookings_app.models import Booking  # import adentro para evitar circularidad
-            
-            mesas_reservadas_ids = Booking.objects.filter(
-                date=fecha,
-                time_slot_id=time_slot_id,
-                approved=True
-            ).values_list('tables__id', flat=True)
-
             return self.filter(
                 timeslot__id=time_slot_id
-            ).exclude(
-                id__in=mesas_reservadas_ids
-            ).distinct()
+            ).sin_ocupar(fecha, time_slot_id).distinct()
+
+    def sin_ocupar(self, fecha, time_slot_id):
+        # Anti-join contra el índice único (date, time_slot, table) de TableSlotClaim
+        from bookings_app.models import TableSlotClaim  # import adentro para evitar circularidad
+        return self.exclude(Exists(TableSlotClaim.objects.filter(
+            table=OuterRef('pk'),
+            date=fecha,
+            time_slot_id=time_slot_id,
+        )))
         
 
 
@@ -137,11 +194,34 @@ class TableManager(models.Manager):
         if time_slot_id is None:
             return self.none()
         else:
-            from bookings_app.models import Booking
-            mesas_reservadas_ids = Booking.objects.filter(
-                date=fecha,
-                time_slot_id=time_slot_id,
-                approved=True
-            ).values_list('tables__id', flat=True)
-
-            return self.exclude(id__in=mesas_reservadas_ids).distinct()
+            return self.get_queryset().sin_ocupar(fecha, time_slot_id)
+
+
+class TableSlotClaimManager(models.Manager):
+    def sync_for_booking(self, booking):
+        """Deja las ocupaciones de la reserva de acuerdo a su estado, fecha, franja y mesas.
+
+        Solo las reservas no rechazadas ocupan mesas. Si otra reserva ya ocupa alguna
+        mesa, el unique lanza IntegrityError.
+        """
+        if booking.approved and booking.date:
+            desired = set(booking.tables.values_list('id', flat=True))
+        else:
+            desired = set()
+
+        kept, stale = set(), []
+        for claim in self.filter(booking=booking):
+            if (claim.table_id in desired and claim.date == booking.date
+                    and claim.time_slot_id == booking.time_slot_id):
+                kept.add(claim.table_id)
+            else:
+                stale.append(claim.id)
+
+        if stale:
+            self.filter(id__in=stale).delete()
+        missing = desired - kept
+        if missing:
+            self.bulk_create([
+                self.model(date=booking.date, time_slot_id=booking.time_slot_id, table_id=table_id, booking=booking)
+                for table_id in sorted(missing)
+            ])
@@ -0,0 +1,42 @@
+# Generated by Django 5.2 on 2026-10-18 09:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_table_claims(apps, schema_editor):
+    Booking = apps.get_model('bookings_app', 'Booking')
+    TableSlotClaim = apps.get_model('bookings_app', 'TableSlotClaim')
+    through = Booking.tables.through
+    rows = through.objects.filter(
+        booking__approved=True, booking__date__isnull=False
+    ).values_list('booking_id', 'booking__date', 'booking__time_slot_id', 'table_id').order_by('booking_id')
+    # Si ya había mesas reservadas dos veces, la primera reserva se queda con la ocupación
+    TableSlotClaim.objects.bulk_create([
+        TableSlotClaim(booking_id=booking_id, date=date, time_slot_id=time_slot_id, table_id=table_id)
+        for booking_id, date, time_slot_id, table_id in rows
+    ], batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings_app', '0013_remove_booking_approved_by'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableSlotClaim',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='claims', to='bookings_app.booking')),
+                ('table', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='claims', to='bookings_app.table')),
+                ('time_slot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='claims', to='bookings_app.timeslot')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'time_slot', 'table'), name='unique_table_slot_claim')],
+            },
+        ),
+        migrations.RunPython(backfill_table_claims, migrations.RunPython.noop),
+    ]
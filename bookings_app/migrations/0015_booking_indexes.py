@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-18 09:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings_app', '0014_table_slot_claim'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('approval_date__isnull', False), ('approved', True)), fields=['user', 'date'], name='booking_aprob_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('approval_date__isnull', True)), fields=['user', 'date'], name='booking_sinaprob_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('approved', False)), fields=['user', 'date'], name='booking_rech_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('approval_date__isnull', False), ('approved', True)), fields=['date'], name='booking_aprob_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('approval_date__isnull', True)), fields=['date'], name='booking_sinaprob_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('approved', False)), fields=['date'], name='booking_rech_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeslot',
+            index=models.Index(fields=['start_time'], name='timeslot_start_time_idx'),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.2 on 2026-10-18 09:30
+
+from datetime import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_booking_schedule(apps, schema_editor):
+    Booking = apps.get_model('bookings_app', 'Booking')
+    reservas = list(Booking.objects.filter(date__isnull=False).select_related('time_slot'))
+    for reserva in reservas:
+        reserva.starts_at = timezone.make_aware(datetime.combine(reserva.date, reserva.time_slot.start_time))
+        reserva.ends_at = timezone.make_aware(datetime.combine(reserva.date, reserva.time_slot.end_time))
+    Booking.objects.bulk_update(reservas, ['starts_at', 'ends_at'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings_app', '0015_booking_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_aprob_user_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_sinaprob_user_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_rech_user_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_aprob_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_sinaprob_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_rech_date_idx',
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='ends_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='starts_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_booking_schedule, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('approval_date__isnull', False), ('approved', True)), fields=['user', 'starts_at'], name='booking_aprob_user_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('approval_date__isnull', True)), fields=['user', 'starts_at'], name='booking_sinap_user_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('approved', False)), fields=['user', 'starts_at'], name='booking_rech_user_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('approval_date__isnull', False), ('approved', True)), fields=['starts_at'], name='booking_aprob_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('approval_date__isnull', True)), fields=['starts_at'], name='booking_sinap_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('approved', False)), fields=['starts_at'], name='booking_rech_start_idx'),
+        ),
+    ]
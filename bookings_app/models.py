@@ -1,10 +1,20 @@
 from django.db import models
+from django.db.models import Q
 from django.conf import settings
-from bookings_app.managers import BookingManager, TimeSlotManager, TableManager
+from bookings_app.managers import BookingManager, TimeSlotManager, TableManager, TableSlotClaimManager
 from bookings_app.utils import DateTimeUtils
+from restaurante.codes import CodeGenerator, UniqueCodeMixin
 
+# Condiciones de los índices parciales de Booking; coinciden con los filtros de BookingQuerySet
+APROBADAS = Q(approved=True, approval_date__isnull=False)
+SIN_APROBAR = Q(approval_date__isnull=True)
+RECHAZADAS = Q(approved=False)
 
-class Booking(models.Model):
+RESERVATION_CODE_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+booking_codes = CodeGenerator('booking', RESERVATION_CODE_ALPHABET, length=9)
+
+
+class Booking(UniqueCodeMixin, models.Model):
     approved = models.BooleanField(default=False)
     approval_date = models.DateField(null=True, blank=True)
     code = models.CharField(max_length=15, unique=True)
@@ -14,8 +24,52 @@ class Booking(models.Model):
     tables = models.ManyToManyField('Table')
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE) # Usa el User definido en settings.py
     issue_date = models.DateField(auto_now_add=True)
+    # Copia de date + time_slot como instantes, para filtrar con un rango sobre un índice
+    starts_at = models.DateTimeField(null=True, blank=True, editable=False)
+    ends_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     objects = BookingManager()
+    code_generator = booking_codes
+
+    class Meta:
+        # Índices parciales por estado: cada uno solo contiene las reservas de ese estado.
+        # Los de (user, date) sirven a las vistas del cliente y los de (date) a los listados del admin.
+        indexes = [
+            models.Index(fields=['user', 'starts_at'], name='booking_aprob_user_start_idx', condition=APROBADAS),
+            models.Index(fields=['user', 'starts_at'], name='booking_sinap_user_start_idx', condition=SIN_APROBAR),
+            models.Index(fields=['user', 'starts_at'], name='booking_rech_user_start_idx', condition=RECHAZADAS),
+            models.Index(fields=['starts_at'], name='booking_aprob_start_idx', condition=APROBADAS),
+            models.Index(fields=['starts_at'], name='booking_sinap_start_idx', condition=SIN_APROBAR),
+            models.Index(fields=['starts_at'], name='booking_rech_start_idx', condition=RECHAZADAS),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._schedule_snapshot = (instance.__dict__.get('date'), instance.__dict__.get('time_slot_id'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Solo se recalculan starts_at/ends_at si cambió la fecha o la franja
+        schedule = (self.date, self.time_slot_id)
+        if getattr(self, '_schedule_snapshot', None) != schedule:
+            self.set_schedule()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'starts_at', 'ends_at'}
+        super().save(*args, **kwargs)
+        self._schedule_snapshot = schedule
+
+    def set_schedule(self):
+        if self.date is None:
+            self.starts_at = self.ends_at = None
+        else:
+            # to_python por si la franja se creó en memoria con horas como texto ("10:00")
+            opts = TimeSlot._meta
+            inicio = opts.get_field('start_time').to_python(self.time_slot.start_time)
+            fin = opts.get_field('end_time').to_python(self.time_slot.end_time)
+            self.starts_at = DateTimeUtils.combine(self.date, inicio)
+            self.ends_at = DateTimeUtils.combine(self.date, fin)
 
     def __str__(self):
         return 'Codigo de Reserva: '+self.code
@@ -72,14 +126,7 @@ class Table(models.Model):
         return f"Mesa {self.number} | Capacidad: {self.capacity} | Descripción: {self.description}"
 
     def is_available(self, time_slot, date):
-        # Asumiendo que BookingManager tiene método para filtrar reservas aprobadas
-        from bookings_app.models import Booking
-        reservas = Booking.objects.filter(
-            date=date,
-            time_slot=time_slot,
-            approved=True
-        ).filter(tables=self)
-        return not reservas.exists()
+        return not TableSlotClaim.objects.filter(table=self, time_slot=time_slot, date=date).exists()
 
 
 class TimeSlot(models.Model):
@@ -90,6 +137,26 @@ class TimeSlot(models.Model):
 
     objects = TimeSlotManager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['start_time'], name='timeslot_start_time_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._times_snapshot = (instance.__dict__.get('start_time'), instance.__dict__.get('end_time'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        times_changed = (
+            hasattr(self, '_times_snapshot') and self._times_snapshot != (self.start_time, self.end_time)
+        )
+        super().save(*args, **kwargs)
+        self._times_snapshot = (self.start_time, self.end_time)
+        if times_changed:
+            Booking.objects.actualizar_horarios_de_franja(self)
+
     def __str__(self):
         return self.name
     
@@ -98,4 +165,26 @@ class TimeSlot(models.Model):
         return self.start_time > ahora
 
     def get_label_horas(self):
-        return f"{self.start_time.strftime('%H:%M')} hs. - {self.end_time.strftime('%H:%M')} hs."
\ No newline at end of file
+        return f"{self.start_time.strftime('%H:%M')} hs. - {self.end_time.strftime('%H:%M')} hs."
+
+
+class TableSlotClaim(models.Model):
+    """Ocupación de una mesa en una fecha y franja horaria por una reserva.
+
+    El unique hace que la base rechace la doble reserva de una mesa; las filas se
+    mantienen sincronizadas con las reservas desde bookings_app.signals.
+    """
+    date = models.DateField()
+    time_slot = models.ForeignKey(TimeSlot, on_delete=models.CASCADE, related_name='claims')
+    table = models.ForeignKey(Table, on_delete=models.CASCADE, related_name='claims')
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='claims')
+
+    objects = TableSlotClaimManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'time_slot', 'table'], name='unique_table_slot_claim'),
+        ]
+
+    def __str__(self):
+        return f"Mesa {self.table_id} - {self.date} - {self.time_slot_id}"
@@ -0,0 +1,63 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from bookings_app.models import Booking, Table, TableSlotClaim, TimeSlot
+from bookings_app.utils import bump_availability_version, bump_user_reservations_version
+from menu_app.models import Order
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+@receiver(post_save, sender=Table)
+@receiver(post_delete, sender=Table)
+@receiver(post_save, sender=TimeSlot)
+@receiver(post_delete, sender=TimeSlot)
+def invalidate_availability(sender, **kwargs):
+    bump_availability_version()
+
+
+@receiver(m2m_changed, sender=Booking.tables.through)
+@receiver(m2m_changed, sender=TimeSlot.tables.through)
+def invalidate_availability_on_tables(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_availability_version()
+
+
+@receiver(post_save, sender=Booking)
+def sync_table_claims(sender, instance, created, raw=False, **kwargs):
+    # Una reserva recién creada todavía no tiene mesas: se ocupan al asignarlas
+    if not raw and not created:
+        TableSlotClaim.objects.sync_for_booking(instance)
+
+
+@receiver(m2m_changed, sender=Booking.tables.through)
+def sync_table_claims_on_tables(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        TableSlotClaim.objects.sync_for_booking(instance)
+    elif action == 'post_clear':
+        TableSlotClaim.objects.filter(table=instance).delete()
+    else:
+        for booking in Booking.objects.filter(pk__in=pk_set):
+            TableSlotClaim.objects.sync_for_booking(booking)
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def invalidate_user_reservations(sender, instance, **kwargs):
+    if instance.user_id:
+        bump_user_reservations_version(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Booking.tables.through)
+def invalidate_user_reservations_on_tables(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        bump_user_reservations_version(instance.user_id)
+    elif pk_set:
+        for user_id in set(Booking.objects.filter(pk__in=pk_set).values_list('user_id', flat=True)):
+            bump_user_reservations_version(user_id)
@@ -1,8 +1,11 @@
 from django.test import TestCase
+from unittest import skipUnless
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from datetime import timedelta, time
-from bookings_app.models import Booking, TimeSlot, Table
+from bookings_app.models import Booking, TimeSlot, Table, TableSlotClaim
 from bookings_app.utils import DateTimeUtils
 from bookings_app.helpers import BookingHelpers
 from bookings_app.forms import TableAdminForm, TimeSlotAdminForm, MakeReservationForm
@@ -13,6 +16,11 @@ from datetime import date, datetime
 from django.utils.crypto import get_random_string
 from django.contrib.auth.models import Group
 from django.contrib.messages import get_messages
+from django.core.cache import cache
+from asgiref.sync import sync_to_async
+from bookings_app.views import ReservationEventsView, render_reservation_cards
+from decimal import Decimal
+from menu_app.models import Combo, Order, OrderContainsCombo, OrderContainsProduct, Product
 
 
 User = get_user_model()
@@ -227,6 +235,103 @@ class TableManagerTest(TestCase):
         self.assertNotIn(self.table1, qs)  # Mesa reservada no debe aparecer
 
 
+class TableroDelUsuarioTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='tablero', password='pass')
+        self.hoy = DateTimeUtils.get_local_date()
+        self.timeslot = TimeSlot.objects.create(name='Noche', start_time=time(20, 0), end_time=time(22, 0))
+
+        def reserva(code, dias, approved=True, aprobada=True):
+            return Booking.objects.create(
+                user=self.user, code=code, time_slot=self.timeslot, approved=approved,
+                date=self.hoy + timedelta(days=dias),
+                approval_date=self.hoy if aprobada else None,
+            )
+
+        reserva('FUT1', 2)
+        reserva('FUT2', 5)
+        reserva('PAS1', -3)
+        reserva('PAS2', -1)
+        reserva('PEND', 4, aprobada=False)
+        reserva('VIEJA', -2, aprobada=False)
+        reserva('RECH', 1, approved=False)
+
+    def codigos(self, reservas):
+        return [r.code for r in reservas]
+
+    def test_coincide_con_los_querysets(self):
+        tablero = Booking.objects.tablero_del_usuario(self.user)
+        reservas = Booking.objects.del_usuario(self.user)
+        proxima = Booking.objects.proxima(base_qs=reservas)
+
+        self.assertEqual(tablero['proxima_reserva'], proxima)
+        self.assertEqual(
+            self.codigos(tablero['reservas_futuras']),
+            self.codigos(reservas.futuras().exclude(id=proxima.id).order_by('starts_at'))
+        )
+        self.assertEqual(self.codigos(tablero['reservas_historial_aprobadas']), self.codigos(reservas.historial_aprobadas()))
+        self.assertEqual(self.codigos(tablero['reservas_pendientes']), ['VIEJA', 'PEND'])
+        self.assertEqual(self.codigos(tablero['reservas_historial_rechazadas']), ['RECH'])
+        self.assertEqual(self.codigos(tablero['reservas_sin_confirmar']), ['VIEJA'])
+
+    def test_una_consulta_mas_las_mesas(self):
+        with self.assertNumQueries(2):
+            tablero = Booking.objects.tablero_del_usuario(self.user)
+            for reserva in tablero['reservas_futuras']:
+                list(reserva.tables.all())
+                reserva.time_slot.name
+        self.assertEqual(tablero['cantidad_pedidos_proxima_reserva'], 0)
+
+
+@skipUnless(connection.vendor == 'sqlite', "El plan se lee con EXPLAIN QUERY PLAN de SQLite")
+class BookingIndexesTest(TestCase):
+    """Cada acceso de BookingQuerySet usa un índice de reservas en vez de recorrer la tabla."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='indices', password='pass')
+
+    def assertUsaIndice(self, queryset, tabla, indice):
+        plan = queryset.explain()
+        self.assertNotRegex(plan, rf'(?m)SCAN {tabla}$', plan)
+        self.assertRegex(plan, rf'(SEARCH|SCAN) {tabla} USING (COVERING )?INDEX {indice}\b', plan)
+
+    def test_querysets_del_usuario(self):
+        reservas = Booking.objects.del_usuario(self.user)
+        casos = {
+            'aprobadas': (reservas.aprobadas(), 'booking_aprob_user_start_idx'),
+            'futuras': (reservas.futuras(), 'booking_aprob_user_start_idx'),
+            'proxima': (reservas.proxima(), 'booking_aprob_user_start_idx'),
+            'historial_aprobadas': (reservas.historial_aprobadas(), 'booking_aprob_user_start_idx'),
+            'pendientes': (reservas.pendientes(), 'booking_sinap_user_start_idx'),
+            'sin_confirmar': (reservas.sin_confirmar(), 'booking_sinap_user_start_idx'),
+            'rechazadas': (reservas.rechazadas(), 'booking_rech_user_start_idx'),
+        }
+        for nombre, (queryset, indice) in casos.items():
+            with self.subTest(nombre):
+                self.assertUsaIndice(queryset, 'bookings_app_booking', indice)
+
+    def test_listados_del_admin(self):
+        casos = {
+            'aceptadas': (Booking.objects.aprobadas().order_by('-date'), 'booking_aprob_start_idx'),
+            'pendientes': (Booking.objects.pendientes().order_by('date'), 'booking_sinap_start_idx'),
+            'rechazadas': (
+                Booking.objects.rechazadas().filter(approval_date__isnull=False).order_by('-date'),
+                'booking_rech_start_idx'
+            ),
+            'sin_confirmar': (Booking.objects.sin_confirmar(), 'booking_sinap_start_idx'),
+        }
+        for nombre, (queryset, indice) in casos.items():
+            with self.subTest(nombre):
+                self.assertUsaIndice(queryset, 'bookings_app_booking', indice)
+
+    def test_disponibilidad(self):
+        hoy = DateTimeUtils.get_local_date()
+        self.assertUsaIndice(TimeSlot.objects.disponibles_para_fecha(hoy), 'bookings_app_timeslot', 'timeslot_start_time_idx')
+        # La búsqueda de ocupación usa el unique (date, time_slot, table) de TableSlotClaim
+        plan = Table.objects.disponibles_para_fecha_y_timeslot(hoy, 1).explain()
+        self.assertRegex(plan, r'SEARCH U0 USING COVERING INDEX \S+ \(date=\? AND time_slot_id=\? AND table_id=\?\)')
+
+
 
 
 # Testoes para los Modelos
@@ -448,6 +553,93 @@ class TimeSlotModelTest(TestCase):
 
 
 
+class BookingScheduleTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='horarios', password='pass')
+        self.timeslot = TimeSlot.objects.create(name='Noche', start_time=time(20, 0), end_time=time(22, 0))
+        self.fecha = date(2030, 5, 10)
+
+    def test_starts_at_y_ends_at_al_crear(self):
+        reserva = Booking.objects.create(user=self.user, code='H1', date=self.fecha, time_slot=self.timeslot)
+        reserva.refresh_from_db()
+        self.assertEqual(timezone.localtime(reserva.starts_at), DateTimeUtils.combine(self.fecha, time(20, 0)))
+        self.assertEqual(timezone.localtime(reserva.ends_at), DateTimeUtils.combine(self.fecha, time(22, 0)))
+
+    def test_se_recalculan_al_cambiar_la_fecha(self):
+        Booking.objects.create(user=self.user, code='H1', date=self.fecha, time_slot=self.timeslot)
+        reserva = Booking.objects.get(code='H1')
+        reserva.date = self.fecha + timedelta(days=1)
+        reserva.save(update_fields=['date'])
+        reserva.refresh_from_db()
+        self.assertEqual(reserva.starts_at, DateTimeUtils.combine(self.fecha + timedelta(days=1), time(20, 0)))
+
+    def test_cambiar_horario_de_la_franja_actualiza_las_reservas(self):
+        Booking.objects.create(user=self.user, code='H1', date=self.fecha, time_slot=self.timeslot)
+        Booking.objects.create(user=self.user, code='H2', date=self.fecha + timedelta(days=7), time_slot=self.timeslot)
+
+        franja = TimeSlot.objects.get(pk=self.timeslot.pk)
+        franja.start_time = time(21, 0)
+        franja.end_time = time(23, 0)
+        franja.save()
+
+        for reserva in Booking.objects.all():
+            self.assertEqual(reserva.starts_at, DateTimeUtils.combine(reserva.date, time(21, 0)))
+            self.assertEqual(reserva.ends_at, DateTimeUtils.combine(reserva.date, time(23, 0)))
+
+    def test_querysets_sin_join_a_timeslot(self):
+        reservas = Booking.objects.del_usuario(self.user)
+        for queryset in (reservas.futuras(), reservas.proxima(), reservas.historial_aprobadas(), reservas.sin_confirmar()):
+            self.assertNotIn('bookings_app_timeslot', str(queryset.query))
+
+
+class TableSlotClaimTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reservador', password='pass')
+        self.fecha = DateTimeUtils.get_local_date() + timedelta(days=3)
+        self.timeslot = TimeSlot.objects.create(name='Noche', start_time=time(20, 0), end_time=time(22, 0))
+        self.table1 = Table.objects.create(capacity=4, number=1)
+        self.table2 = Table.objects.create(capacity=2, number=2)
+
+    def crear_reserva(self, code, mesas, approved=True):
+        reserva = Booking.objects.create(
+            user=self.user, code=code, date=self.fecha, time_slot=self.timeslot, approved=approved
+        )
+        reserva.tables.set(mesas)
+        return reserva
+
+    def test_asignar_mesas_las_ocupa(self):
+        reserva = self.crear_reserva('R1', [self.table1, self.table2])
+        self.assertEqual(
+            set(TableSlotClaim.objects.filter(booking=reserva).values_list('table_id', flat=True)),
+            {self.table1.id, self.table2.id}
+        )
+
+    def test_doble_reserva_rechazada_por_la_base(self):
+        self.crear_reserva('R1', [self.table1])
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                self.crear_reserva('R2', [self.table1])
+        self.assertFalse(Booking.objects.filter(code='R2').exists())
+
+    def test_rechazar_libera_las_mesas(self):
+        reserva = self.crear_reserva('R1', [self.table1])
+        reserva.approved = False
+        reserva.save()
+        self.assertTrue(self.table1.is_available(self.timeslot, self.fecha))
+        self.crear_reserva('R2', [self.table1])
+
+    def test_eliminar_libera_las_mesas(self):
+        self.crear_reserva('R1', [self.table1]).delete()
+        self.assertFalse(TableSlotClaim.objects.exists())
+
+    def test_disponibilidad_en_una_consulta(self):
+        self.crear_reserva('R1', [self.table1])
+        with self.assertNumQueries(1):
+            disponibles = list(Table.objects.disponibles_para_fecha_y_timeslot(self.fecha, self.timeslot.id))
+        self.assertEqual(disponibles, [self.table2])
+
+
+
 
 # Testeos para el Helper
 class TestBookingHelpers(TestCase):
@@ -484,25 +676,27 @@ class TestBookingHelpers(TestCase):
         timeslot1 = DummyTimeslot(1)
         timeslot2 = DummyTimeslot(2)
 
-        filtered_mock = MagicMock()
-        filtered_mock.exists.return_value = True
-
-        available_timeslots = MagicMock()
-        available_timeslots.filter.return_value = filtered_mock
-        available_timeslots.get.return_value = timeslot1
-        available_timeslots.first.return_value = timeslot2
+        available_timeslots = [timeslot2, timeslot1]
 
         request = HttpRequest()
 
-        # Caso parámetro inválido - debería devolver first()
+        # Caso parámetro inválido - debería devolver la primera franja
         request.GET = {'time_slot': 'abc'}
         result = BookingHelpers.get_selected_timeslot_from_request(request, available_timeslots)
         self.assertEqual(result.id, 2)
 
-        # Caso parámetro válido - debería devolver get()
+        # Caso parámetro válido - debería devolver la franja pedida
         request.GET = {'time_slot': '1'}
         result = BookingHelpers.get_selected_timeslot_from_request(request, available_timeslots)
         self.assertEqual(result.id, 1)
+
+        # Caso franja no disponible - debería devolver la primera franja
+        request.GET = {'time_slot': '9'}
+        result = BookingHelpers.get_selected_timeslot_from_request(request, available_timeslots)
+        self.assertEqual(result.id, 2)
+
+        # Sin franjas disponibles
+        self.assertIsNone(BookingHelpers.get_selected_timeslot_from_request(request, []))
     
     def test_get_available_months(self):
         today = date(2025, 9, 15)
@@ -545,18 +739,102 @@ class TestBookingHelpers(TestCase):
         self.assertFalse(msg[2])
         self.assertIn("FRANJA HORARIA COMPLETA", msg[0])
 
-    @patch('bookings_app.helpers.get_random_string')
-    def test_generar_codigo_reserva_unique(self, mock_get_random_string):
-        mock_get_random_string.side_effect = ['ABC123XYZ', 'UNIQUE123']
+    def test_codigo_reserva_generado_sin_consultas(self):
+        user = User.objects.create_user(username="codigos", password="pass")
+        time_slot = TimeSlot.objects.create(name="Noche", start_time="20:00", end_time="22:00")
+
+        with CaptureQueriesContext(connection) as queries:
+            reserva = Booking.objects.create(user=user, time_slot=time_slot)
 
-        with patch('bookings_app.helpers.Booking.objects.filter') as mock_filter:
-            mock_filter.side_effect = [
-                MagicMock(exists=lambda: True),
-                MagicMock(exists=lambda: False)
-            ]
-            codigo = BookingHelpers.generar_codigo_reserva()
-        self.assertEqual(codigo, 'UNIQUE123')
-        self.assertEqual(len(codigo), 9)
+        self.assertEqual(len(reserva.code), 9)
+        self.assertRegex(reserva.code, r'^[A-Z0-9]{9}$')
+        self.assertFalse([q for q in queries if q['sql'].startswith('SELECT')])
+
+
+class MonthAvailabilityTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='calendario', password='pass')
+        grupo_cliente, _ = Group.objects.get_or_create(name='Cliente')
+        self.user.groups.add(grupo_cliente)
+        self.manana = TimeSlot.objects.create(name='Mañana', start_time=time(10, 0), end_time=time(12, 0))
+        self.noche = TimeSlot.objects.create(name='Noche', start_time=time(20, 0), end_time=time(22, 0))
+        self.table1 = Table.objects.create(number=1, capacity=4)
+        self.table2 = Table.objects.create(number=2, capacity=2)
+        self.manana.tables.set([self.table1, self.table2])
+        self.noche.tables.set([self.table1, self.table2])
+
+        patcher_date = patch('bookings_app.utils.DateTimeUtils.get_local_date', return_value=date(2025, 9, 8))
+        patcher_time = patch(
+            'bookings_app.utils.DateTimeUtils.get_local_datetime',
+            return_value=DateTimeUtils.combine(date(2025, 9, 8), time(15, 0))
+        )
+        patcher_date.start()
+        patcher_time.start()
+        self.addCleanup(patcher_date.stop)
+        self.addCleanup(patcher_time.stop)
+
+    def reservar(self, code, fecha, time_slot, mesas):
+        reserva = Booking.objects.create(user=self.user, code=code, date=fecha, time_slot=time_slot, approved=True)
+        reserva.tables.set(mesas)
+
+    def test_libres_por_dia_y_franja(self):
+        self.reservar('R1', date(2025, 9, 10), self.noche, [self.table1])
+        dias = BookingHelpers.get_month_availability(2025, 9)
+
+        self.assertEqual(dias[10]['time_slots'], [
+            {'id': self.manana.id, 'free_tables': 2, 'free_capacity': 6},
+            {'id': self.noche.id, 'free_tables': 1, 'free_capacity': 2},
+        ])
+        self.assertEqual(dias[10]['free_tables'], 3)
+        self.assertEqual(dias[10]['status'], 'libre')
+
+    def test_excluye_dias_y_franjas_pasadas(self):
+        dias = BookingHelpers.get_month_availability(2025, 9)
+        self.assertNotIn(7, dias)
+        # Hoy ya empezó la franja de la mañana
+        self.assertEqual([franja['id'] for franja in dias[8]['time_slots']], [self.noche.id])
+        self.assertEqual(len(dias[9]['time_slots']), 2)
+
+    def test_dia_completo(self):
+        self.reservar('R1', date(2025, 9, 12), self.manana, [self.table1, self.table2])
+        self.reservar('R2', date(2025, 9, 12), self.noche, [self.table1, self.table2])
+        self.assertEqual(BookingHelpers.get_month_availability(2025, 9)[12]['status'], 'completo')
+
+    def test_capacidad_por_mesas_de_la_franja(self):
+        mesa_grande = Table.objects.create(number=3, capacity=8)
+        self.noche.tables.add(mesa_grande)
+        self.reservar('R1', date(2025, 9, 10), self.noche, [mesa_grande])
+        dias = BookingHelpers.get_month_availability(2025, 9)
+
+        # La mesa grande solo está en la franja de la noche
+        self.assertEqual(dias[10]['time_slots'], [
+            {'id': self.manana.id, 'free_tables': 2, 'free_capacity': 6},
+            {'id': self.noche.id, 'free_tables': 2, 'free_capacity': 6},
+        ])
+        self.assertEqual(dias[11]['time_slots'][1], {'id': self.noche.id, 'free_tables': 3, 'free_capacity': 14})
+
+    def test_cacheado_e_invalidado_con_las_reservas(self):
+        with self.assertNumQueries(1):
+            BookingHelpers.get_month_availability(2025, 9)
+        with self.assertNumQueries(0):
+            BookingHelpers.get_month_availability(2025, 9)
+
+        self.reservar('R1', date(2025, 9, 20), self.noche, [self.table2])
+        self.assertEqual(BookingHelpers.get_month_availability(2025, 9)[20]['free_capacity'], 10)
+
+    def test_vista_month_availability(self):
+        self.client.login(username='calendario', password='pass')
+        self.reservar('R1', date(2025, 9, 15), self.manana, [self.table1])
+
+        response = self.client.get(reverse('bookings_app:month_availability'), {'month': 9})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['month'], 9)
+        self.assertEqual(data['days']['15']['free_tables'], 3)
+
+        response = self.client.get(reverse('bookings_app:month_availability'), {'month': 13})
+        self.assertEqual(response.status_code, 400)
 
 
 class TableAdminFormTest(TestCase):
@@ -680,6 +958,29 @@ class BookingListViewTest(TestCase):
         self.assertTrue(all(b.user == self.user for b in bookings))
 
 
+class GetReservationCardsViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente', password='testpass123')
+        grupo_cliente, _ = Group.objects.get_or_create(name='Cliente')
+        self.user.groups.add(grupo_cliente)
+        time_slot = TimeSlot.objects.create(name='Noche', start_time=time(20, 0), end_time=time(22, 0))
+        Booking.objects.create(
+            user=self.user, code='CARDS1', time_slot=time_slot, approved=True,
+            date=DateTimeUtils.get_local_date() + timedelta(days=3), approval_date=DateTimeUtils.get_local_date()
+        )
+        self.client.login(username='cliente', password='testpass123')
+
+    def test_devuelve_todas_las_cards(self):
+        response = self.client.get(reverse('bookings_app:get_reservation_cards'))
+        self.assertEqual(response.status_code, 200)
+        cards = response.json()['cards']
+        self.assertEqual(
+            set(cards), {'proxima', 'futuras', 'pendientes', 'historial_aprobadas', 'historial_rechazadas'}
+        )
+        self.assertIn('CARDS1', cards['proxima'])
+        self.assertIn('Sin reservas', cards['futuras'])
+
+
 class GetNextReservationViewTest(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -712,6 +1013,148 @@ class GetNextReservationViewTest(TestCase):
         self.assertTrue(len(json_data['card_html']) > 0)  # Confirmar que envío algo en HTML
 
 
+class NextReservationUpdatesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cliente', password='testpass123')
+        grupo_cliente, _ = Group.objects.get_or_create(name='Cliente')
+        self.user.groups.add(grupo_cliente)
+        self.time_slot = TimeSlot.objects.create(name='Noche', start_time=time(20, 0), end_time=time(22, 0))
+        self.fecha = DateTimeUtils.get_local_date() + timedelta(days=2)
+        self.booking = Booking.objects.create(
+            user=self.user, code='NEXT1', time_slot=self.time_slot, approved=True,
+            date=self.fecha, approval_date=DateTimeUtils.get_local_date()
+        )
+
+    def test_etag_estable_y_sin_consultas(self):
+        etag = BookingHelpers.get_next_reservation_etag(self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(BookingHelpers.get_next_reservation_etag(self.user), etag)
+
+    def test_etag_cambia_con_reservas_y_pedidos(self):
+        etag = BookingHelpers.get_next_reservation_etag(self.user)
+        self.booking.observations = 'Ventana'
+        self.booking.save()
+        etag_reserva = BookingHelpers.get_next_reservation_etag(self.user)
+        self.assertNotEqual(etag_reserva, etag)
+
+        Order.objects.create(user=self.user, booking=self.booking, buyDate=DateTimeUtils.get_local_date())
+        self.assertNotEqual(BookingHelpers.get_next_reservation_etag(self.user), etag_reserva)
+
+    def test_etag_cambia_al_abrir_y_cerrar_la_ventana(self):
+        etags = []
+        for hora in (time(19, 0), time(21, 0), time(23, 0)):
+            ahora = DateTimeUtils.combine(self.fecha, hora)
+            with patch('bookings_app.utils.DateTimeUtils.get_local_datetime', return_value=ahora):
+                etags.append(BookingHelpers.get_next_reservation_etag(self.user))
+        # antes, durante y después de la reserva
+        self.assertEqual(len(set(etags)), 3)
+
+    def test_polling_responde_304_si_no_cambio(self):
+        self.client.login(username='cliente', password='testpass123')
+        url = reverse('bookings_app:get_next_reservation')
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Order.objects.create(user=self.user, booking=self.booking, buyDate=DateTimeUtils.get_local_date())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    async def test_stream_envia_la_card_y_corta(self):
+        await self.async_client.aforce_login(self.user)
+        with patch.object(ReservationEventsView, 'poll_interval', 0), patch.object(ReservationEventsView, 'max_duration', 0):
+            response = await self.async_client.get(reverse('bookings_app:reservation_events'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            eventos = ''.join([chunk.decode() async for chunk in response.streaming_content])
+
+        self.assertIn('event: card', eventos)
+        self.assertIn('NEXT1', eventos)
+
+    async def test_stream_no_reenvia_la_card_conocida(self):
+        await self.async_client.aforce_login(self.user)
+        etag = await sync_to_async(BookingHelpers.get_next_reservation_etag)(self.user)
+        with patch.object(ReservationEventsView, 'poll_interval', 0), patch.object(ReservationEventsView, 'max_duration', 0):
+            response = await self.async_client.get(
+                reverse('bookings_app:reservation_events'), headers={'Last-Event-ID': etag}
+            )
+            eventos = ''.join([chunk.decode() async for chunk in response.streaming_content])
+        self.assertNotIn('event: card', eventos)
+
+    def test_stream_por_wsgi_responde_204(self):
+        self.client.login(username='cliente', password='testpass123')
+        response = self.client.get(reverse('bookings_app:reservation_events'))
+        self.assertEqual(response.status_code, 204)
+
+    async def test_stream_requiere_login(self):
+        response = await self.async_client.get(reverse('bookings_app:reservation_events'))
+        self.assertEqual(response.status_code, 401)
+
+
+class ReservationCardsCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cliente', password='testpass123')
+        grupo_cliente, _ = Group.objects.get_or_create(name='Cliente')
+        self.user.groups.add(grupo_cliente)
+        self.time_slot = TimeSlot.objects.create(name='Noche', start_time=time(20, 0), end_time=time(22, 0))
+        self.fecha = DateTimeUtils.get_local_date() + timedelta(days=2)
+        self.booking = Booking.objects.create(
+            user=self.user, code='CARD1', time_slot=self.time_slot, approved=True,
+            date=self.fecha, approval_date=DateTimeUtils.get_local_date()
+        )
+        self.request = HttpRequest()
+        self.request.user = self.user
+
+    def test_cards_cacheadas_sin_consultas(self):
+        cards = render_reservation_cards(self.request, self.user)
+        self.assertEqual(set(cards), {'proxima', 'futuras', 'pendientes', 'historial_aprobadas', 'historial_rechazadas'})
+        self.assertIn('CARD1', cards['proxima'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(render_reservation_cards(self.request, self.user), cards)
+
+    def test_cards_se_invalidan_con_reservas_y_pedidos(self):
+        render_reservation_cards(self.request, self.user)
+        Order.objects.create(user=self.user, booking=self.booking, buyDate=DateTimeUtils.get_local_date())
+        with CaptureQueriesContext(connection) as queries:
+            render_reservation_cards(self.request, self.user, ['proxima'])
+        self.assertGreater(len(queries), 0)
+
+        self.booking.delete()
+        self.assertNotIn('CARD1', render_reservation_cards(self.request, self.user, ['proxima'])['proxima'])
+
+    def test_cards_cambian_cuando_la_reserva_pasa_al_historial(self):
+        antes = DateTimeUtils.combine(self.fecha, time(19, 0))
+        despues = DateTimeUtils.combine(self.fecha, time(23, 0))
+        with patch('bookings_app.utils.DateTimeUtils.get_local_datetime', return_value=antes):
+            cards = render_reservation_cards(self.request, self.user, ['proxima', 'historial_aprobadas'])
+        self.assertIn('CARD1', cards['proxima'])
+        self.assertNotIn('CARD1', cards['historial_aprobadas'])
+
+        with patch('bookings_app.utils.DateTimeUtils.get_local_datetime', return_value=despues):
+            cards = render_reservation_cards(self.request, self.user, ['proxima', 'historial_aprobadas'])
+        self.assertNotIn('CARD1', cards['proxima'])
+        self.assertIn('CARD1', cards['historial_aprobadas'])
+
+    def test_endpoint_de_cards_usa_el_cache(self):
+        self.client.login(username='cliente', password='testpass123')
+        response = self.client.get(reverse('bookings_app:get_reservation_cards'))
+        self.assertEqual(response.status_code, 200)
+
+        with patch.object(Booking.objects, 'tablero_del_usuario') as mock_tablero:
+            response_cacheada = self.client.get(reverse('bookings_app:get_reservation_cards'))
+            future = self.client.get(reverse('bookings_app:get_future_reservations'))
+        mock_tablero.assert_not_called()
+        self.assertEqual(response_cacheada.json(), response.json())
+        self.assertEqual(future.json()['card_html'], response.json()['cards']['futuras'])
+
+
 class GetFutureReservationsViewTest(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -867,6 +1310,58 @@ class GetHistoryRechazadasViewTest(TestCase):
         self.assertTrue(len(json_data['card_html']) > 0)
 
 
+class ReservationOrdersViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='cliente', password='testpass123')
+        cls.time_slot = TimeSlot.objects.create(name='Noche', start_time=time(20, 0), end_time=time(22, 0))
+        cls.booking = Booking.objects.create(
+            user=cls.user, code='ORD1', time_slot=cls.time_slot, approved=True,
+            date=DateTimeUtils.get_local_date() + timedelta(days=1)
+        )
+        cls.product = Product.objects.create(name='Empanada', description='Carne', price=Decimal('100.00'), quantity=100)
+        cls.combo = Combo.objects.create(name='Picada', description='Para dos', price=Decimal('500.00'))
+
+    def crear_pedido(self):
+        pedido = Order.objects.create(user=self.user, booking=self.booking, buyDate=DateTimeUtils.get_local_date())
+        OrderContainsProduct.objects.create(order=pedido, product=self.product, quantity=2)
+        OrderContainsProduct.objects.create(order=pedido, product=self.product, quantity=1)
+        OrderContainsCombo.objects.create(order=pedido, combo=self.combo, quantity=1)
+        return pedido
+
+    def get_orders(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('bookings_app:reservation_orders', kwargs={'pk': self.booking.pk}))
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_consultas_fijas_con_totales_por_pedido(self):
+        self.client.login(username='cliente', password='testpass123')
+        self.crear_pedido()
+        _, consultas_un_pedido = self.get_orders()
+
+        for _ in range(4):
+            self.crear_pedido()
+        response, consultas = self.get_orders()
+
+        self.assertEqual(consultas, consultas_un_pedido)
+        pedidos = response.context['pedidos']
+        self.assertEqual(len(pedidos), 5)
+        for pedido in pedidos:
+            self.assertEqual(len(pedido.items), 2)
+            self.assertEqual(len(pedido.combos), 1)
+            self.assertEqual(pedido.products_total, Decimal('300.00'))
+            self.assertEqual(pedido.combos_total, Decimal('500.00'))
+
+    def test_pedido_sin_lineas_totaliza_cero(self):
+        self.client.login(username='cliente', password='testpass123')
+        Order.objects.create(user=self.user, booking=self.booking, buyDate=DateTimeUtils.get_local_date())
+        response, _ = self.get_orders()
+        pedido = response.context['pedidos'][0]
+        self.assertEqual((pedido.products_total, pedido.combos_total), (Decimal('0.00'), Decimal('0.00')))
+        self.assertContains(response, 'No hay combos en este pedido.')
+
+
 class DeleteBookingViewTest(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -941,14 +1436,50 @@ class MakeReservationViewTest(TestCase):
         self.assertEqual(response.status_code, 302)
         self.assertIn('/accounts/login/', response.url)
 
+    def test_get_consultas_compartidas_entre_formulario_y_contexto(self):
+        TimeSlot.objects.create(name='Noche', start_time='20:00', end_time='22:00')
+        url = reverse('bookings_app:make_reservation')
+        params = {'month': 12, 'day': 20, 'time_slot': self.time_slot.id}
+        self.client.get(url, params)  # calienta el cache de disponibilidad del mes
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+
+        sqls = [q['sql'] for q in ctx.captured_queries]
+        # Una consulta de franjas para el formulario y el contexto, y las mesas para el estado y las opciones
+        self.assertEqual(sum('FROM "bookings_app_timeslot"' in sql for sql in sqls), 1)
+        self.assertEqual(sum('FROM "bookings_app_table"' in sql for sql in sqls), 2)
+        self.assertEqual(response.context['selected_time_slot'], self.time_slot)
+
+    @patch('bookings_app.helpers.BookingHelpers.get_selected_date_from_request')
+    def test_post_mesa_ya_ocupada(self, mock_get_selected_date):
+        fecha = DateTimeUtils.get_local_date() + timedelta(days=2)
+        mock_get_selected_date.return_value = fecha
+        otro = User.objects.create_user(username='otro', password='pass')
+        previa = Booking.objects.create(user=otro, code='PREVIA', date=fecha, time_slot=self.time_slot, approved=True)
+        previa.tables.add(self.table1)
+
+        # Simula que la mesa se ocupó entre que se mostró el formulario y se envió
+        with patch('bookings_app.models.Table.objects.disponibles_para_fecha_y_timeslot', return_value=Table.objects.all()):
+            response = self.client.post(reverse('bookings_app:make_reservation'), {
+                'time_slot': self.time_slot.id,
+                'tables': [self.table1.id],
+            })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Booking.objects.filter(user=self.user).count(), 0)
+        messages = list(get_messages(response.wsgi_request))
+        self.assertTrue(any('acaba de ser reservada' in str(message) for message in messages))
+
     @patch('bookings_app.helpers.BookingHelpers.get_selected_date_from_request')
     @patch('bookings_app.helpers.BookingHelpers.get_selected_timeslot_from_request')
-    @patch('bookings_app.helpers.BookingHelpers.generar_codigo_reserva')
+    @patch('bookings_app.models.booking_codes.generate')
     @patch('bookings_app.models.Booking.objects.del_usuario')
     def test_post_form_valid_creates_booking(self, mock_del_usuario, mock_generar_codigo, mock_get_selected_timeslot, mock_get_selected_date):
         self.client.login(username='cliente', password='testpass123')
         mock_del_usuario.return_value.pendientes.return_value.exists.return_value = False
-        mock_generar_codigo.return_value = 'ABC1234567'
+        mock_generar_codigo.return_value = 'ABC123456'
         mock_get_selected_date.return_value = date(2025, 9, 20)
 
         mock_time_slot = MagicMock()
@@ -968,3 +1499,4 @@ class MakeReservationViewTest(TestCase):
         self.assertRedirects(response, reverse('bookings_app:my_reservation'))
         messages = list(get_messages(response.wsgi_request))
         self.assertTrue(any('Reserva solicitada con éxito' in str(message) for message in messages))
+        self.assertTrue(any('ABC123456' in str(message) for message in messages))
@@ -5,8 +5,11 @@ from bookings_app.views import (
     BookingListView,
     DeleteBookingView,
     MakeReservationView,
+    MonthAvailabilityView,
     GetHistoryAprobadasView,
     GetHistoryRechazadasView,
+    GetReservationCardsView,
+    ReservationEventsView,
     ReservationOrdersView,
     CancelOrderView,
     DeleteOrderView
@@ -19,6 +22,7 @@ app_name = 'bookings_app'
 urlpatterns = [
     path('my_reservation/', BookingListView.as_view(), name='my_reservation'),
     path('make_reservation', MakeReservationView.as_view(), name='make_reservation'),
+    path('month_availability/', MonthAvailabilityView.as_view(), name='month_availability'),
     path('delete_booking/<int:pk>/', DeleteBookingView.as_view(), name='delete_booking'),
     
     path('get_next_reservation/', GetNextReservationView.as_view(), name='get_next_reservation'),
@@ -26,6 +30,8 @@ urlpatterns = [
     path('get_pending_reservations/', GetPendingReservationsView.as_view(), name='get_pending_reservations'),
     path('get_history_aprobadas/', GetHistoryAprobadasView.as_view(), name='get_history_aprobadas'),
     path('get_history_rechazadas/', GetHistoryRechazadasView.as_view(), name='get_history_rechazadas'),
+    path('get_reservation_cards/', GetReservationCardsView.as_view(), name='get_reservation_cards'),
+    path('reservation_events/', ReservationEventsView.as_view(), name='reservation_events'),
     path('my_reservation/<int:pk>/orders/', ReservationOrdersView.as_view(), name='reservation_orders'),
     path('order/<int:pk>/cancel/', CancelOrderView.as_view(), name='cancel_order'),
     path('order/<int:pk>/delete/', DeleteOrderView.as_view(), name='delete_order')
@@ -1,5 +1,10 @@
+from datetime import datetime
+
 from django.utils import timezone
 
+from menu_app.utils.versions import bump_version, get_version
+
+
 class DateTimeUtils:
     @staticmethod
     def get_local_date():
@@ -12,3 +17,33 @@ class DateTimeUtils:
     @staticmethod
     def get_local_datetime():
         return timezone.localtime()
+
+    @staticmethod
+    def combine(fecha, hora):
+        """Fecha y hora locales como datetime aware."""
+        return timezone.make_aware(datetime.combine(fecha, hora))
+
+
+AVAILABILITY_VERSION_KEY = 'bookings:availability:version'
+
+
+def get_availability_version():
+    return get_version(AVAILABILITY_VERSION_KEY)
+
+
+def bump_availability_version():
+    """Invalida todo lo derivado de reservas, franjas horarias y mesas."""
+    bump_version(AVAILABILITY_VERSION_KEY)
+
+
+def get_user_reservations_key(user_id):
+    return f'bookings:user:{user_id}:version'
+
+
+def get_user_reservations_version(user_id):
+    return get_version(get_user_reservations_key(user_id))
+
+
+def bump_user_reservations_version(user_id):
+    """Invalida lo derivado de las reservas y pedidos de un usuario (cards de "Mis Reservas")."""
+    bump_version(get_user_reservations_key(user_id))
@@ -1,19 +1,49 @@
-from bookings_app.models import Booking, TimeSlot, Table
+import asyncio
+import json
+import time
+
+from bookings_app.models import Booking
 from bookings_app.mixins import ClienteRequiredMixin
-from bookings_app.utils import DateTimeUtils
-from bookings_app.helpers import BookingHelpers
-from menu_app.models import Order, OrderContainsProduct, OrderContainsCombo
+from bookings_app.utils import DateTimeUtils, bump_user_reservations_version
+from bookings_app.helpers import BookingHelpers, ReservationInputs
+from menu_app.models import Order, OrderContainsProduct
+from menu_app.utils.stock import release_stock
 from bookings_app.forms import MakeReservationForm
 
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.handlers.asgi import ASGIRequest
 from django.template.loader import render_to_string
 from django.views.generic import ListView, FormView, DetailView
 from django.shortcuts import get_object_or_404
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.views import View
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+
+
+RESERVATION_CARDS = {
+    'proxima': 'bookings_app/includes/get_next_reservation_card.html',
+    'futuras': 'bookings_app/includes/get_future_reservations_card.html',
+    'pendientes': 'bookings_app/includes/get_pending_reservations_card.html',
+    'historial_aprobadas': 'bookings_app/includes/get_history_reservations_aprobadas_card.html',
+    'historial_rechazadas': 'bookings_app/includes/get_history_reservations_rechazadas_card.html',
+}
+
+
+def render_reservation_cards(request, user, names=tuple(RESERVATION_CARDS)):
+    """Cards de "Mis Reservas" desde el cache por usuario; las que falten se renderizan juntas."""
+    def render(missing):
+        tablero = Booking.objects.tablero_del_usuario(user)
+        return {name: render_to_string(RESERVATION_CARDS[name], tablero, request=request) for name in missing}
+
+    return BookingHelpers.get_reservation_cards(user, names, render)
 
 
 class BookingListView(LoginRequiredMixin, ClienteRequiredMixin, ListView):
@@ -23,47 +53,7 @@ class BookingListView(LoginRequiredMixin, ClienteRequiredMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = self.request.user
-
-        reservas_usuario = Booking.objects.del_usuario(user).select_related('time_slot')
-
-        proxima_reserva = Booking.objects.proxima(base_qs=reservas_usuario)
-        
-        hoy = DateTimeUtils.get_local_date()
-        ahora = DateTimeUtils.get_local_time()
-        
-        if proxima_reserva:
-            card_title = proxima_reserva.get_card_title(hoy, ahora)
-        else:
-            card_title = "Próxima Reserva"
-
-        reservas_futuras = reservas_usuario.futuras()
-
-        if proxima_reserva:
-            reservas_futuras = reservas_futuras.exclude(id=proxima_reserva.id)
-
-        reservas_pendientes = reservas_usuario.pendientes()
-        reservas_historial_aprobadas = reservas_usuario.historial_aprobadas()
-        reservas_historial_rechazadas = reservas_usuario.rechazadas()
-        reservas_sin_confirmar = reservas_usuario.sin_confirmar()
-
-        # Anotar cantidad de pedidos
-        reservas_futuras = reservas_futuras.con_cantidad_pedidos()
-        reservas_historial_aprobadas = reservas_historial_aprobadas.con_cantidad_pedidos()
-
-        cantidad_pedidos_proxima_reserva = proxima_reserva.get_cantidad_pedidos() if proxima_reserva else 0
-
-        context.update({
-            'proxima_reserva': proxima_reserva,
-            'card_title': card_title,
-            'reservas_futuras': reservas_futuras,
-            'reservas_pendientes': reservas_pendientes,
-            'reservas_historial_aprobadas': reservas_historial_aprobadas,
-            'reservas_historial_rechazadas': reservas_historial_rechazadas,
-            'reservas_sin_confirmar': reservas_sin_confirmar,
-            'cantidad_pedidos_proxima_reserva': cantidad_pedidos_proxima_reserva,
-        })
-        
+        context.update(Booking.objects.tablero_del_usuario(self.request.user))
         return context
 
     def get_queryset(self):
@@ -71,74 +61,102 @@ class BookingListView(LoginRequiredMixin, ClienteRequiredMixin, ListView):
 
 
 class GetNextReservationView(LoginRequiredMixin, ClienteRequiredMixin, View):
-    def get(self, request, *args, **kwargs):
-        reservas_usuario = Booking.objects.del_usuario(request.user).aprobadas()
-        proxima_reserva = Booking.objects.proxima(base_qs=reservas_usuario)
+    """Card de próxima reserva. Con If-None-Match responde 304 sin consultar ni renderizar si no cambió."""
 
-        cantidad_pedidos = proxima_reserva.get_cantidad_pedidos() if proxima_reserva else 0
-        es_reserva_actual = proxima_reserva.es_reserva_actual if proxima_reserva else False
-
-        card_html = render_to_string('bookings_app/includes/get_next_reservation_card.html', {
-            'proxima_reserva': proxima_reserva,
-            'cantidad_pedidos_proxima_reserva': cantidad_pedidos,
-            'es_reserva_actual': es_reserva_actual
-        }, request=request)
+    @staticmethod
+    def render_card(request, user):
+        return render_reservation_cards(request, user, ['proxima'])['proxima']
 
-        return JsonResponse({'card_html': card_html})
+    @method_decorator(condition(etag_func=lambda request, *args, **kwargs: BookingHelpers.get_next_reservation_etag(request.user)))
+    def get(self, request, *args, **kwargs):
+        response = JsonResponse({'card_html': self.render_card(request, request.user)})
+        # Que el navegador revalide siempre con el ETag en vez de usar su copia
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class ReservationEventsView(View):
+    """Stream (Server-Sent Events) con la card de próxima reserva, enviada solo cuando cambia.
+
+    Solo por ASGI (restaurante/asgi.py): mientras espera no ocupa un thread. Por WSGI
+    (runserver) Django consumiría el stream entero antes de mandar nada y tendría un
+    worker tomado todo ese tiempo, así que responde 204 y la página vuelve al polling
+    de GetNextReservationView. Cada ``poll_interval`` segundos compara el ETag de la card, que sale del
+    cache; a los ``max_duration`` segundos cierra y el navegador reconecta solo,
+    mandando el último ETag en Last-Event-ID para no recibir de nuevo la misma card.
+    """
+    poll_interval = 5
+    keepalive_interval = 30
+    max_duration = 300
+
+    async def get(self, request, *args, **kwargs):
+        if not isinstance(request, ASGIRequest):
+            return HttpResponse(status=204)  # EventSource no reconecta ante un 204
+        user = await request.auser()
+        if not user.is_authenticated:
+            return HttpResponse(status=401)
+        if not await user.groups.filter(name="Cliente").aexists():
+            return HttpResponse(status=403)
+
+        response = StreamingHttpResponse(
+            self.stream(request, user, request.headers.get('Last-Event-ID')),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # que un proxy (nginx) no acumule los eventos
+        return response
+
+    async def stream(self, request, user, last_etag=None):
+        get_etag = sync_to_async(BookingHelpers.get_next_reservation_etag)
+        render_card = sync_to_async(GetNextReservationView.render_card)
+        inicio = ultimo_envio = time.monotonic()
+
+        yield f'retry: {self.poll_interval * 1000}\n\n'
+        while True:
+            etag = await get_etag(user)
+            if etag != last_etag:
+                last_etag = etag
+                card_html = await render_card(request, user)
+                yield f'id: {etag}\nevent: card\ndata: {json.dumps({"card_html": card_html})}\n\n'
+                ultimo_envio = time.monotonic()
+            elif time.monotonic() - ultimo_envio >= self.keepalive_interval:
+                yield ': keepalive\n\n'
+                ultimo_envio = time.monotonic()
+
+            if time.monotonic() - inicio >= self.max_duration:
+                return
+            await asyncio.sleep(self.poll_interval)
 
 
 class GetFutureReservationsView(LoginRequiredMixin, ClienteRequiredMixin, View):
     def get(self, request, *args, **kwargs):
-        reservas_usuario = Booking.objects.del_usuario(request.user).aprobadas()
-        proxima_reserva = Booking.objects.proxima(reservas_usuario)
-        reservas_futuras = reservas_usuario.futuras()
-
-        if proxima_reserva:
-            reservas_futuras = reservas_futuras.exclude(id=proxima_reserva.id)
-        
-        reservas_futuras = reservas_futuras.con_cantidad_pedidos()
-
-        card_html = render_to_string(
-            'bookings_app/includes/get_future_reservations_card.html',
-            {'reservas_futuras': reservas_futuras},
-            request=request
-        )
-
+        card_html = render_reservation_cards(request, request.user, ['futuras'])['futuras']
         return JsonResponse({'card_html': card_html})
 
 
-
 class GetPendingReservationsView(LoginRequiredMixin, ClienteRequiredMixin, View):
     def get(self, request, *args, **kwargs):
-        reservas_pendientes = Booking.objects.del_usuario(request.user).pendientes()
-
-        card_html = render_to_string('bookings_app/includes/get_pending_reservations_card.html', {
-            'reservas_pendientes': reservas_pendientes
-        }, request=request)
-
+        card_html = render_reservation_cards(request, request.user, ['pendientes'])['pendientes']
         return JsonResponse({'card_html': card_html})
 
 
 class GetHistoryAprobadasView(LoginRequiredMixin, ClienteRequiredMixin, View):
     def get(self, request, *args, **kwargs):
-        reservas_aprobadas = Booking.objects.del_usuario(request.user).historial_aprobadas().con_cantidad_pedidos()
-
-        card_html = render_to_string('bookings_app/includes/get_history_reservations_aprobadas_card.html', {
-            'reservas_historial_aprobadas': reservas_aprobadas
-        }, request=request)
-
+        card_html = render_reservation_cards(request, request.user, ['historial_aprobadas'])['historial_aprobadas']
         return JsonResponse({'card_html': card_html})
 
 
 class GetHistoryRechazadasView(LoginRequiredMixin, ClienteRequiredMixin, View):
     def get(self, request, *args, **kwargs):
-        reservas_rechazadas = Booking.objects.del_usuario(request.user).rechazadas()
+        card_html = render_reservation_cards(request, request.user, ['historial_rechazadas'])['historial_rechazadas']
+        return JsonResponse({'card_html': card_html})
 
-        card_html = render_to_string('bookings_app/includes/get_history_reservations_rechazadas_card.html', {
-            'reservas_historial_rechazadas': reservas_rechazadas
-        }, request=request)
 
-        return JsonResponse({'card_html': card_html})
+class GetReservationCardsView(LoginRequiredMixin, ClienteRequiredMixin, View):
+    """Todas las cards de "Mis Reservas" en una respuesta, para refrescar la página después de eliminar."""
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse({'cards': render_reservation_cards(request, request.user)})
 
 
 class DeleteBookingView(ClienteRequiredMixin, View):
@@ -154,19 +172,15 @@ class ReservationOrdersView(LoginRequiredMixin, DetailView):
     template_name = 'bookings_app/reservation_orders.html'
     context_object_name = 'reserva'
 
+    def get_queryset(self):
+        pedidos = Order.objects.con_detalle().order_by('buyDate')
+        return Booking.objects.prefetch_related(Prefetch('orders', queryset=pedidos, to_attr='pedidos'))
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        reserva = self.get_object()
-
-        pedidos = Order.objects.filter(booking=reserva).order_by('buyDate')
-
-        # Enlazar productos
-        for pedido in pedidos:
-            pedido.items = OrderContainsProduct.objects.filter(order=pedido).select_related('product')
-            pedido.combos = OrderContainsCombo.objects.filter(order=pedido).select_related('combo')
-        context['pedidos'] = pedidos
+        context['pedidos'] = self.object.pedidos
         return context
-    
+
 
 class CancelOrderView(LoginRequiredMixin, View):
     def post(self, request, pk):
@@ -176,8 +190,16 @@ class CancelOrderView(LoginRequiredMixin, View):
             #messages.error(request, 'Solo se pueden cancelar pedidos en estado "Solicitado".')
             return redirect('bookings_app:reservation_orders', order.booking.pk)
 
-        order.state = 'C'
-        order.save()
+        with transaction.atomic():
+            # La transición es condicional para que un doble envío no devuelva el stock dos veces
+            cancelled = Order.objects.filter(pk=order.pk, state='S').update(state='C')
+            if cancelled:
+                bump_user_reservations_version(order.user_id)  # update() no dispara señales
+            if cancelled and order.stock_reserved:
+                quantities = {}
+                for product_id, quantity in OrderContainsProduct.objects.filter(order=order).values_list('product_id', 'quantity'):
+                    quantities[product_id] = quantities.get(product_id, 0) + quantity
+                release_stock(quantities)
         #messages.success(request, f'El pedido {order.code} fue cancelado correctamente.')
         return redirect('bookings_app:reservation_orders', order.booking.pk)
 
@@ -197,27 +219,36 @@ class DeleteOrderView(View):
         return redirect('bookings_app:reservation_orders', booking_pk)
 
 
+class MonthAvailabilityView(LoginRequiredMixin, ClienteRequiredMixin, View):
+    def get(self, request, *args, **kwargs):
+        today = DateTimeUtils.get_local_date()
+        try:
+            month = int(request.GET.get('month', today.month))
+            if not 1 <= month <= 12:
+                raise ValueError
+        except ValueError:
+            return JsonResponse({'success': False, 'message': 'Mes inválido.'}, status=400)
+
+        days = BookingHelpers.get_month_availability(today.year, month)
+        return JsonResponse({'success': True, 'year': today.year, 'month': month, 'days': days})
+
+
 class MakeReservationView(LoginRequiredMixin, ClienteRequiredMixin, FormView):
     template_name = "bookings_app/make_reservation.html"
     form_class = MakeReservationForm
     success_url = reverse_lazy("bookings_app:my_reservation")
 
+    def setup(self, request, *args, **kwargs):
+        super().setup(request, *args, **kwargs)
+        self.inputs = ReservationInputs(request)
+
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
-
-        selected_date = BookingHelpers.get_selected_date_from_request(self.request)
-        time_slots = TimeSlot.objects.disponibles_para_fecha(selected_date)
-
-        selected_time_slot = BookingHelpers.get_selected_timeslot_from_request(self.request, time_slots)
-
-        available_tables = Table.objects.disponibles_para_fecha_y_timeslot(
-            selected_date, 
-            selected_time_slot.id if selected_time_slot else None
-        )
+        selected_time_slot = self.inputs.selected_time_slot
 
         kwargs.update({
-            'available_tables': available_tables,
-            'time_slot_queryset': time_slots,
+            'available_tables': self.inputs.available_tables,
+            'time_slot_queryset': self.inputs.time_slots,
             'initial': {'time_slot': selected_time_slot.id if selected_time_slot else None}
         })
 
@@ -226,19 +257,17 @@ class MakeReservationView(LoginRequiredMixin, ClienteRequiredMixin, FormView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        today = DateTimeUtils.get_local_datetime()
-        selected_date = BookingHelpers.get_selected_date_from_request(self.request)
-        time_slots = TimeSlot.objects.disponibles_para_fecha(selected_date)
-        selected_time_slot = BookingHelpers.get_selected_timeslot_from_request(self.request, time_slots)
+        today = self.inputs.now
+        selected_date = self.inputs.selected_date
+        time_slots = self.inputs.time_slots
 
         months = BookingHelpers.get_available_months(today)
         weekdays = BookingHelpers.get_weekdays()
         month_days = BookingHelpers.get_month_calendar(today.year, selected_date.month)
-
-        available_tables = self.get_form().fields['tables'].queryset
+        month_availability = BookingHelpers.get_month_availability(today.year, selected_date.month, now=today)
 
         availability_title, availability_subtitle, show_tables = BookingHelpers.get_availability_status(
-            selected_date, time_slots, available_tables
+            selected_date, time_slots, self.inputs.available_tables, today=today.date()
         )
 
         reservas_usuario = Booking.objects.del_usuario(self.request.user).aprobadas()
@@ -249,8 +278,9 @@ class MakeReservationView(LoginRequiredMixin, ClienteRequiredMixin, FormView):
             "months": months,
             "weekdays": weekdays,
             "month_days": month_days,
+            "calendar_weeks": BookingHelpers.get_calendar_weeks(month_days, month_availability),
             "time_slots": time_slots,
-            "selected_time_slot": selected_time_slot,
+            "selected_time_slot": self.inputs.selected_time_slot,
             "current_month": selected_date.month,
             "current_day": selected_date.day,
             "today": today,
@@ -270,23 +300,26 @@ class MakeReservationView(LoginRequiredMixin, ClienteRequiredMixin, FormView):
             return self.form_invalid(form)
         
         # Obtengo los datos seleccionados
-        selected_date = BookingHelpers.get_selected_date_from_request(self.request)
+        selected_date = self.inputs.selected_date
         mesas_seleccionadas = form.cleaned_data["tables"]
         time_slot = form.cleaned_data["time_slot"]
-        # Genero código único para reserva
-        new_code = BookingHelpers.generar_codigo_reserva()
-
-        # Creo la reserva y le asigno sus mesas
-        reserva = Booking.objects.create(
-            approved=True,
-            approval_date=None,
-            code=new_code,
-            observations=form.cleaned_data.get("observations", ""),
-            date=selected_date,
-            time_slot=time_slot,
-            user=self.request.user
-        )
-        reserva.tables.set(mesas_seleccionadas)
+        # Creo la reserva (el código único se genera al guardarla) y le asigno sus mesas.
+        # Asignar las mesas las ocupa (TableSlotClaim) en la misma transacción: si otra
+        # reserva se adelantó, el unique lo rechaza y no queda nada guardado.
+        try:
+            with transaction.atomic():
+                reserva = Booking.objects.create(
+                    approved=True,
+                    approval_date=None,
+                    observations=form.cleaned_data.get("observations", ""),
+                    date=selected_date,
+                    time_slot=time_slot,
+                    user=self.request.user
+                )
+                reserva.tables.set(mesas_seleccionadas)
+        except IntegrityError:
+            messages.error(self.request, "Alguna de las mesas seleccionadas acaba de ser reservada. Elija otra.")
+            return self.form_invalid(form)
         
-        messages.success(self.request, f"Reserva solicitada con éxito. Código: {new_code}")
+        messages.success(self.request, f"Reserva solicitada con éxito. Código: {reserva.code}")
         return super().form_valid(form)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Product, Category, Order,Combo,Rating, ComboRating
+from .models import Product, Category, Order,Combo,Rating, ComboRating, Promotion
 #Librerias para el cálculo de precio de combo
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import path
@@ -53,26 +53,27 @@ class ComboAdmin(admin.ModelAdmin):
         return ", ".join([p.name for p in obj.products.all()])
     list_products.short_description = 'Productos'
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('products')
+
     @admin.action(description='Habilitar combos seleccionados')
     def activate_combos(self, request, queryset):
-        queryset.update(is_active=True)
+        queryset.set_active(True)
         self.message_user(request, 'Combos habilitados correctamente.')
 
     @admin.action(description='Deshabilitar combos seleccionados')
     def deactivate_combos(self, request, queryset):
-        queryset.update(is_active=False)
+        queryset.set_active(False)
         self.message_user(request, 'Combos deshabilitados correctamente.')
 
     @admin.action(description='Aplicar promoción 20% a combos seleccionados')
     def apply_promotion(self, request, queryset):
-        for combo in queryset:
-            combo.setDiscount(20)  # Aplicar descuento del 20%
+        queryset.set_discount(20)  # Aplicar descuento del 20%
         self.message_user(request, 'Promoción del 20% aplicada a combos seleccionados.')
 
     @admin.action(description='Quitar promoción de combos seleccionados')
     def remove_promotion(self, request, queryset):
-        for combo in queryset:
-            combo.setPromotion(False)
+        queryset.remove_promotion()
         self.message_user(request, 'Promociones removidas de combos seleccionados.')
 
     #Actualizar precio en base a los productos
@@ -127,6 +128,7 @@ class ComboAdmin(admin.ModelAdmin):
 class ProductAdmin(admin.ModelAdmin):
     list_display = ['name', 'description', 'category', 'price', 'is_available', 'quantity', 'on_promotion', 'dicount_percentage']
     list_filter = ['category', 'is_available']
+    list_select_related = ['category']
     search_fields = ['name', 'description']
     # Se agrego los campos on_promotion y dicount_percentage para ser editables en la lista
     list_editable = ['on_promotion', 'dicount_percentage']
@@ -146,18 +148,16 @@ class ProductAdmin(admin.ModelAdmin):
 
     # Se agrego el metodo save_model para validar y aplicar el descuento
     def save_model(self, request, obj, form, change):
-        # Validar y aplicar descuento si on_promotion está activo
+        # El descuento se aplica en memoria para guardar una sola vez (también al editar desde la lista)
         if obj.on_promotion:
             try:
-                obj.setDiscount(obj.dicount_percentage)
+                obj.apply_discount(obj.dicount_percentage)
             except ValueError as e:
-                # Si hay error, puedes manejarlo como quieras
-                from django.contrib import messages
                 messages.error(request, f"Error en descuento: {e}")
                 return
         else:
             # Si no hay promoción, asegurarse de limpiar descuento
-            obj.unSetPromotion()
+            obj.clear_promotion()
         super().save_model(request, obj, form, change)
 
         #########Se agrego el metodo save_model para validar y aplicar el descuento
@@ -173,4 +173,12 @@ class RatingAdmin(admin.ModelAdmin):
 class ComboRatingAdmin(admin.ModelAdmin):
     list_display = ('title', 'combo', 'user', 'rating', 'created_at')
     list_filter = ('rating', 'created_at')
-    search_fields = ('title', 'text', 'combo__name', 'user__username')
\ No newline at end of file
+    search_fields = ('title', 'text', 'combo__name', 'user__username')
+
+
+@admin.register(Promotion)
+class PromotionAdmin(admin.ModelAdmin):
+    list_display = ('name', 'percentage', 'starts_at', 'ends_at', 'recurrence', 'is_active')
+    list_filter = ('recurrence', 'is_active')
+    search_fields = ('name',)
+    filter_horizontal = ('products', 'combos')
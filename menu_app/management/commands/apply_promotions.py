@@ -0,0 +1,21 @@
+import math
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from menu_app.utils.promotions import apply_promotions, get_next_transition
+
+
+class Command(BaseCommand):
+    help = "Aplica los descuentos de las promociones programadas que correspondan ahora."
+
+    def handle(self, *args, **options):
+        updated = apply_promotions()
+        next_transition = get_next_transition()
+        if next_transition is None or math.isinf(next_transition):
+            next_message = "no hay próximos cambios"
+        else:
+            moment = timezone.localtime(datetime.fromtimestamp(next_transition, tz=timezone.get_current_timezone()))
+            next_message = f"próximo cambio: {moment:%Y-%m-%d %H:%M}"
+        self.stdout.write(self.style.SUCCESS(f"{updated} ítem(s) actualizado(s); {next_message}."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from menu_app.models import CartLine
+
+
+class Command(BaseCommand):
+    help = "Elimina las líneas de carrito de reservas que ya terminaron."
+
+    def handle(self, *args, **options):
+        deleted, _ = CartLine.objects.vencidas().delete()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} línea(s) de carrito eliminada(s)."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from menu_app.models import Combo
+
+
+class Command(BaseCommand):
+    help = "Recalcula el precio de todos los combos como el promedio del precio de sus productos."
+
+    def handle(self, *args, **options):
+        changed = Combo.recalculate_prices()
+        self.stdout.write(self.style.SUCCESS(f"combos: {changed} precio(s) actualizado(s)."))
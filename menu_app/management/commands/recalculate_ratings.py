@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from menu_app.models import Product, Combo
+
+
+class Command(BaseCommand):
+    help = "Recalcula la cantidad, suma y promedio de calificaciones guardados en productos y combos."
+
+    def handle(self, *args, **options):
+        for model in (Product, Combo):
+            changed = model.recalculate_rating_aggregates()
+            self.stdout.write(self.style.SUCCESS(
+                f"{model._meta.verbose_name_plural}: {changed} registro(s) corregido(s)."
+            ))
@@ -0,0 +1,50 @@
+# Generated by Django 5.2 on 2026-10-18 08:47
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    for model_name, related_name in (('Product', 'ratings'), ('Combo', 'comments')):
+        model = apps.get_model('menu_app', model_name)
+        items = list(model.objects.annotate(
+            real_count=Count(related_name),
+            real_sum=Coalesce(Sum(f'{related_name}__rating'), 0)
+        ))
+        for item in items:
+            item.rating_count = item.real_count
+            item.rating_sum = item.real_sum
+            item.avarage_rating = item.real_sum / item.real_count if item.real_count else 0.0
+        model.objects.bulk_update(items, ['rating_count', 'rating_sum', 'avarage_rating'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu_app', '0020_combo_avarage_rating'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='combo',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='combo',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
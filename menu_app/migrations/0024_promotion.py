@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-18 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu_app', '0023_order_stock_reserved'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Promotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('percentage', models.PositiveIntegerField()),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField()),
+                ('recurrence', models.CharField(choices=[('N', 'Sin repetición'), ('D', 'Todos los días'), ('W', 'Todas las semanas')], default='N', max_length=1)),
+                ('is_active', models.BooleanField(default=True)),
+                ('combos', models.ManyToManyField(blank=True, related_name='promotions', to='menu_app.combo')),
+                ('products', models.ManyToManyField(blank=True, related_name='promotions', to='menu_app.product')),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 10:08
+
+import django.db.models.expressions
+import django.db.models.functions.math
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu_app', '0024_promotion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='combo',
+            name='effective_price',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(dicount_percentage__gt=0, on_promotion=True, then=django.db.models.functions.math.Round(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('price'), '*', django.db.models.expressions.CombinedExpression(models.Value(100), '-', models.F('dicount_percentage'))), '*', models.Value(Decimal('0.01'))), 2)), default=models.F('price'), output_field=models.DecimalField(decimal_places=2, max_digits=10)), output_field=models.DecimalField(decimal_places=2, max_digits=10)),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(dicount_percentage__gt=0, on_promotion=True, then=django.db.models.functions.math.Round(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('price'), '*', django.db.models.expressions.CombinedExpression(models.Value(100), '-', models.F('dicount_percentage'))), '*', models.Value(Decimal('0.01'))), 2)), default=models.F('price'), output_field=models.DecimalField(decimal_places=2, max_digits=10)), output_field=models.DecimalField(decimal_places=2, max_digits=10)),
+        ),
+        migrations.AddIndex(
+            model_name='combo',
+            index=models.Index(fields=['effective_price'], name='combo_effective_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['effective_price'], name='product_effective_price_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu_app', '0025_effective_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='promotion',
+            name='is_applied',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
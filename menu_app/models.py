@@ -1,11 +1,115 @@
-from decimal import Decimal
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
 from django.db import models
 from django.core.exceptions import ValidationError
 from django.conf import settings
-from django.db.models import Avg
+from django.utils import timezone
+from django.db.models import Avg, Case, Count, DecimalField, F, FloatField, OuterRef, Prefetch, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+from menu_app.utils.menu_cache import bump_menu_version
+from menu_app.utils.pricing import line_subtotal
+from restaurante.codes import CodeGenerator, UniqueCodeMixin
 
+CENTS = Decimal('0.01')
 
-class Product(models.Model):
+order_codes = CodeGenerator('order', '0123456789ABCDEF', length=11, prefix='PDD-')
+
+
+class RatingAggregateMixin:
+    """Mantiene desnormalizados la cantidad, la suma y el promedio de las calificaciones.
+
+    Las clases que lo usan definen ``rating_count``, ``rating_sum`` y ``avarage_rating``,
+    y ``ratings_related_name`` con el related_name de sus calificaciones.
+    """
+    ratings_related_name = None
+
+    @property
+    def average_rating(self):
+        return self.avarage_rating
+
+    @classmethod
+    def apply_rating_delta(cls, pk, count_delta, sum_delta):
+        """Suma los deltas a los agregados con un único UPDATE (sin leer las calificaciones)."""
+        new_count = F('rating_count') + count_delta
+        new_sum = F('rating_sum') + sum_delta
+        cls.objects.filter(pk=pk).update(
+            rating_count=new_count,
+            rating_sum=new_sum,
+            avarage_rating=Coalesce(
+                Cast(new_sum, FloatField()) / NullIf(new_count, 0),
+                Value(0.0),
+                output_field=FloatField()
+            )
+        )
+
+    @classmethod
+    def recalculate_rating_aggregates(cls, queryset=None):
+        """Recalcula los agregados desde las calificaciones con una consulta y un bulk_update."""
+        queryset = cls.objects.all() if queryset is None else queryset
+        items = list(
+            queryset.annotate(
+                real_count=Count(cls.ratings_related_name),
+                real_sum=Coalesce(Sum(f'{cls.ratings_related_name}__rating'), 0)
+            ).only('id', 'rating_count', 'rating_sum', 'avarage_rating')
+        )
+        changed = []
+        for item in items:
+            average = item.real_sum / item.real_count if item.real_count else 0.0
+            if (item.rating_count, item.rating_sum, item.avarage_rating) != (item.real_count, item.real_sum, average):
+                item.rating_count = item.real_count
+                item.rating_sum = item.real_sum
+                item.avarage_rating = average
+                changed.append(item)
+        cls.objects.bulk_update(changed, ['rating_count', 'rating_sum', 'avarage_rating'], batch_size=500)
+        return len(changed)
+
+    #metodos para calcular el rating promedio
+    def calculate_average_rating(self):
+        self.recalculate_rating_aggregates(type(self).objects.filter(pk=self.pk))
+        self.refresh_from_db(fields=['rating_count', 'rating_sum', 'avarage_rating'])
+
+    def update_average_rating(self):
+        self.calculate_average_rating()
+
+
+def effective_price_expression():
+    """Precio a cobrar: con el descuento aplicado si está en promoción, redondeado a centavos.
+
+    Es la regla de precios; la calcula la base en la columna ``effective_price`` de
+    productos y combos. ``compute_effective_price`` la repite solo para la instancia
+    en memoria recién guardada.
+    """
+    discounted = F('price') * (Value(100) - F('dicount_percentage')) * Value(Decimal('0.01'))
+    return Case(
+        When(on_promotion=True, dicount_percentage__gt=0, then=Round(discounted, 2)),
+        default=F('price'),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+
+
+def compute_effective_price(price, on_promotion, percentage):
+    """``effective_price_expression`` calculada en Python; como ROUND de la base, .5 redondea hacia arriba."""
+    price = Decimal(str(price)).quantize(CENTS)
+    if on_promotion and percentage > 0:
+        return (price * (100 - percentage) * CENTS).quantize(CENTS, rounding=ROUND_HALF_UP)
+    return price
+
+
+class EffectivePriceMixin:
+    """Expone ``effective_price`` (columna generada por la base) también como ``discounted_price``."""
+
+    @property
+    def discounted_price(self):
+        return self.effective_price
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Django no relee las columnas generadas al guardar: se calcula el mismo valor que
+        # acaba de guardar la base, así leerlo no dispara una consulta
+        self.effective_price = compute_effective_price(self.price, self.on_promotion, self.dicount_percentage)
+
+
+class Product(EffectivePriceMixin, RatingAggregateMixin, models.Model):
     name = models.CharField(max_length=40,default="")
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -17,21 +121,43 @@ class Product(models.Model):
     on_promotion = models.BooleanField(default=False)
     dicount_percentage = models.IntegerField(default=0) # 0 a 100
     is_available = models.BooleanField(default=True)
+    effective_price = models.GeneratedField(
+        expression=effective_price_expression(),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+    )
     avarage_rating = models.FloatField(default=0.0)
-    
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
 
-    @property
-    def discounted_price(self):
-        if self.on_promotion and self.dicount_percentage > 0:
-            discount_amount = (self.dicount_percentage / 80) * float(self.price)
-            return float(self.price) - discount_amount
-        return self.price
+    ratings_related_name = 'ratings'
 
-    def setDiscount(self, percentage):
+    class Meta:
+        indexes = [
+            models.Index(fields=['effective_price'], name='product_effective_price_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Precio leído de la base, para recalcular los combos solo si cambia
+        instance._price_snapshot = instance.__dict__.get('price')
+        return instance
+
+    def apply_discount(self, percentage):
+        """Valida y asigna el descuento sin guardar."""
         if percentage < 0 or percentage > 100:
             raise ValueError("El porcentaje de descuento debe estar entre 0 y 100")
         self.dicount_percentage = percentage
         self.on_promotion = percentage > 0
+
+    def clear_promotion(self):
+        """Quita la promoción sin guardar."""
+        self.on_promotion = False
+        self.dicount_percentage = 0
+
+    def setDiscount(self, percentage):
+        self.apply_discount(percentage)
         self.save()
 
     def setPromotion(self, on_promotion):
@@ -41,8 +167,7 @@ class Product(models.Model):
         self.save()
 
     def unSetPromotion(self):
-        self.on_promotion = False
-        self.dicount_percentage = 0
+        self.clear_promotion()
         self.save()
 
     def __str__(self):
@@ -87,15 +212,6 @@ class Product(models.Model):
         self.quantity = quantity or self.quantity
 
         self.save()
-    #metodos para calcular el rating promedio
-    def calculate_average_rating(self):
-        avg = self.ratings.aggregate(average=Avg('rating'))['average']
-        self.average_rating = avg if avg is not None else 0.0
-        self.save()
-
-    def update_average_rating(self):
-        self.calculate_average_rating()
-
 
 
 
@@ -141,7 +257,30 @@ class Category(models.Model):
 
         self.save()
 
-class Order(models.Model):
+class OrderQuerySet(models.QuerySet):
+    def con_detalle(self):
+        """Pedidos con sus líneas (``items`` y ``combos``) y el total de cada tipo de línea.
+
+        Son tres consultas sin importar la cantidad de pedidos; los totales
+        (``products_total`` y ``combos_total``) se suman en la base.
+        """
+        def total(model):
+            subtotales = (
+                model.objects.filter(order=OuterRef('pk'))
+                .order_by().values('order').annotate(total=Sum('subtotal')).values('total')
+            )
+            return Coalesce(Subquery(subtotales), Value(Decimal('0.00')), output_field=DecimalField(max_digits=10, decimal_places=2))
+
+        return self.annotate(
+            products_total=total(OrderContainsProduct),
+            combos_total=total(OrderContainsCombo)
+        ).prefetch_related(
+            Prefetch('ordercontainsproduct_set', queryset=OrderContainsProduct.objects.select_related('product'), to_attr='items'),
+            Prefetch('ordercontainscombo_set', queryset=OrderContainsCombo.objects.select_related('combo'), to_attr='combos')
+        )
+
+
+class Order(UniqueCodeMixin, models.Model):
     STATE_CHOICES = [
         ('S','Solicitado por cliente'),
         ('P','Preparación'),
@@ -155,26 +294,12 @@ class Order(models.Model):
     state = models.CharField(max_length=15, choices=STATE_CHOICES, default='S')
     user = models.ForeignKey('accounts_app.User', on_delete=models.CASCADE, related_name='menu_orders')
     booking = models.ForeignKey('bookings_app.Booking', on_delete=models.CASCADE, null=True, blank=True, related_name='orders')
+    # Los pedidos anteriores al control de stock no descontaron nada, así que al cancelarlos no se devuelve
+    stock_reserved = models.BooleanField(default=False)
 
-    def save(self, *args, **kwargs):
-        if not self.code:
-            self.code = self._generate_unique_code()
-        super().save(*args, **kwargs)
-    
-    def _generate_unique_code(self):
-        """Genera un código único con reintentos para evitar colisiones"""
-        max_attempts = 10
-        for _ in range(max_attempts):
-            code = self.generate_order_code()
-            if not Order.objects.filter(code=code).exists():
-                return code
-        raise ValueError("No se pudo generar un código único después de 10 intentos")
-    
-    def generate_order_code(self):
-        import uuid
-        """Genera un código corto y único basado en UUID"""
-        short_uuid = str(uuid.uuid4()).replace('-', '')[:8].upper()
-        return f'PDD-{short_uuid}'
+    code_generator = order_codes
+
+    objects = OrderQuerySet.as_manager()
 
     def __str__(self):
         return f"Pedido {self.code} - {self.user.username}"
@@ -186,10 +311,7 @@ class OrderContainsProduct(models.Model):
     quantity = models.PositiveIntegerField(default=1)
 
     def save(self, *args, **kwargs):
-        if self.product.on_promotion:
-            self.subtotal = Decimal(self.product.discounted_price) * Decimal(self.quantity)
-        else:
-            self.subtotal = self.product.price * self.quantity
+        self.subtotal = line_subtotal(self.product, self.quantity)
         super().save(*args, **kwargs)
 
 class OrderContainsCombo(models.Model):
@@ -199,13 +321,27 @@ class OrderContainsCombo(models.Model):
     quantity = models.PositiveIntegerField(default=1)
 
     def save(self, *args, **kwargs):
-        if self.combo.on_promotion:
-            self.subtotal = Decimal(self.combo.discounted_price) * Decimal(self.quantity)
-        else:
-            self.subtotal = self.combo.price * self.quantity
+        self.subtotal = line_subtotal(self.combo, self.quantity)
         super().save(*args, **kwargs)
 
-class Rating(models.Model):
+class RatingSnapshotMixin:
+    """Recuerda el ítem y la calificación leídos de la base para aplicar solo la diferencia al editar."""
+    rated_item_field = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.take_rating_snapshot()
+        return instance
+
+    def take_rating_snapshot(self):
+        self._rating_snapshot = (
+            self.__dict__.get(f'{self.rated_item_field}_id'),
+            self.__dict__.get('rating')
+        )
+
+
+class Rating(RatingSnapshotMixin, models.Model):
     title = models.CharField(max_length=15)
     text = models.TextField()
     rating = models.IntegerField()
@@ -213,6 +349,8 @@ class Rating(models.Model):
     product = models.ForeignKey('menu_app.Product', on_delete=models.CASCADE, related_name='ratings')
     user = models.ForeignKey('accounts_app.User', on_delete=models.CASCADE)
 
+    rated_item_field = 'product'
+
     def __str__(self):
         return self.title
     
@@ -256,8 +394,28 @@ class Rating(models.Model):
 
         self.save()
 
+class ComboQuerySet(models.QuerySet):
+    """Cambios en bloque: un único UPDATE e invalidación del menú (update() no dispara señales)."""
+
+    def set_discount(self, percentage):
+        self.model.validate_discount(percentage)
+        return self._update_and_invalidate(dicount_percentage=percentage, on_promotion=percentage > 0)
+
+    def remove_promotion(self):
+        return self._update_and_invalidate(on_promotion=False, dicount_percentage=0)
+
+    def set_active(self, is_active):
+        return self._update_and_invalidate(is_active=is_active)
+
+    def _update_and_invalidate(self, **fields):
+        updated = self.update(**fields)
+        if updated:
+            bump_menu_version()
+        return updated
+
+
 #combos de productos
-class Combo(models.Model):
+class Combo(EffectivePriceMixin, RatingAggregateMixin, models.Model):
     name = models.CharField(max_length=50)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -265,18 +423,27 @@ class Combo(models.Model):
     on_promotion = models.BooleanField(default=False)
     dicount_percentage = models.IntegerField(default=0) # 0 a 80
     is_active = models.BooleanField(default=True)
+    effective_price = models.GeneratedField(
+        expression=effective_price_expression(),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+    )
     avarage_rating = models.FloatField(default=0.0)
-    
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+
+    ratings_related_name = 'comments'
+
+    objects = ComboQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['effective_price'], name='combo_effective_price_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
-    @property
-    def discounted_price(self):
-        if self.on_promotion and self.dicount_percentage > 0:
-            discount_amount = (self.dicount_percentage/100) * float(self.price)
-            return float(self.price) - discount_amount
-        return self.price
-
     def clean(self):
         errors = {}
         if not self.name:
@@ -292,9 +459,13 @@ class Combo(models.Model):
         if errors:
             raise ValidationError(errors)
 
-    def setDiscount(self, percentage):
+    @staticmethod
+    def validate_discount(percentage):
         if percentage < 0 or percentage > 80:
             raise ValueError("El porcentaje de descuento debe estar entre 0 y 80")
+
+    def setDiscount(self, percentage):
+        self.validate_discount(percentage)
         self.dicount_percentage = percentage
         self.on_promotion = percentage > 0
         self.save()
@@ -326,24 +497,112 @@ class Combo(models.Model):
         self.save()
 
     def CalculateComboPrice(self):
-        products = self.products.all()
-        if not products.exists():
+        average_price = self.products.aggregate(average=Avg('price'))['average']
+        if average_price is None:
             raise ValueError("Sin productos para calcular")
-        total_price = sum([product.price for product in products])
-        average_price = total_price / products.count()
-        return average_price
-    #metodos para calcular el rating promedio
-    def calculate_average_rating(self):
-        from django.db.models import Avg
-        avg = self.comments.aggregate(average=Avg('rating'))['average']
-        self.average_rating = avg if avg is not None else 0.0
-        self.save()
+        return Decimal(average_price).quantize(CENTS)
 
-    def update_average_rating(self):
-        self.calculate_average_rating()
+    @classmethod
+    def recalculate_prices(cls, queryset=None):
+        """Recalcula el precio de los combos (promedio de sus productos) con una consulta y un bulk_update.
+
+        Los combos sin productos conservan su precio. Devuelve la cantidad de combos actualizados.
+        """
+        combos = cls.objects.all() if queryset is None else cls.objects.filter(pk__in=queryset.values('pk'))
+        combos = combos.annotate(calculated_price=Avg('products__price')).filter(calculated_price__isnull=False).only('id', 'price')
+        changed = []
+        for combo in combos:
+            price = Decimal(combo.calculated_price).quantize(CENTS)
+            if combo.price != price:
+                combo.price = price
+                changed.append(combo)
+        if changed:
+            cls.objects.bulk_update(changed, ['price'], batch_size=500)
+            bump_menu_version()  # bulk_update no dispara señales
+        return len(changed)
+
+
+class Promotion(models.Model):
+    """Promoción programada (tipo happy hour) sobre productos y combos.
+
+    La primera vez rige entre ``starts_at`` y ``ends_at``; con repetición, la misma
+    franja se repite cada día o cada semana (en hora local). El descuento lo aplica
+    el evaluador de menu_app/utils/promotions.py, que solo lo quita al terminar la
+    franja que él mismo aplicó.
+    """
+    NO_RECURRENCE = 'N'
+    DAILY = 'D'
+    WEEKLY = 'W'
+    RECURRENCE_CHOICES = [
+        (NO_RECURRENCE, 'Sin repetición'),
+        (DAILY, 'Todos los días'),
+        (WEEKLY, 'Todas las semanas'),
+    ]
+    RECURRENCE_PERIODS = {
+        DAILY: timedelta(days=1),
+        WEEKLY: timedelta(weeks=1),
+    }
 
+    name = models.CharField(max_length=50)
+    percentage = models.PositiveIntegerField()  # 1 a 80, el máximo que admiten los combos
+    products = models.ManyToManyField('Product', related_name='promotions', blank=True)
+    combos = models.ManyToManyField('Combo', related_name='promotions', blank=True)
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    recurrence = models.CharField(max_length=1, choices=RECURRENCE_CHOICES, default=NO_RECURRENCE)
+    is_active = models.BooleanField(default=True)
+    # Lo mantiene el evaluador: True mientras el descuento de la promoción está aplicado
+    is_applied = models.BooleanField(default=False, editable=False)
 
-class ComboRating(models.Model):
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        # is_applied lo escribe solo el evaluador: guardar una instancia vieja no lo pisa
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'is_applied'
+            ]
+        super().save(*args, **kwargs)
+
+    def clean(self):
+        errors = {}
+        if self.percentage is None or self.percentage < 1 or self.percentage > 80:
+            errors['percentage'] = "El porcentaje de descuento debe estar entre 1 y 80."
+        if self.starts_at and self.ends_at:
+            period = self.RECURRENCE_PERIODS.get(self.recurrence)
+            if self.ends_at <= self.starts_at:
+                errors['ends_at'] = "El fin de la promoción debe ser posterior al inicio."
+            elif period and self.ends_at - self.starts_at >= period:
+                errors['ends_at'] = "La franja de una promoción que se repite debe ser más corta que el período."
+        if errors:
+            raise ValidationError(errors)
+
+    def get_window(self, now):
+        """Franja (inicio, fin) vigente en ``now`` o la próxima; None si no queda ninguna."""
+        if not self.is_active:
+            return None
+        period = self.RECURRENCE_PERIODS.get(self.recurrence)
+        if period is None:
+            return (self.starts_at, self.ends_at) if now < self.ends_at else None
+
+        # La repetición se calcula en hora local para respetar el horario del restaurante
+        start = timezone.localtime(self.starts_at).replace(tzinfo=None)
+        end = timezone.localtime(self.ends_at).replace(tzinfo=None)
+        local_now = timezone.localtime(now).replace(tzinfo=None)
+        if end <= local_now:
+            skipped = (local_now - end) // period + 1
+            start += skipped * period
+            end += skipped * period
+        return timezone.make_aware(start), timezone.make_aware(end)
+
+    def is_running(self, now):
+        window = self.get_window(now)
+        return window is not None and window[0] <= now < window[1]
+
+
+class ComboRating(RatingSnapshotMixin, models.Model):
     combo = models.ForeignKey(
         "Combo",
         on_delete=models.CASCADE,
@@ -355,6 +614,8 @@ class ComboRating(models.Model):
     rating = models.IntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    rated_item_field = 'combo'
+
     def __str__(self):
         return f"{self.user} - {self.combo} ({self.rating})"
 
@@ -367,4 +628,39 @@ class ComboRating(models.Model):
             errors['text'] = "El comentario no puede estar vacío."
         if rating < 1 or rating > 5:
             errors['rating'] = "La calificación debe estar entre 1 y 5."
-        return errors
\ No newline at end of file
+        return errors
+
+class CartLineQuerySet(models.QuerySet):
+    def del_carrito(self, user, booking_id):
+        return self.filter(user=user, booking_id=booking_id)
+
+    def vencidas(self):
+        """Líneas de carritos cuya reserva ya terminó."""
+        from bookings_app.utils import DateTimeUtils
+        return self.filter(booking__ends_at__lt=DateTimeUtils.get_local_datetime())
+
+
+class CartLine(models.Model):
+    """Una línea del carrito de un usuario para una reserva."""
+    PRODUCT = 'product'
+    COMBO = 'combo'
+    ITEM_TYPE_CHOICES = [
+        (PRODUCT, 'Producto'),
+        (COMBO, 'Combo'),
+    ]
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='cart_lines')
+    booking = models.ForeignKey('bookings_app.Booking', on_delete=models.CASCADE, related_name='cart_lines')
+    item_type = models.CharField(max_length=10, choices=ITEM_TYPE_CHOICES)
+    item_id = models.PositiveIntegerField()
+    quantity = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CartLineQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'booking', 'item_type', 'item_id'], name='unique_cart_line'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.item_type} {self.item_id} x{self.quantity}"
@@ -0,0 +1,152 @@
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from menu_app.models import Product, Category, Combo, Rating, ComboRating, Promotion
+from menu_app.utils.menu_cache import bump_menu_version
+from menu_app.utils.promotions import apply_promotions
+
+
+def get_rated_model(instance):
+    return instance._meta.get_field(instance.rated_item_field).related_model
+
+
+@receiver(post_save, sender=Rating)
+@receiver(post_save, sender=ComboRating)
+def update_rating_aggregates_on_save(sender, instance, created, raw=False, **kwargs):
+    # Los fixtures (raw) se reparan con el comando recalculate_ratings
+    if raw:
+        return
+
+    rated_model = get_rated_model(instance)
+    item_id = getattr(instance, f'{instance.rated_item_field}_id')
+    old_item_id, old_rating = getattr(instance, '_rating_snapshot', (None, None))
+
+    if created:
+        rated_model.apply_rating_delta(item_id, 1, instance.rating)
+    elif old_item_id is None or old_rating is None:
+        # No se conoce el valor anterior: se recalcula solo ese ítem
+        rated_model.recalculate_rating_aggregates(rated_model.objects.filter(pk=item_id))
+    elif old_item_id != item_id:
+        rated_model.apply_rating_delta(old_item_id, -1, -old_rating)
+        rated_model.apply_rating_delta(item_id, 1, instance.rating)
+    elif old_rating != instance.rating:
+        rated_model.apply_rating_delta(item_id, 0, instance.rating - old_rating)
+
+    instance.take_rating_snapshot()
+
+
+@receiver(post_delete, sender=Rating)
+@receiver(post_delete, sender=ComboRating)
+def update_rating_aggregates_on_delete(sender, instance, **kwargs):
+    rated_model = get_rated_model(instance)
+    old_item_id, old_rating = getattr(instance, '_rating_snapshot', (None, None))
+    item_id = old_item_id or getattr(instance, f'{instance.rated_item_field}_id')
+    rating = old_rating if old_rating is not None else instance.rating
+
+    rated_model.apply_rating_delta(item_id, -1, -rating)
+
+
+@receiver(post_save, sender=Product)
+def recalculate_combo_prices_on_product_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    # Un producto nuevo todavía no está en ningún combo
+    if not created and getattr(instance, '_price_snapshot', None) != instance.price:
+        Combo.recalculate_prices(Combo.objects.filter(products=instance))
+    instance._price_snapshot = instance.price
+
+
+@receiver(pre_delete, sender=Product)
+def remember_combos_on_product_delete(sender, instance, **kwargs):
+    # Después del delete ya no quedan las filas de la relación para saber en qué combos estaba
+    instance._combo_ids = list(instance.combos.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Product)
+def recalculate_combo_prices_on_product_delete(sender, instance, **kwargs):
+    combo_ids = getattr(instance, '_combo_ids', None)
+    if combo_ids:
+        Combo.recalculate_prices(Combo.objects.filter(pk__in=combo_ids))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Combo)
+@receiver(post_delete, sender=Combo)
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+@receiver(post_save, sender=ComboRating)
+@receiver(post_delete, sender=ComboRating)
+def invalidate_menu_cache(sender, **kwargs):
+    bump_menu_version()
+
+
+@receiver(m2m_changed, sender=Combo.products.through)
+def update_combos_on_combo_products(sender, instance, action, reverse, pk_set, **kwargs):
+    # Desde el combo se recalcula ese combo; desde el producto (product.combos), los combos tocados
+    if reverse and action == 'pre_clear':
+        instance._combo_ids = list(instance.combos.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        combo_ids = [instance.pk]
+    elif action == 'post_clear':
+        combo_ids = getattr(instance, '_combo_ids', [])
+    else:
+        combo_ids = pk_set
+    Combo.recalculate_prices(Combo.objects.filter(pk__in=combo_ids))
+    bump_menu_version()
+
+
+@receiver(post_save, sender=Promotion)
+def apply_promotions_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        apply_promotions()
+
+
+def is_applied(promotion_pks):
+    # Solo sacar ítems de una promoción con el descuento aplicado les quita el descuento
+    return Promotion.objects.filter(pk__in=promotion_pks, is_applied=True).exists()
+
+
+@receiver(pre_delete, sender=Promotion)
+def remember_targets_on_promotion_delete(sender, instance, **kwargs):
+    instance._released_targets = {
+        Product: list(instance.products.values_list('pk', flat=True)),
+        Combo: list(instance.combos.values_list('pk', flat=True)),
+    } if is_applied([instance.pk]) else None
+
+
+@receiver(post_delete, sender=Promotion)
+def apply_promotions_on_delete(sender, instance, **kwargs):
+    apply_promotions(released=getattr(instance, '_released_targets', None))
+
+
+PROMOTION_TARGET_FIELDS = {
+    Promotion.products.through: 'products',
+    Promotion.combos.through: 'combos',
+}
+
+
+@receiver(m2m_changed, sender=Promotion.products.through)
+@receiver(m2m_changed, sender=Promotion.combos.through)
+def apply_promotions_on_targets(sender, instance, action, reverse, model, pk_set, **kwargs):
+    # Desde la promoción pk_set son ítems; desde el ítem (product.promotions) son promociones
+    item_model = type(instance) if reverse else model
+    if action in ('pre_clear', 'pre_remove'):
+        if reverse:
+            promotions = instance.promotions.all() if action == 'pre_clear' else pk_set
+            items = [instance.pk] if is_applied(promotions) else []
+        elif not is_applied([instance.pk]):
+            items = []
+        elif action == 'pre_clear':
+            items = list(getattr(instance, PROMOTION_TARGET_FIELDS[sender]).values_list('pk', flat=True))
+        else:
+            items = list(pk_set)
+        instance._released_targets = {item_model: items}
+    elif action in ('post_clear', 'post_remove'):
+        apply_promotions(released=getattr(instance, '_released_targets', None))
+    elif action == 'post_add':
+        apply_promotions()
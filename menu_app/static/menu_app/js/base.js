@@ -53,232 +53,82 @@ function toastNoRedirect(message, icon = "warning") {
     });
 }
 
-// Meto los toasts en todos los botones en cualquier template "hijo"
-document.addEventListener("DOMContentLoaded", function () {
-    const btnsAddToOrder = document.querySelectorAll(".add-to-order-btn");
-    const btnsDecFromCart = document.querySelectorAll(".dec-from-cart-btn");
-    const btnsDecComboFromCart = document.querySelectorAll(".dec-combo-from-cart-btn");
-    const btnsDeleteFromCart = document.querySelectorAll(".delete-from-cart-btn");
-    const btnsAddToOrderCombo = document.querySelectorAll(".add-to-order-combo-btn");
-
-    //Productos Individuales
-    btnsAddToOrder.forEach(button => {
-        button.addEventListener("click", function () {
-            const url = this.dataset.url;
-
-            fetch(url, {
-                method: "POST",
-                headers: {
-                    "X-CSRFToken": getCookie("csrftoken"),
-                    "X-Requested-With": "XMLHttpRequest",
-                },
-                body: ""
-            })
-                .then(response => response.json())
-                .then(data => {
-                    if (data.success) {
-                        toastRedirect(data.message, urls.makeOrder, "success");
-                    } else {
-                        if (data.message === "Seleccione primero una reserva.") {
-                            toastRedirect(data.message, urls.makeOrder, "warning");
-                            return;
-                        }
-                        toastNoRedirect(data.message, "error");
-                    }
-                })
-                .catch(error => {
-                    toastNoRedirect("Error al agregar producto", "error");
-                    console.error("Error:", error);
-                });
-        });
-    });
-
-
-    //Decrementar Productos
-    btnsDecFromCart.forEach(button => {
-        button.addEventListener("click", function () {
-            const url = this.dataset.url;
-            const productId = this.dataset.productId;
-
-            fetch(url, {
-                method: "POST",
-                headers: {
-                    "X-CSRFToken": getCookie("csrftoken"),
-                    "Content-Type": "application/json"
-                }
-            })
-                .then(res => res.json())
-                .then(data => {
-                    if (data.success) {
-                        toastNoRedirect(data.message, "success");
-
-                        if (data.cart_empty) {
-                            // reemplazar todo el carrito por el aviso
-                            document.querySelector("#cart-items").innerHTML = `
-    <div class="alert alert-warning text-center">No hay productos en el pedido.</div>
-    `;
-                            // Ocultar total y botón de confirmar
-                            const cartTotal = document.querySelector("#cart-total");
-                            if (cartTotal) {
-                                cartTotal.closest("h4").remove();
-                            }
-
-                            const confirmBtn = document.getElementById("confirm-order-container");
-                            if (confirmBtn) {
-                                confirmBtn.remove();
-                            }
-                        } else {
-                            if (!data.product_removed) {
-                                // Actualizar cantidad del producto y subtotal
-                                document.querySelector(`#cart-quant-prod-${productId}`).textContent = data.quantity;
-                                document.querySelector(`#cart-subtotal-prod-${productId}`).textContent = `$${data.subtotal}`;
-                            } else {
-                                // Eliminar fila completa si quitó todo el producto
-                                document.querySelector(`#row-product-${productId}`).remove();
-                            }
-
-                            // Actualizar total carrito
-                            document.querySelector("#cart-total").textContent = `$${data.total_cart}`;
-                        }
-                    }
-                })
-                .catch(err => console.error("Error al decrementar producto del carrito:", err));
-        });
-    });
-
-    btnsDeleteFromCart.forEach(button => {
-        button.addEventListener("click", function () {
-            const url = this.dataset.url;
-            const productId = this.dataset.productId;
+// Cambios del carrito: los clics en "Agregar a pedido", más, menos y eliminar se acumulan
+// por ítem y se envían juntos al endpoint de actualización del carrito. Todos pasan por la
+// misma cola y los envíos van de a uno, así el servidor los recibe en el orden de los clics.
+const pendingCartChanges = new Map();
+const CART_FLUSH_DELAY_MS = 400;
+let cartFlushTimer = null;
+let cartRequests = Promise.resolve();
+let cartRequestsInFlight = 0;
+
+// make_order.js la reemplaza para redibujar el carrito con la respuesta
+let handleCartResponse = function (data) {
+    if (data.success) {
+        toastRedirect("Pedido actualizado.", urls.makeOrder, "success");
+    } else if (data.message === "Seleccione primero una reserva.") {
+        toastRedirect(data.message, urls.makeOrder, "warning");
+    } else {
+        toastNoRedirect(data.message, "error");
+    }
+};
 
-            fetch(url, {
-                method: "POST",
-                headers: {
-                    "X-CSRFToken": getCookie("csrftoken"),
-                    "Content-Type": "application/json"
-                }
-            })
-                .then(res => res.json())
-                .then(data => {
-                    if (data.success) {
-                        toastNoRedirect(data.message, "success");
+function queueCartChange(type, id, delta) {
+    const key = `${type}-${id}`;
+    const change = pendingCartChanges.get(key) || { type, id, delta: 0 };
+    change.delta += delta;
+    pendingCartChanges.set(key, change);
 
-                        if (data.cart_empty) {
-                            // reemplazar todo el carrito por un aviso
-                            document.querySelector("#cart-items").innerHTML = `
-    <div class="alert alert-warning text-center">No hay productos en el pedido.</div>
-    `;
-                            // Ocultar total y botón de confirmar
-                            const cartTotal = document.querySelector("#cart-total");
-                            if (cartTotal) {
-                                cartTotal.closest("h4").remove();
-                            }
+    clearTimeout(cartFlushTimer);
+    cartFlushTimer = setTimeout(flushCartChanges, CART_FLUSH_DELAY_MS);
+}
 
-                            const confirmBtn = document.getElementById("confirm-order-container");
-                            if (confirmBtn) {
-                                confirmBtn.remove();
-                            }
-                        } else {
-                            // Eliminar fila completa del producto
-                            document.querySelector(`#row-product-${productId}`).remove();
+// Cambios que el servidor todavía no confirmó (en cola o enviados)
+function hasPendingCartChanges() {
+    return pendingCartChanges.size > 0 || cartRequestsInFlight > 0;
+}
 
-                            // Actualizar total carrito
-                            document.querySelector("#cart-total").textContent = `$${data.total_cart}`;
-                        }
-                    }
-                })
-                .catch(err => console.error("Error al eliminar producto del carrito:", err));
-        });
-     });
+function flushCartChanges() {
+    cartFlushTimer = null;
+    const changes = Array.from(pendingCartChanges.values()).filter(change => change.delta !== 0);
+    pendingCartChanges.clear();
+    if (changes.length === 0) return;
 
-    //Combos
-    btnsAddToOrderCombo.forEach(button => {
-        console.log("Listener agregado para combo:", button.dataset.url);
-        button.addEventListener("click", function () {
-            const url = this.dataset.url;
+    cartRequestsInFlight += 1;
+    cartRequests = cartRequests.then(() => sendCartChanges(changes));
+}
 
-            fetch(url, {
-                method: "POST",
-                headers: {
-                    "X-CSRFToken": getCookie("csrftoken"),
-                    "X-Requested-With": "XMLHttpRequest",
-                },
-                body: ""
-            })
-            .then(res => res.json())
-            .then(data => {
-                if (data.success) {
-                    // Redirige o muestra mensaje sin recargar página
-                    toastRedirect(data.message, urls.makeOrder, "success");
-                } else {
-                    if (data.message === "Seleccione primero una reserva.") {
-                        toastRedirect(data.message, urls.makeOrder, "warning");
-                    } else {
-                        toastNoRedirect(data.message, "error");
-                    }
-                }
-            })
-            .catch(err => {
-                console.error("Error al agregar combo:", err);
-                toastNoRedirect("Error al agregar combo", "error");
-            });
+async function sendCartChanges(changes) {
+    let data = null;
+    try {
+        const response = await fetch(urls.updateCart, {
+            method: "POST",
+            headers: {
+                "X-CSRFToken": getCookie("csrftoken"),
+                "X-Requested-With": "XMLHttpRequest",
+                "Content-Type": "application/json",
+            },
+            body: JSON.stringify({ changes }),
         });
-    });
-
+        data = await response.json();
+    } catch (error) {
+        console.error("Error al actualizar carrito:", error);
+        toastNoRedirect("Error inesperado", "error");
+    } finally {
+        cartRequestsInFlight -= 1;
+    }
+    if (data) handleCartResponse(data);
+}
 
-    btnsDecComboFromCart.forEach(button => {
+// Botones "Agregar a pedido" del menú y del detalle de producto
+document.addEventListener("DOMContentLoaded", function () {
+    document.querySelectorAll(".add-to-order-btn, .add-to-order-combo-btn").forEach(button => {
         button.addEventListener("click", function () {
-            const url = this.dataset.url;
-            const productId = this.dataset.productId;
-
-            fetch(url, {
-                method: "POST",
-                headers: {
-                    "X-CSRFToken": getCookie("csrftoken"),
-                    "Content-Type": "application/json"
-                }
-            })
-                .then(res => res.json())
-                .then(data => {
-                    if (data.success) {
-                        toastNoRedirect(data.message, "success");
-
-                        if (data.cart_empty) {
-                            // reemplazar todo el carrito por el aviso
-                            document.querySelector("#cart-items").innerHTML = `
-    <div class="alert alert-warning text-center">No hay productos en el pedido.</div>
-    `;
-                            // Ocultar total y botón de confirmar
-                            const cartTotal = document.querySelector("#cart-total");
-                            if (cartTotal) {
-                                cartTotal.closest("h4").remove();
-                            }
-
-                            const confirmBtn = document.getElementById("confirm-order-container");
-                            if (confirmBtn) {
-                                confirmBtn.remove();
-                            }
-                        } else {
-                            if (!data.combo_removed) {
-                                // Actualizar cantidad del producto y subtotal
-                                document.querySelector(`#cart-quant-prod-${productId}`).textContent = data.quantity;
-                                document.querySelector(`#cart-subtotal-prod-${productId}`).textContent = `$${data.subtotal}`;
-                            } else {
-                                // Eliminar fila completa si quitó todo el producto
-                                document.querySelector(`#row-product-${productId}`).remove();
-                            }
-
-                            // Actualizar total carrito
-                            document.querySelector("#cart-total").textContent = `$${data.total_cart}`;
-                        }
-                    }
-                })
-                .catch(err => console.error("Error al decrementar producto del carrito:", err));
+            queueCartChange(this.dataset.itemType, parseInt(this.dataset.itemId, 10), 1);
         });
     });
-
 });
-      
+
 
 function getCookie(name) {
     let cookieValue = null;
@@ -1,36 +1,88 @@
-// Funcionalidad a todos los botones más
-document.querySelectorAll(".wrapper .plus").forEach(plusBtn => {
-    plusBtn.addEventListener("click", async () => {
-        const wrapper = plusBtn.closest(".wrapper");
-        const productId = wrapper.dataset.productId;
-        const url = wrapper.dataset.incUrl;
-
-        try {
-            const response = await fetch(url, {
-                method: "POST",
-                headers: {
-                    "X-CSRFToken": getCookie("csrftoken"),
-                    "X-Requested-With": "XMLHttpRequest",
-                },
-            });
-
-            const data = await response.json();
-
-            if (data.success) {
-                // Actualizo la cantidad y subtotal
-                document.querySelector(`#cart-quant-prod-${productId}`).textContent = data.quantity;
-                document.querySelector(`#cart-subtotal-prod-${productId}`).textContent = `$${data.subtotal}`;
-                // Actualizo el monto del total carrito
-                document.querySelector("#cart-total").textContent = `$${data.total_cart}`;
-
-                toastNoRedirect(data.message, "success");
-            } else {
-                toastNoRedirect(data.message, "error");
-            }
-
-        } catch (error) {
-            console.error("Error al actualizar carrito:", error);
-            toastNoRedirect("Error inesperado", "error");
+// Más, menos y eliminar del carrito pasan por la cola de cambios de base.js. La página
+// muestra cada clic enseguida y, cuando el servidor confirmó todo, se redibuja con su respuesta.
+const cartItems = document.querySelector("#cart-items");
+
+function cartWrappers() {
+    return Array.from(document.querySelectorAll("#cart-items .wrapper"));
+}
+
+function showEmptyCart() {
+    if (!cartItems.isConnected) return;
+    // Reemplazar todo el carrito por el aviso y ocultar total y botón de confirmar
+    cartItems.outerHTML = `<div class="alert alert-warning text-center">No hay productos en el pedido.</div>`;
+    const cartTotal = document.querySelector("#cart-total");
+    if (cartTotal) {
+        cartTotal.closest("h4").remove();
+    }
+    const confirmBtn = document.getElementById("confirm-order-container");
+    if (confirmBtn) {
+        confirmBtn.remove();
+    }
+}
+
+function setRowQuantity(wrapper, quantity) {
+    if (quantity <= 0) {
+        wrapper.closest("li").remove();
+    } else {
+        wrapper.querySelector(".num").textContent = quantity;
+    }
+}
+
+// Redibuja las filas con las líneas que devolvió el servidor
+function renderCartLines(data) {
+    if (data.cart_empty) {
+        showEmptyCart();
+        return;
+    }
+    const wrappers = cartWrappers();
+    const missingRow = data.lines.some(line => !wrappers.some(
+        wrapper => line.type === wrapper.dataset.itemType && String(line.id) === wrapper.dataset.productId
+    ));
+    if (missingRow) {
+        // El servidor rechazó cambios que ya habían quitado filas de la página
+        window.location.reload();
+        return;
+    }
+    wrappers.forEach(wrapper => {
+        const line = data.lines.find(
+            l => l.type === wrapper.dataset.itemType && String(l.id) === wrapper.dataset.productId
+        );
+        if (line) {
+            setRowQuantity(wrapper, line.quantity);
+            wrapper.closest("li").querySelector("[id^='cart-subtotal-prod-']").textContent = `$${line.subtotal}`;
+        } else {
+            setRowQuantity(wrapper, 0);
         }
     });
-});
\ No newline at end of file
+    document.querySelector("#cart-total").textContent = `$${data.total_cart}`;
+}
+
+handleCartResponse = function (data) {
+    if (data.success) {
+        toastNoRedirect("Pedido actualizado.", "success");
+    } else {
+        toastNoRedirect(data.message, "error");
+    }
+    // Si quedan cambios sin confirmar, la próxima respuesta trae el estado final
+    if (data.lines && !hasPendingCartChanges()) {
+        renderCartLines(data);
+    }
+};
+
+function changeCartRow(wrapper, delta) {
+    const quantity = parseInt(wrapper.querySelector(".num").textContent, 10);
+    // Eliminar quita todas las unidades que se ven, incluidas las que todavía no se enviaron
+    if (delta === null) delta = -quantity;
+
+    queueCartChange(wrapper.dataset.itemType, parseInt(wrapper.dataset.productId, 10), delta);
+    setRowQuantity(wrapper, quantity + delta);
+    if (cartWrappers().length === 0) {
+        showEmptyCart();
+    }
+}
+
+cartWrappers().forEach(wrapper => {
+    wrapper.querySelector(".plus").addEventListener("click", () => changeCartRow(wrapper, 1));
+    wrapper.querySelector(".minus").addEventListener("click", () => changeCartRow(wrapper, -1));
+    wrapper.querySelector(".trash").addEventListener("click", () => changeCartRow(wrapper, null));
+});
@@ -0,0 +1,70 @@
+"""Benchmark de la hidratación del carrito.
+
+No se ejecuta con ``python manage.py test`` (el nombre no sigue el patrón test*.py);
+correrlo explícitamente con:
+
+    python manage.py test menu_app.test.benchmarks.bench_cart
+"""
+import statistics
+import time
+from datetime import date, time as dt_time
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from accounts_app.models import User
+from bookings_app.models import Booking, TimeSlot
+from menu_app.models import Product, Combo, CartLine
+from menu_app.utils.cart import get_cart_products_by_booking
+
+CART_SIZES = (1, 5, 15, 50, 150)
+REPETITIONS = 30
+
+
+class CartHydrationBenchmark(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="bench", password="pass")
+        time_slot = TimeSlot.objects.create(name="Noche", start_time=dt_time(20, 0), end_time=dt_time(22, 0))
+        cls.products = Product.objects.bulk_create([
+            Product(name=f"Producto {i}", description="desc", price=10, quantity=50)
+            for i in range(max(CART_SIZES))
+        ])
+        cls.combos = Combo.objects.bulk_create([
+            Combo(name=f"Combo {i}", description="desc", price=30)
+            for i in range(max(CART_SIZES))
+        ])
+
+        cls.bookings = {}
+        for size in CART_SIZES:
+            booking = Booking.objects.create(
+                code=f"BENCH-{size}", user=cls.user, time_slot=time_slot, date=date(2030, 1, 1), approved=True
+            )
+            # Mitad productos y mitad combos
+            CartLine.objects.bulk_create([
+                CartLine(user=cls.user, booking=booking, item_type=CartLine.COMBO, item_id=cls.combos[i].id)
+                if i % 2 else
+                CartLine(user=cls.user, booking=booking, item_type=CartLine.PRODUCT, item_id=cls.products[i].id)
+                for i in range(size)
+            ])
+            cls.bookings[size] = booking.id
+
+    def test_benchmark(self):
+        print(f"\n{'líneas':>8} {'consultas':>10} {'mediana ms':>11}")
+        query_counts = set()
+        for size in CART_SIZES:
+            booking_id = self.bookings[size]
+            with CaptureQueriesContext(connection) as queries:
+                get_cart_products_by_booking(self.user, booking_id)
+            query_counts.add(len(queries))
+
+            timings = []
+            for _ in range(REPETITIONS):
+                start = time.perf_counter()
+                get_cart_products_by_booking(self.user, booking_id)
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"{size:>8} {len(queries):>10} {statistics.median(timings):>11.3f}")
+
+        # Las líneas más una consulta por tipo de ítem, sin importar el tamaño del carrito
+        self.assertLessEqual(max(query_counts), 3)
@@ -0,0 +1,87 @@
+"""Benchmark del cálculo de precios de un carrito.
+
+Compara el cálculo anterior (precio con descuento como float, pasado a Decimal en
+cada línea, y en productos el porcentaje dividido por 80), uno en centavos enteros
+y el de menu_app/utils/pricing.py (Decimal ya redondeado por la base). No usa la base; correrlo explícitamente con:
+
+    python manage.py test menu_app.test.benchmarks.bench_pricing
+"""
+import random
+import statistics
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+from menu_app.utils.pricing import price_lines
+
+CART_SIZES = (1, 5, 15, 50, 150)
+REPETITIONS = 200
+
+
+def legacy_discounted_price(item):
+    # Reglas anteriores a la columna effective_price: mezclaban float y Decimal, y la
+    # de Product dividía el porcentaje por 80 en lugar de 100
+    if item.on_promotion and item.dicount_percentage > 0:
+        divisor = 100 if item.is_combo else 80
+        discount_amount = (item.dicount_percentage / divisor) * float(item.price)
+        return float(item.price) - discount_amount
+    return item.price
+
+
+def legacy_price_lines(lines):
+    subtotals, total = [], Decimal("0.00")
+    for item, quantity in lines:
+        if item.on_promotion:
+            subtotal = Decimal(legacy_discounted_price(item)) * Decimal(quantity)
+        else:
+            subtotal = item.price * quantity
+        subtotals.append(subtotal)
+        total += subtotal
+    return subtotals, total
+
+
+def cents_price_lines(lines):
+    cents = [int(item.effective_price.scaleb(2)) * quantity for item, quantity in lines]
+    return [Decimal(c).scaleb(-2) for c in cents], Decimal(sum(cents)).scaleb(-2)
+
+
+def make_item(pk, rng):
+    price = Decimal(rng.randrange(100, 50000)).scaleb(-2)
+    percentage = rng.choice((0, 0, 10, 15, 33))
+    effective = (price * (100 - percentage) / 100).quantize(Decimal("0.01")) if percentage else price
+    return SimpleNamespace(
+        pk=pk, price=price, on_promotion=percentage > 0, dicount_percentage=percentage,
+        effective_price=effective, is_combo=rng.random() < 0.3
+    )
+
+
+class PricingBenchmark(SimpleTestCase):
+    def median_ms(self, function, lines):
+        timings = []
+        for _ in range(REPETITIONS):
+            start = time.perf_counter()
+            function(lines)
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def test_benchmark(self):
+        rng = random.Random(42)
+        items = [make_item(pk, rng) for pk in range(max(CART_SIZES))]
+
+        print(f"\n{'líneas':>8} {'anterior ms':>12} {'centavos ms':>12} {'actual ms':>10} {'difieren':>9}")
+        for size in CART_SIZES:
+            lines = [(items[i], rng.randint(1, 5)) for i in range(size)]
+            legacy_subtotals, _ = legacy_price_lines(lines)
+            subtotals, total = price_lines(lines)
+
+            # Mismo resultado que en centavos; el anterior difiere por el float y por el 80 de los productos
+            self.assertEqual((subtotals, total), cents_price_lines(lines))
+            differ = sum(1 for old, new in zip(legacy_subtotals, subtotals) if old != new)
+
+            print(
+                f"{size:>8} {self.median_ms(legacy_price_lines, lines):>12.4f}"
+                f" {self.median_ms(cents_price_lines, lines):>12.4f}"
+                f" {self.median_ms(price_lines, lines):>10.4f} {differ:>9}"
+            )
@@ -0,0 +1,139 @@
+from django.test import TestCase
+from django.urls import reverse
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from accounts_app.models import User
+from menu_app.models import Product, Category, Combo
+from menu_app.utils.menu_cache import get_menu_version
+
+
+def count_updates(queries, table):
+    return sum(1 for query in queries if query['sql'].startswith(f'UPDATE "{table}"'))
+
+
+class BaseAdminTestCase(TestCase):
+    """Clase base con un superusuario logueado y algunos productos"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(username="admin", password="admin123", email="admin@example.com")
+        self.client.login(username="admin", password="admin123")
+        self.category = Category.objects.create(name="Categoría 1", isActive=True)
+        self.products = [
+            Product.objects.create(
+                name=f"Producto {i}", description="Descripción", price=10 * i, quantity=5, category=self.category
+            )
+            for i in range(1, 4)
+        ]
+
+    def create_combos(self, count):
+        combos = []
+        for i in range(count):
+            combo = Combo.objects.create(name=f"Combo {i}", description="Descripción", price=100)
+            combo.products.set(self.products)
+            combos.append(combo)
+        return combos
+
+
+class ComboAdminTest(BaseAdminTestCase):
+    def get_changelist(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("admin:menu_app_combo_changelist"))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_query_count_is_constant(self):
+        """Test que verifica que los productos de los combos se traen en una sola consulta"""
+        self.create_combos(1)
+        queries_one = self.get_changelist()
+        self.create_combos(5)
+        self.assertEqual(self.get_changelist(), queries_one)
+
+    def post_action(self, action, combos):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("admin:menu_app_combo_changelist"), {
+                "action": action,
+                "_selected_action": [combo.pk for combo in combos],
+            })
+        self.assertEqual(response.status_code, 302)
+        return count_updates(queries, "menu_app_combo")
+
+    def test_promotion_actions_use_one_update(self):
+        """Test que verifica que las promociones se aplican y quitan con un único UPDATE"""
+        combos = self.create_combos(4)
+        version = get_menu_version()
+
+        self.assertEqual(self.post_action("apply_promotion", combos), 1)
+        self.assertEqual(
+            list(Combo.objects.values_list("on_promotion", "dicount_percentage").distinct()), [(True, 20)]
+        )
+        self.assertNotEqual(get_menu_version(), version)
+
+        self.assertEqual(self.post_action("remove_promotion", combos[:2]), 1)
+        self.assertEqual(Combo.objects.filter(on_promotion=False, dicount_percentage=0).count(), 2)
+
+    def test_set_discount_is_validated(self):
+        """Test que verifica que el descuento en bloque se valida antes de actualizar"""
+        self.create_combos(2)
+        with self.assertRaises(ValueError):
+            Combo.objects.all().set_discount(90)
+        self.assertFalse(Combo.objects.filter(on_promotion=True).exists())
+
+
+class ProductAdminTest(BaseAdminTestCase):
+    def post_changelist(self, rows):
+        data = {
+            "form-TOTAL_FORMS": str(len(self.products)),
+            "form-INITIAL_FORMS": str(len(self.products)),
+            "_save": "Guardar",
+        }
+        for i, product in enumerate(self.products):
+            on_promotion, percentage = rows.get(product.pk, (product.on_promotion, product.dicount_percentage))
+            data[f"form-{i}-id"] = str(product.pk)
+            data[f"form-{i}-dicount_percentage"] = str(percentage)
+            if on_promotion:
+                data[f"form-{i}-on_promotion"] = "on"
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("admin:menu_app_product_changelist"), data)
+        self.assertEqual(response.status_code, 302)
+        return count_updates(queries, "menu_app_product")
+
+    def test_changelist_selects_category(self):
+        """Test que verifica que la categoría de cada producto no genera consultas extra"""
+        with CaptureQueriesContext(connection) as queries_three:
+            self.client.get(reverse("admin:menu_app_product_changelist"))
+        for i in range(4, 8):
+            Product.objects.create(name=f"Producto {i}", description="Descripción", price=10, quantity=5, category=self.category)
+        with CaptureQueriesContext(connection) as queries_seven:
+            self.client.get(reverse("admin:menu_app_product_changelist"))
+        self.assertEqual(len(queries_seven), len(queries_three))
+
+    def test_list_editable_writes_once_per_changed_row(self):
+        """Test que verifica una única escritura por fila editada desde la lista"""
+        first, second, _ = self.products
+        updates = self.post_changelist({first.pk: (True, 30), second.pk: (True, 0)})
+
+        self.assertEqual(updates, 2)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.on_promotion, first.dicount_percentage), (True, 30))
+        # Sin porcentaje la promoción no queda activa
+        self.assertEqual((second.on_promotion, second.dicount_percentage), (False, 0))
+
+    def test_change_form_saves_once(self):
+        """Test que verifica que guardar desde el formulario escribe el producto una sola vez"""
+        product = self.products[0]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("admin:menu_app_product_change", args=[product.pk]), {
+                "name": "Producto editado",
+                "description": "Descripción",
+                "price": "15",
+                "is_available": "on",
+                "quantity": "5",
+                "category": str(self.category.pk),
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(count_updates(queries, "menu_app_product"), 1)
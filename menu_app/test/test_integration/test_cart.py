@@ -0,0 +1,254 @@
+from datetime import date, time, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.db import IntegrityError, connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts_app.models import User
+from bookings_app.models import Booking, TimeSlot
+from menu_app.models import Product, Combo, CartLine, Order, OrderContainsProduct, OrderContainsCombo
+
+
+class CartTestCase(TestCase):
+    """Clase base: cliente logueado con una reserva seleccionada"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="cliente", password="pass")
+        time_slot = TimeSlot.objects.create(name="Noche", start_time=time(20, 0), end_time=time(22, 0))
+        self.booking = Booking.objects.create(
+            code="RES-1", user=self.user, time_slot=time_slot,
+            date=date.today() + timedelta(days=1), approved=True, approval_date=date.today()
+        )
+        self.product = Product.objects.create(name="Producto", description="desc", price=10, quantity=2)
+        self.combo = Combo.objects.create(name="Combo", description="desc", price=30)
+
+        self.client.login(username="cliente", password="pass")
+        session = self.client.session
+        session['booking_selected_id'] = self.booking.id
+        session.save()
+
+
+class CartViewsTest(CartTestCase):
+    def test_add_to_order_stores_line(self):
+        """Test que verifica que agregar un producto guarda la línea en CartLine y no en la sesión"""
+        response = self.client.post(reverse('menu_app:add_to_order', args=[self.product.id]))
+        self.assertEqual(response.json()['quantity'], 1)
+        self.assertEqual(float(response.json()['total_cart']), 10)
+
+        line = CartLine.objects.get()
+        self.assertEqual((line.item_type, line.item_id, line.quantity), (CartLine.PRODUCT, self.product.id, 1))
+        self.assertNotIn('cart', self.client.session)
+
+    def test_add_to_order_respects_stock(self):
+        """Test que verifica que no se pueden agregar más unidades que el stock por pedido"""
+        url = reverse('menu_app:add_to_order', args=[self.product.id])
+        self.client.post(url)
+        self.client.post(url)
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(CartLine.objects.get().quantity, 2)
+
+    def test_decrement_and_remove_combo(self):
+        """Test que verifica decrementar y quitar combos del carrito"""
+        url = reverse('menu_app:add_combo_to_order', args=[self.combo.id])
+        self.client.post(url)
+        self.client.post(url)
+
+        response = self.client.post(reverse('menu_app:decrement_combo_from_cart', args=[self.combo.id]))
+        self.assertEqual(response.json()['quantity'], 1)
+
+        response = self.client.post(reverse('menu_app:remove_combo_all_from_cart', args=[self.combo.id]))
+        self.assertTrue(response.json()['cart_empty'])
+        self.assertFalse(CartLine.objects.exists())
+
+    def test_deleted_booking_is_rejected(self):
+        """Test que verifica que una reserva borrada en la sesión no llega al carrito"""
+        self.booking.delete()
+        for url in (reverse('menu_app:add_to_order', args=[self.product.id]),
+                    reverse('menu_app:add_combo_to_order', args=[self.combo.id])):
+            response = self.client.post(url)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['message'], "Seleccione primero una reserva.")
+        self.assertNotIn('booking_selected_id', self.client.session)
+        self.assertFalse(CartLine.objects.exists())
+
+    def test_other_users_booking_is_rejected(self):
+        """Test que verifica que no se puede usar el carrito de una reserva de otro usuario"""
+        other = User.objects.create_user(username="otro", password="pass")
+        self.booking.user = other
+        self.booking.save()
+        response = self.client.post(reverse('menu_app:add_to_order', args=[self.product.id]))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(CartLine.objects.exists())
+
+    def test_session_cart_is_imported(self):
+        """Test que verifica que un carrito guardado en la sesión se migra a CartLine"""
+        session = self.client.session
+        session['cart'] = {
+            str(self.booking.id): {str(self.product.id): {'quantity': 2}, f'combo_{self.combo.id}': {'quantity': 1}},
+            '9999': {str(self.product.id): {'quantity': 1}},  # reserva inexistente: se descarta
+        }
+        session.save()
+
+        response = self.client.get(reverse('make_order'))
+
+        self.assertEqual(len(response.context['carrito_reserva']), 2)
+        self.assertEqual(CartLine.objects.count(), 2)
+        self.assertNotIn('cart', self.client.session)
+
+    def test_confirm_order_clears_cart(self):
+        """Test que verifica que confirmar el pedido crea la orden y vacía el carrito"""
+        self.client.post(reverse('menu_app:add_to_order', args=[self.product.id]))
+        self.client.post(reverse('menu_app:add_combo_to_order', args=[self.combo.id]))
+
+        self.client.post(reverse('confirm_order'))
+
+        order = Order.objects.get()
+        self.assertEqual(order.amount, 40)
+        self.assertFalse(CartLine.objects.exists())
+
+
+class UpdateCartViewTest(CartTestCase):
+    def post_changes(self, changes):
+        return self.client.post(
+            reverse('menu_app:update_cart'), {'changes': changes}, content_type='application/json'
+        )
+
+    def test_applies_all_changes(self):
+        """Test que verifica que se aplican varios cambios y se devuelven líneas y total"""
+        response = self.post_changes([
+            {'type': 'product', 'id': self.product.id, 'delta': 2},
+            {'type': 'combo', 'id': self.combo.id, 'delta': 1},
+        ])
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertEqual(
+            [(line['type'], line['id'], line['quantity']) for line in data['lines']],
+            [('product', self.product.id, 2), ('combo', self.combo.id, 1)]
+        )
+        self.assertEqual(float(data['total_cart']), 50)
+
+    def test_negative_delta_removes_line(self):
+        """Test que verifica que un delta negativo que deja la cantidad en 0 borra la línea"""
+        self.post_changes([{'type': 'combo', 'id': self.combo.id, 'delta': 2}])
+        data = self.post_changes([{'type': 'combo', 'id': self.combo.id, 'delta': -5}]).json()
+        self.assertTrue(data['cart_empty'])
+        self.assertFalse(CartLine.objects.exists())
+
+    def test_limit_rolls_back_whole_batch(self):
+        """Test que verifica que si un cambio supera su límite no se aplica ninguno"""
+        response = self.post_changes([
+            {'type': 'combo', 'id': self.combo.id, 'delta': 1},
+            {'type': 'product', 'id': self.product.id, 'delta': 3},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(CartLine.objects.exists())
+        # La respuesta trae el carrito real para que la página deshaga lo que ya mostró
+        self.assertEqual(response.json()['lines'], [])
+        self.assertTrue(response.json()['cart_empty'])
+
+    def test_integrity_error_returns_409(self):
+        """Test que verifica que si el carrito no se puede actualizar se responde un error y no un 500"""
+        with mock.patch('menu_app.utils.cart.CartStore.apply_deltas', side_effect=IntegrityError):
+            response = self.post_changes([{'type': 'product', 'id': self.product.id, 'delta': 1}])
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(response.json()['success'])
+
+    def test_deleted_booking_is_rejected(self):
+        """Test que verifica que una reserva borrada se rechaza con el aviso de seleccionar reserva"""
+        self.booking.delete()
+        response = self.post_changes([{'type': 'product', 'id': self.product.id, 'delta': 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['message'], "Seleccione primero una reserva.")
+
+    def test_combo_limit(self):
+        """Test que verifica el máximo de combos por pedido"""
+        response = self.post_changes([{'type': 'combo', 'id': self.combo.id, 'delta': 4}])
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_payload(self):
+        """Test que verifica que un cuerpo inválido o un ítem inexistente se rechazan"""
+        self.assertEqual(self.post_changes([{'type': 'bebida', 'id': 1, 'delta': 1}]).status_code, 400)
+        self.assertEqual(self.post_changes([]).status_code, 400)
+        self.assertEqual(self.post_changes([{'type': 'product', 'id': 9999, 'delta': 1}]).status_code, 404)
+
+    def test_constant_query_count(self):
+        """Test que verifica que la cantidad de consultas no depende de la cantidad de cambios"""
+        extra = [
+            Product.objects.create(name=f"Extra {i}", description="desc", price=5, quantity=5)
+            for i in range(10)
+        ]
+        self.post_changes([{'type': 'product', 'id': self.product.id, 'delta': 1}])
+
+        # incluye la consulta que verifica que la reserva es del usuario
+        with self.assertNumQueries(10):
+            self.post_changes([{'type': 'product', 'id': p.id, 'delta': 1} for p in extra])
+
+
+class ConfirmOrderViewTest(CartTestCase):
+    def fill_cart(self, products):
+        for product in products:
+            CartLine.objects.create(
+                user=self.user, booking=self.booking, item_type=CartLine.PRODUCT, item_id=product.id, quantity=2
+            )
+        CartLine.objects.create(
+            user=self.user, booking=self.booking, item_type=CartLine.COMBO, item_id=self.combo.id, quantity=1
+        )
+
+    def confirm_and_count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('confirm_order'))
+        return len(queries)
+
+    def test_creates_order_lines_with_subtotals(self):
+        """Test que verifica que se crean las líneas del pedido con subtotales y monto correctos"""
+        self.product.on_promotion = True
+        self.product.dicount_percentage = 20
+        self.product.save()
+        self.fill_cart([self.product])
+
+        self.client.post(reverse('confirm_order'))
+
+        order = Order.objects.get()
+        line = OrderContainsProduct.objects.get(order=order)
+        self.assertEqual(line.quantity, 2)
+        self.assertEqual(line.subtotal, Decimal(self.product.discounted_price) * 2)
+        self.assertEqual(OrderContainsCombo.objects.get(order=order).subtotal, 30)
+        self.assertEqual(order.amount, line.subtotal + 30)
+
+    def test_query_count_does_not_grow_with_cart(self):
+        """Test que verifica que confirmar un carrito grande no hace más consultas que uno chico"""
+        self.fill_cart([self.product])
+        small = self.confirm_and_count_queries()
+
+        extra = [
+            Product.objects.create(name=f"Extra {i}", description="desc", price=5, quantity=5)
+            for i in range(15)
+        ]
+        self.fill_cart(extra)
+        self.assertEqual(self.confirm_and_count_queries(), small)
+        self.assertEqual(OrderContainsProduct.objects.filter(order=Order.objects.last()).count(), 15)
+
+    def test_failure_leaves_no_partial_order(self):
+        """Test que verifica que si falla la creación de las líneas no queda un pedido a medias"""
+        self.fill_cart([self.product])
+
+        with mock.patch.object(OrderContainsCombo.objects, 'bulk_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.post(reverse('confirm_order'))
+
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderContainsProduct.objects.exists())
+        self.assertEqual(CartLine.objects.count(), 2)
+
+    def test_missing_items_are_skipped(self):
+        """Test que verifica que los ítems borrados no rompen la confirmación"""
+        self.fill_cart([self.product])
+        self.combo.delete()
+
+        self.client.post(reverse('confirm_order'))
+
+        self.assertEqual(Order.objects.get().amount, 20)
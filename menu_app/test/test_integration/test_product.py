@@ -1,14 +1,20 @@
 from django.test import Client, TestCase
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
-from menu_app.models import Product, Category
+from accounts_app.models import User
+from menu_app.models import Product, Category, Combo, Rating, ComboRating
+from menu_app.utils.promotions import apply_promotions
 
 
 class BaseProductTestCase(TestCase):
     """Clase base con la configuración común para todos los tests de productos"""
 
     def setUp(self):
+        cache.clear()
         fake_image = SimpleUploadedFile(
             name="test.jpg", content=b"file_content", content_type="image/jpeg"
         )
@@ -77,3 +83,171 @@ class ProductDetailViewTest(BaseProductTestCase):
         self.assertTemplateUsed(response, "menu_app/product_detail.html")
         self.assertIn("product", response.context)
         self.assertEqual(response.context["product"].id, self.product1.id)
+
+
+class MenuListViewQueriesTest(BaseProductTestCase):
+    """Tests para la cantidad de consultas de la vista del menú"""
+
+    def add_menu_items(self, count):
+        """Agrega productos con comentarios y combos al menú"""
+        user = User.objects.create_user(username=f"usuario{Product.objects.count()}", password="pass")
+        for i in range(count):
+            product = Product.objects.create(
+                name=f"Producto extra {Product.objects.count()}",
+                description="Descripción",
+                price=5,
+                quantity=3,
+                category=self.category
+            )
+            Rating.objects.create(title="Bueno", text="Muy bueno", rating=4, product=product, user=user)
+            combo = Combo.objects.create(name=f"Combo {i}", description="Descripción", price=12)
+            combo.products.add(product, self.product1)
+            ComboRating.objects.create(combo=combo, user=user, title="Rico", text="Muy rico", rating=5)
+
+    def test_menu_query_count_is_constant(self):
+        """Test que verifica que el menú usa la misma cantidad de consultas sin importar su tamaño"""
+        self.add_menu_items(1)
+        apply_promotions()  # el próximo cambio de promociones ya calculado, como en producción
+        with self.assertNumQueries(3):
+            self.client.get(reverse("menu_app:menu"))
+
+        self.add_menu_items(10)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("menu_app:menu"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["combos"]), 11)
+
+    def test_menu_does_not_write(self):
+        """Test que verifica que mostrar el menú no guarda nada en la base de datos"""
+        self.add_menu_items(2)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("menu_app:menu"))
+
+        self.assertTrue(all(q["sql"].lstrip().upper().startswith("SELECT") for q in queries.captured_queries))
+
+    def test_menu_average_rating(self):
+        """Test que verifica el promedio de rating que muestra el menú"""
+        user = User.objects.create_user(username="critico", password="pass")
+        Rating.objects.create(title="Bueno", text="Bueno", rating=4, product=self.product1, user=user)
+        Rating.objects.create(title="Malo", text="Malo", rating=2, product=self.product1, user=user)
+
+        response = self.client.get(reverse("menu_app:menu"))
+
+        products = response.context["categorized_items"][self.category]
+        self.assertEqual(products[0].average_rating, 3.0)
+        self.assertEqual(products[1].average_rating, 0.0)
+
+
+class MenuListViewCacheTest(BaseProductTestCase):
+    """Tests para el cache de fragmentos del menú"""
+
+    def test_repeated_menu_is_served_from_cache(self):
+        """Test que verifica que un menú sin cambios no consulta la base de datos"""
+        self.client.get(reverse("menu_app:menu"))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("menu_app:menu"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Producto 1")
+        self.assertContains(response, "csrfmiddlewaretoken")
+
+    def test_product_change_invalidates_menu(self):
+        """Test que verifica que modificar un producto invalida el menú cacheado"""
+        self.client.get(reverse("menu_app:menu"))
+        self.product1.name = "Producto renombrado"
+        self.product1.save()
+
+        response = self.client.get(reverse("menu_app:menu"))
+        self.assertContains(response, "Producto renombrado")
+
+    def test_combo_products_change_invalidates_menu(self):
+        """Test que verifica que cambiar los productos de un combo invalida el menú cacheado"""
+        combo = Combo.objects.create(name="Combo 1", description="Descripción", price=25)
+        self.client.get(reverse("menu_app:menu"))
+        combo.products.add(self.product2)
+
+        response = self.client.get(reverse("menu_app:menu"))
+        self.assertEqual([p.id for p in response.context["combos"][0].products.all()], [self.product2.id])
+
+    def test_cache_varies_on_authentication(self):
+        """Test que verifica que un usuario logueado no recibe los botones del visitante anónimo"""
+        self.client.get(reverse("menu_app:menu"))
+        User.objects.create_user(username="cliente", password="pass")
+        self.client.login(username="cliente", password="pass")
+
+        response = self.client.get(reverse("menu_app:menu"))
+        self.assertContains(response, "Agregar a pedido")
+        self.assertNotContains(response, "Iniciar sesión para pedir")
+
+
+class CommentsViewTest(BaseProductTestCase):
+    """Tests para los endpoints paginados de comentarios"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="critico", password="pass", name="Ana", last_name="Lopez")
+        for i in range(5):
+            Rating.objects.create(title=f"Título {i}", text="Texto", rating=4, product=self.product1, user=self.user)
+
+    def test_first_page_newest_first(self):
+        """Test que verifica que la primera página trae los comentarios más nuevos"""
+        response = self.client.get(reverse("menu_app:product_comments", args=[self.product1.id]), {"limit": 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        data = response.json()
+        self.assertEqual([c["title"] for c in data["comments"]], ["Título 4", "Título 3"])
+        self.assertEqual(data["comments"][0]["user"], "Ana Lopez")
+        self.assertIsNotNone(data["next_cursor"])
+
+    def test_follow_cursor_until_last_page(self):
+        """Test que verifica que el cursor recorre todos los comentarios sin repetir"""
+        url = reverse("menu_app:product_comments", args=[self.product1.id])
+        titles, cursor = [], None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            data = self.client.get(url, params).json()
+            titles += [c["title"] for c in data["comments"]]
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+
+        self.assertEqual(titles, [f"Título {i}" for i in range(4, -1, -1)])
+
+    def test_page_query_count_is_constant(self):
+        """Test que verifica que cada página cuesta las mismas consultas"""
+        url = reverse("menu_app:product_comments", args=[self.product1.id])
+        cursor = self.client.get(url, {"limit": 2}).json()["next_cursor"]
+        with self.assertNumQueries(2):  # producto + página de comentarios
+            self.client.get(url, {"limit": 2, "cursor": cursor})
+
+    def test_invalid_cursor(self):
+        """Test que verifica que un cursor inválido devuelve 400"""
+        response = self.client.get(reverse("menu_app:product_comments", args=[self.product1.id]), {"cursor": "xxx"})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()["success"])
+
+    def test_unknown_product(self):
+        """Test que verifica que un producto inexistente devuelve 404"""
+        response = self.client.get(reverse("menu_app:product_comments", args=[9999]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_combo_comments(self):
+        """Test que verifica el endpoint de comentarios de combos"""
+        combo = Combo.objects.create(name="Combo", description="Descripción", price=25)
+        ComboRating.objects.create(combo=combo, user=self.user, title="Rico", text="Muy rico", rating=5)
+
+        data = self.client.get(reverse("menu_app:combo_comments", args=[combo.id])).json()
+
+        self.assertEqual([c["title"] for c in data["comments"]], ["Rico"])
+        self.assertIsNone(data["next_cursor"])
+
+    def test_menu_does_not_inline_comments(self):
+        """Test que verifica que el menú no incluye el texto de los comentarios"""
+        self.client.login(username="critico", password="pass")
+        response = self.client.get(reverse("menu_app:menu"))
+        self.assertNotContains(response, "Título 4")
+        self.assertContains(response, reverse("menu_app:product_comments", args=[self.product1.id]))
@@ -0,0 +1,115 @@
+import threading
+from datetime import date
+
+from django.contrib.messages import get_messages
+from django.db import OperationalError, close_old_connections, connection, transaction
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from menu_app.models import Product, CartLine, Order, OrderContainsProduct
+from menu_app.test.test_integration.test_cart import CartTestCase
+from menu_app.utils.stock import reserve_stock, StockShortage
+
+
+class OrderStockTest(CartTestCase):
+    def add_to_cart(self, product, quantity):
+        CartLine.objects.create(
+            user=self.user, booking=self.booking, item_type=CartLine.PRODUCT, item_id=product.id, quantity=quantity
+        )
+
+    def test_confirm_reserves_stock(self):
+        """Test que verifica que confirmar un pedido descuenta el stock"""
+        self.add_to_cart(self.product, 2)
+        self.client.post(reverse('confirm_order'))
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 0)
+        self.assertTrue(Order.objects.get().stock_reserved)
+
+    def test_confirm_with_shortage_creates_nothing(self):
+        """Test que verifica que sin stock suficiente no se crea el pedido y se informa el faltante"""
+        self.add_to_cart(self.product, 2)
+        self.product.quantity = 1
+        self.product.save()
+
+        response = self.client.post(reverse('confirm_order'))
+
+        self.assertRedirects(response, reverse('make_order'), fetch_redirect_response=False)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(CartLine.objects.count(), 1)
+        self.assertIn('Solo quedan 1 unidades de "Producto"', str(list(get_messages(response.wsgi_request))[0]))
+
+    def test_cancel_releases_stock_once(self):
+        """Test que verifica que cancelar devuelve el stock una sola vez"""
+        self.add_to_cart(self.product, 2)
+        self.client.post(reverse('confirm_order'))
+        order = Order.objects.get()
+
+        url = reverse('bookings_app:cancel_order', args=[order.pk])
+        self.client.post(url)
+        self.client.post(url)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 2)
+        order.refresh_from_db()
+        self.assertEqual(order.state, 'C')
+
+    def test_cancel_legacy_order_does_not_release(self):
+        """Test que verifica que cancelar un pedido que no reservó stock no lo aumenta"""
+        order = Order.objects.create(user=self.user, booking=self.booking, buyDate=date.today())
+        OrderContainsProduct.objects.create(order=order, product=self.product, quantity=2)
+
+        self.client.post(reverse('bookings_app:cancel_order', args=[order.pk]))
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 2)
+
+
+class StockStressTest(TransactionTestCase):
+    """Muchas confirmaciones en paralelo sobre el mismo producto no pueden sobrevender."""
+    THREADS = 12
+    INITIAL_STOCK = 5
+
+    def setUp(self):
+        self.product = Product.objects.create(
+            name="Pizza", description="desc", price=10, quantity=self.INITIAL_STOCK
+        )
+
+    def test_no_oversell_under_parallel_reservations(self):
+        """Test que verifica que el stock nunca queda negativo ni se reserva de más"""
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+        lock = threading.Lock()
+
+        def confirm():
+            outcome = 'error'
+            try:
+                barrier.wait()
+                for _ in range(50):  # reintenta si SQLite tiene la tabla bloqueada
+                    try:
+                        with transaction.atomic():
+                            reserve_stock({self.product.id: 1})
+                        outcome = 'ok'
+                        break
+                    except StockShortage:
+                        outcome = 'shortage'
+                        break
+                    except OperationalError:
+                        continue
+            finally:
+                with lock:
+                    results.append(outcome)
+                connection.close()
+
+        threads = [threading.Thread(target=confirm) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        close_old_connections()
+
+        self.product.refresh_from_db()
+        reserved = results.count('ok')
+        self.assertEqual(reserved, self.INITIAL_STOCK)
+        self.assertEqual(results.count('shortage'), self.THREADS - self.INITIAL_STOCK)
+        self.assertEqual(self.product.quantity, 0)
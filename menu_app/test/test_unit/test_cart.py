@@ -0,0 +1,175 @@
+from datetime import date, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase
+
+from accounts_app.models import User
+from bookings_app.models import Booking, TimeSlot
+from menu_app.models import Product, Combo, CartLine
+from menu_app.utils.cart import CartStore, CartLimitExceeded, get_cart_products_by_booking
+
+
+class CartTestMixin:
+    def create_booking(self, code="RES-1", fecha=None):
+        return Booking.objects.create(
+            code=code, user=self.user, time_slot=self.time_slot,
+            date=fecha or date.today() + timedelta(days=1), approved=True
+        )
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="cliente", password="pass")
+        self.time_slot = TimeSlot.objects.create(name="Noche", start_time=time(20, 0), end_time=time(22, 0))
+        self.booking = self.create_booking()
+        self.cart = CartStore(self.user, self.booking.id)
+
+
+class CartHydrationTest(CartTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.products = [
+            Product.objects.create(name=f"Producto {i}", description="desc", price=10 + i, quantity=20)
+            for i in range(3)
+        ]
+        self.combo = Combo.objects.create(name="Combo", description="desc", price=50)
+
+    def fill_cart(self, lines):
+        for item_type, item_id, quantity in lines:
+            CartLine.objects.create(
+                user=self.user, booking=self.booking, item_type=item_type, item_id=item_id, quantity=quantity
+            )
+
+    def test_hydration_keeps_cart_order(self):
+        """Test que verifica que las líneas se devuelven en el orden del carrito"""
+        self.fill_cart([
+            (CartLine.PRODUCT, self.products[2].id, 1),
+            (CartLine.COMBO, self.combo.id, 2),
+            (CartLine.PRODUCT, self.products[0].id, 3),
+        ])
+        items, total = get_cart_products_by_booking(self.user, self.booking.id)
+
+        self.assertEqual(
+            [(line['type'], line['item'].id) for line in items],
+            [('product', self.products[2].id), ('combo', self.combo.id), ('product', self.products[0].id)]
+        )
+        self.assertEqual(total, Decimal("12") + Decimal("100") + Decimal("30"))
+
+    def test_hydration_query_count_is_constant(self):
+        """Test que verifica que el carrito se hidrata con las líneas más una consulta por tipo de ítem"""
+        extra = [
+            Product.objects.create(name=f"Extra {i}", description="desc", price=5, quantity=20)
+            for i in range(15)
+        ]
+        self.fill_cart(
+            [(CartLine.PRODUCT, p.id, 1) for p in self.products + extra] + [(CartLine.COMBO, self.combo.id, 1)]
+        )
+        with self.assertNumQueries(3):
+            items, _ = get_cart_products_by_booking(self.user, self.booking.id)
+        self.assertEqual(len(items), 19)
+
+    def test_hydration_skips_missing_items(self):
+        """Test que verifica que se ignoran ítems borrados"""
+        self.fill_cart([(CartLine.PRODUCT, self.products[0].id, 1), (CartLine.PRODUCT, 9999, 1)])
+        items, total = get_cart_products_by_booking(self.user, self.booking.id)
+        self.assertEqual(len(items), 1)
+        self.assertEqual(total, Decimal("10"))
+
+    def test_promotion_price(self):
+        """Test que verifica que el subtotal usa el precio con descuento"""
+        self.combo.on_promotion = True
+        self.combo.dicount_percentage = 10
+        self.combo.save()
+        self.fill_cart([(CartLine.COMBO, self.combo.id, 2)])
+        items, total = get_cart_products_by_booking(self.user, self.booking.id)
+        self.assertEqual(total, Decimal(45.0) * 2)
+
+
+class CartStoreTest(CartTestMixin, TestCase):
+    def test_increment_creates_and_updates_line(self):
+        """Test que verifica que incrementar crea la línea y luego suma sobre la misma fila"""
+        self.assertEqual(self.cart.increment(CartLine.PRODUCT, 7), 1)
+        self.assertEqual(self.cart.increment(CartLine.PRODUCT, 7), 2)
+        self.assertEqual(CartLine.objects.count(), 1)
+
+    def test_increment_retries_only_on_line_collision(self):
+        """Test que verifica que un IntegrityError que no es por la línea repetida se propaga sin reintentar"""
+        with patch.object(CartLine.objects, "create", side_effect=IntegrityError) as create:
+            with self.assertRaises(IntegrityError):
+                self.cart.increment(CartLine.PRODUCT, 7)
+        self.assertEqual(create.call_count, 1)
+
+    def test_increment_retries_once_on_line_collision(self):
+        """Test que verifica que si otro request creó la línea se suma sobre ella"""
+        get_quantity = CartStore.get_quantity
+        calls = []
+
+        def get_quantity_racing(store, item_type, item_id):
+            # La primera vez la línea todavía no existe, pero otro request la crea enseguida
+            if not calls:
+                calls.append(1)
+                CartLine.objects.create(user=self.user, booking=self.booking, item_type=item_type, item_id=item_id)
+                return 0
+            return get_quantity(store, item_type, item_id)
+
+        with patch.object(CartStore, "get_quantity", get_quantity_racing):
+            self.assertEqual(self.cart.increment(CartLine.PRODUCT, 7), 2)
+
+    def test_increment_respects_limit(self):
+        """Test que verifica que no se supera el límite indicado"""
+        self.cart.increment(CartLine.COMBO, 1, limit=2)
+        self.cart.increment(CartLine.COMBO, 1, limit=2)
+        self.assertIsNone(self.cart.increment(CartLine.COMBO, 1, limit=2))
+        self.assertEqual(self.cart.get_quantity(CartLine.COMBO, 1), 2)
+
+    def test_increment_with_zero_limit_creates_nothing(self):
+        """Test que verifica que con límite 0 no se crea la línea"""
+        self.assertIsNone(self.cart.increment(CartLine.PRODUCT, 7, limit=0))
+        self.assertFalse(CartLine.objects.exists())
+
+    def test_decrement_deletes_empty_line(self):
+        """Test que verifica que la línea se borra al llegar a 0"""
+        self.cart.increment(CartLine.PRODUCT, 7)
+        self.cart.increment(CartLine.PRODUCT, 7)
+        self.assertEqual(self.cart.decrement(CartLine.PRODUCT, 7), 1)
+        self.assertEqual(self.cart.decrement(CartLine.PRODUCT, 7), 0)
+        self.assertFalse(CartLine.objects.exists())
+
+    def test_carts_are_isolated_by_booking(self):
+        """Test que verifica que cada reserva tiene su propio carrito"""
+        other = CartStore(self.user, self.create_booking(code="RES-2").id)
+        self.cart.increment(CartLine.PRODUCT, 7)
+        self.assertEqual(other.get_quantity(CartLine.PRODUCT, 7), 0)
+
+    def test_apply_deltas_retries_when_line_is_created_concurrently(self):
+        """Test que verifica que si otro request crea la línea a la vez se suma sobre ella"""
+        key = (CartLine.PRODUCT, 7)
+        lines = self.cart.lines()
+        CartLine.objects.create(user=self.user, booking=self.booking, item_type=key[0], item_id=key[1], quantity=2)
+
+        # La primera lectura no ve la línea, como si el otro request la insertara justo después
+        with patch.object(CartStore, "lines", side_effect=[CartLine.objects.none(), lines]):
+            self.cart.apply_deltas({key: 1}, {key: 5})
+        self.assertEqual(self.cart.get_quantity(*key), 3)
+
+    def test_apply_deltas_respects_limit(self):
+        """Test que verifica que si un cambio supera el límite no se aplica ninguno"""
+        product, combo = (CartLine.PRODUCT, 7), (CartLine.COMBO, 1)
+        self.cart.increment(*product)
+        with self.assertRaises(CartLimitExceeded):
+            self.cart.apply_deltas({product: 2, combo: 1}, {product: 2, combo: 3})
+        self.assertEqual(self.cart.get_quantity(*product), 1)
+        self.assertEqual(self.cart.get_quantity(*combo), 0)
+
+    def test_prune_carts_command(self):
+        """Test que verifica que el comando borra solo los carritos de reservas pasadas"""
+        past = CartStore(self.user, self.create_booking(code="RES-OLD", fecha=date.today() - timedelta(days=1)).id)
+        past.increment(CartLine.PRODUCT, 7)
+        self.cart.increment(CartLine.PRODUCT, 7)
+
+        call_command('prune_carts', stdout=StringIO())
+
+        self.assertEqual(past.get_quantity(CartLine.PRODUCT, 7), 0)
+        self.assertEqual(self.cart.get_quantity(CartLine.PRODUCT, 7), 1)
@@ -0,0 +1,63 @@
+from unittest import mock
+
+from django.db import IntegrityError
+from django.test import TestCase
+
+from accounts_app.models import User
+from menu_app.models import Order, order_codes
+from restaurante.codes import CodeGenerator
+
+
+class CodeGeneratorTest(TestCase):
+    def test_permutation_is_bijective(self):
+        """Test que verifica que la permutación no produce colisiones"""
+        generator = CodeGenerator('test', 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789', length=9)
+        values = [generator.permute(value) for value in range(20000)]
+        self.assertEqual(len(set(values)), len(values))
+        self.assertTrue(all(0 <= value < 1 << generator.bits for value in values))
+
+    def test_codes_are_unique_and_well_formed(self):
+        """Test que verifica formato y unicidad de códigos generados en ráfaga"""
+        codes = [order_codes.generate() for _ in range(5000)]
+        self.assertEqual(len(set(codes)), len(codes))
+        for code in codes[:50]:
+            self.assertRegex(code, r'^PDD-[0-9A-F]{11}$')
+
+    def test_codes_are_not_sequential(self):
+        """Test que verifica que códigos consecutivos no comparten prefijo largo"""
+        first, second = order_codes.generate(), order_codes.generate()
+        self.assertNotEqual(first[:10], second[:10])
+
+
+class OrderCodeTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="cliente", password="pass")
+
+    def test_order_code_without_read_queries(self):
+        """Test que verifica que crear un pedido no consulta la base para generar el código"""
+        with self.assertNumQueries(3):  # savepoint, INSERT y release
+            order = Order.objects.create(user=self.user, buyDate="2030-01-01")
+        self.assertTrue(order.code.startswith('PDD-'))
+
+    def test_collision_retries_with_new_code(self):
+        """Test que verifica que ante una colisión se reintenta con otro código"""
+        existing = Order.objects.create(user=self.user, buyDate="2030-01-01")
+
+        with mock.patch.object(order_codes, 'generate', side_effect=[existing.code, 'PDD-00000000001']):
+            order = Order.objects.create(user=self.user, buyDate="2030-01-01")
+        self.assertEqual(order.code, 'PDD-00000000001')
+
+    def test_persistent_collision_raises(self):
+        """Test que verifica que si todos los intentos colisionan se propaga el IntegrityError"""
+        existing = Order.objects.create(user=self.user, buyDate="2030-01-01")
+
+        with mock.patch.object(order_codes, 'generate', return_value=existing.code):
+            with self.assertRaises(IntegrityError):
+                Order.objects.create(user=self.user, buyDate="2030-01-01")
+
+    def test_other_integrity_errors_are_not_retried(self):
+        """Test que verifica que un IntegrityError ajeno al código se propaga sin reintentar"""
+        with mock.patch.object(order_codes, 'generate', wraps=order_codes.generate) as generate:
+            with self.assertRaises(IntegrityError):
+                Order.objects.create(user=self.user, buyDate=None)
+        self.assertEqual(generate.call_count, 1)
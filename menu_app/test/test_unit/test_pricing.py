@@ -0,0 +1,29 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from accounts_app.models import User
+from menu_app.models import Product, Combo, Order, OrderContainsProduct
+from menu_app.utils.pricing import price_lines
+
+
+class PriceLinesTest(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name="Milanesa", description="-", price=Decimal("15.00"), quantity=5)
+        self.product.setDiscount(30)  # 10.50
+        self.combo = Combo.objects.create(name="Picada", description="-", price=Decimal("9.99"))
+
+    def test_batch_subtotals_and_total(self):
+        """Test que verifica los subtotales y el total de varias líneas en una llamada"""
+        subtotals, total = price_lines([(self.product, 3), (self.combo, 2), (self.product, 1)])
+        self.assertEqual([str(subtotal) for subtotal in subtotals], ["31.50", "19.98", "10.50"])
+        self.assertEqual(str(total), "61.98")
+        self.assertEqual(price_lines([]), ([], Decimal("0.00")))
+
+    def test_order_line_matches_cart_subtotal(self):
+        """Test que verifica que la línea guardada del pedido tiene el mismo subtotal que el carrito"""
+        user = User.objects.create_user(username="cliente", password="pass")
+        order = Order.objects.create(user=user, buyDate="2030-01-01")
+        line = OrderContainsProduct.objects.create(order=order, product=self.product, quantity=3)
+        line.refresh_from_db()
+        self.assertEqual(line.subtotal, price_lines([(self.product, 3)])[0][0])
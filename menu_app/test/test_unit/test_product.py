@@ -1,8 +1,13 @@
+from decimal import Decimal
+from io import StringIO
+
 from django.test import TestCase
 
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 
-from menu_app.models import Product
+from accounts_app.models import User
+from menu_app.models import Product, Combo, Rating, ComboRating
 
 
 class ProductModelTest(TestCase):
@@ -139,3 +144,206 @@ class ProductModelTest(TestCase):
         self.assertEqual(updated_product.description, new_description)
         self.assertEqual(updated_product.price, original_price)
         self.assertEqual(updated_product.quantity, original_quantity)
+
+
+class RatingAggregatesTest(TestCase):
+    """Tests para los agregados de calificaciones guardados en productos y combos"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="critico", password="pass")
+        self.product = Product.objects.create(name="Producto", description="Descripción", price=10, quantity=5)
+        self.other_product = Product.objects.create(name="Otro", description="Descripción", price=10, quantity=5)
+        self.combo = Combo.objects.create(name="Combo", description="Descripción", price=15)
+
+    def rate(self, rating, product=None):
+        return Rating.objects.create(
+            title="Título", text="Texto", rating=rating, product=product or self.product, user=self.user
+        )
+
+    def test_create_updates_aggregates(self):
+        """Test que verifica que crear calificaciones actualiza cantidad, suma y promedio"""
+        self.rate(4)
+        self.rate(5)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_count, 2)
+        self.assertEqual(self.product.rating_sum, 9)
+        self.assertEqual(self.product.average_rating, 4.5)
+
+    def test_create_does_not_aggregate(self):
+        """Test que verifica que agregar una calificación no recorre las calificaciones existentes"""
+        self.rate(3)
+        with self.assertNumQueries(2):  # INSERT + UPDATE del producto
+            self.rate(5)
+
+    def test_edit_applies_difference(self):
+        """Test que verifica que editar una calificación aplica solo la diferencia"""
+        rating = self.rate(2)
+        rating = Rating.objects.get(pk=rating.pk)
+        rating.update(title=None, text=None, rating=5)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_sum, 5)
+        self.assertEqual(self.product.average_rating, 5.0)
+
+    def test_edit_moving_rating_to_other_product(self):
+        """Test que verifica que mover una calificación actualiza ambos productos"""
+        rating = self.rate(4)
+        rating.product = self.other_product
+        rating.save()
+        self.product.refresh_from_db()
+        self.other_product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.average_rating), (0, 0.0))
+        self.assertEqual((self.other_product.rating_count, self.other_product.average_rating), (1, 4.0))
+
+    def test_delete_updates_aggregates(self):
+        """Test que verifica que borrar calificaciones (también en cascada) actualiza los agregados"""
+        rating = self.rate(1)
+        self.rate(3)
+        rating.delete()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.average_rating), (1, 3.0))
+
+        self.user.delete()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_sum, self.product.average_rating), (0, 0, 0.0))
+
+    def test_combo_rating_updates_aggregates(self):
+        """Test que verifica los agregados de calificaciones de combos"""
+        ComboRating.objects.create(combo=self.combo, user=self.user, title="Rico", text="Rico", rating=2)
+        comment = ComboRating.objects.create(combo=self.combo, user=self.user, title="Rico", text="Rico", rating=4)
+        self.combo.refresh_from_db()
+        self.assertEqual(self.combo.average_rating, 3.0)
+
+        comment.delete()
+        self.combo.refresh_from_db()
+        self.assertEqual((self.combo.rating_count, self.combo.average_rating), (1, 2.0))
+
+    def test_recalculate_ratings_command_repairs_aggregates(self):
+        """Test que verifica que el comando corrige agregados desactualizados"""
+        self.rate(4)
+        self.rate(2)
+        Product.objects.filter(pk=self.product.pk).update(rating_count=0, rating_sum=0, avarage_rating=0.0)
+
+        call_command("recalculate_ratings", stdout=StringIO())
+
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_sum, self.product.average_rating), (2, 6, 3.0))
+
+
+class ComboPriceTest(TestCase):
+    def setUp(self):
+        self.empanada = Product.objects.create(name="Empanada", description="Carne", price=100, quantity=10)
+        self.vino = Product.objects.create(name="Vino", description="Malbec", price=300, quantity=10)
+        self.combo = Combo.objects.create(name="Picada", description="Para dos", price=1)
+        self.combo.products.add(self.empanada, self.vino)
+        self.solo = Combo.objects.create(name="Solo", description="Empanadas", price=1)
+        self.solo.products.add(self.empanada)
+        # Precios viejos, que no coinciden con el promedio de los productos
+        Combo.objects.update(price=1)
+
+    def test_calculate_combo_price(self):
+        """Test que verifica el precio calculado como promedio de los productos"""
+        self.assertEqual(self.combo.CalculateComboPrice(), Decimal("200.00"))
+        with self.assertRaises(ValueError):
+            Combo.objects.create(name="Vacío", description="Vacío", price=1).CalculateComboPrice()
+
+    def test_product_price_change_updates_combos(self):
+        """Test que verifica que cambiar el precio de un producto recalcula sus combos"""
+        empanada = Product.objects.get(pk=self.empanada.pk)
+        empanada.price = Decimal("200.00")
+        # UPDATE del producto, un SELECT con el promedio de cada combo y un bulk_update
+        with self.assertNumQueries(3):
+            empanada.save(update_fields=["price"])
+
+        self.combo.refresh_from_db()
+        self.solo.refresh_from_db()
+        self.assertEqual((self.combo.price, self.solo.price), (Decimal("250.00"), Decimal("200.00")))
+
+    def test_save_without_price_change_does_not_recalculate(self):
+        """Test que verifica que guardar sin cambiar el precio no toca los combos"""
+        empanada = Product.objects.get(pk=self.empanada.pk)
+        empanada.name = "Empanada de carne"
+        empanada.save()
+        self.combo.refresh_from_db()
+        self.assertEqual(self.combo.price, Decimal("1.00"))
+
+    def test_combo_products_change_updates_price(self):
+        """Test que verifica que agregar o quitar productos de un combo recalcula su precio"""
+        self.solo.products.add(self.vino)
+        self.solo.refresh_from_db()
+        self.assertEqual(self.solo.price, Decimal("200.00"))
+
+        self.combo.products.remove(self.vino)
+        self.combo.refresh_from_db()
+        self.assertEqual(self.combo.price, Decimal("100.00"))
+
+    def test_product_combos_change_updates_prices(self):
+        """Test que verifica que cambiar los combos desde el producto recalcula esos combos"""
+        self.vino.combos.add(self.solo)
+        self.solo.refresh_from_db()
+        self.assertEqual(self.solo.price, Decimal("200.00"))
+
+        self.vino.combos.clear()
+        self.combo.refresh_from_db()
+        self.solo.refresh_from_db()
+        self.assertEqual((self.combo.price, self.solo.price), (Decimal("100.00"), Decimal("100.00")))
+
+    def test_product_delete_updates_combos(self):
+        """Test que verifica que borrar un producto recalcula los combos que lo contenían"""
+        self.vino.delete()
+        self.combo.refresh_from_db()
+        self.solo.refresh_from_db()
+        self.assertEqual(self.combo.price, Decimal("100.00"))
+        self.assertEqual(self.solo.price, Decimal("1.00"))
+
+    def test_recalculate_combo_prices_command(self):
+        """Test que verifica que el comando recalcula todos los combos"""
+        out = StringIO()
+        call_command("recalculate_combo_prices", stdout=out)
+
+        self.combo.refresh_from_db()
+        self.solo.refresh_from_db()
+        self.assertEqual((self.combo.price, self.solo.price), (Decimal("200.00"), Decimal("100.00")))
+        self.assertIn("2 precio(s)", out.getvalue())
+
+
+class EffectivePriceTest(TestCase):
+    def test_product_effective_price(self):
+        """Test que verifica el precio efectivo calculado por la base"""
+        product = Product.objects.create(name="Milanesa", description="Napolitana", price=Decimal("15.00"), quantity=5)
+        self.assertEqual(product.effective_price, Decimal("15.00"))
+
+        product.setDiscount(30)
+        self.assertEqual(product.discounted_price, Decimal("10.50"))
+
+        product.on_promotion = False
+        product.save()
+        self.assertEqual(product.effective_price, Decimal("15.00"))
+
+    def test_saved_instance_has_effective_price_without_queries(self):
+        """Test que verifica que después de guardar el precio efectivo en memoria coincide con el de la base"""
+        for price in ("0.10", "9.99", "15.00", "33.33", "1234.55"):
+            for percentage in (0, 5, 15, 33, 80):
+                product = Product(name="Milanesa", description="-", price=price, quantity=1,
+                                  on_promotion=True, dicount_percentage=percentage)
+                product.save()
+                with self.assertNumQueries(0):
+                    effective_price = product.effective_price
+                self.assertEqual(effective_price, Product.objects.get(pk=product.pk).effective_price, (price, percentage))
+
+    def test_effective_price_is_rounded_to_cents(self):
+        """Test que verifica que el descuento se redondea a centavos"""
+        combo = Combo.objects.create(name="Picada", description="Para dos", price=Decimal("9.99"))
+        Combo.objects.filter(pk=combo.pk).set_discount(15)
+        self.assertEqual(Combo.objects.get(pk=combo.pk).effective_price, Decimal("8.49"))
+
+    def test_filter_and_sort_by_effective_price(self):
+        """Test que verifica que se puede filtrar y ordenar por precio efectivo en SQL"""
+        cheap = Product.objects.create(name="Caro en oferta", description="-", price=100, quantity=1,
+                                       on_promotion=True, dicount_percentage=80)
+        Product.objects.create(name="Barato", description="-", price=30, quantity=1)
+        self.assertEqual(
+            list(Product.objects.order_by("effective_price").values_list("name", flat=True)),
+            ["Caro en oferta", "Barato"],
+        )
+        self.assertEqual(list(Product.objects.filter(effective_price__lt=25)), [cheap])
+
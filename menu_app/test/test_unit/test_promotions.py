@@ -0,0 +1,187 @@
+import math
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from menu_app.models import Product, Combo, Promotion
+from menu_app.utils.menu_cache import get_menu_version
+from menu_app.utils.promotions import apply_due_promotions, apply_promotions, get_next_transition
+
+
+class PromotionWindowTest(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+
+    def make_promotion(self, start, end, recurrence=Promotion.NO_RECURRENCE):
+        return Promotion(
+            name="Happy hour", percentage=20, recurrence=recurrence,
+            starts_at=self.now + start, ends_at=self.now + end
+        )
+
+    def test_window_without_recurrence(self):
+        """Test que verifica la franja de una promoción que no se repite"""
+        promotion = self.make_promotion(timedelta(hours=1), timedelta(hours=2))
+        self.assertEqual(promotion.get_window(self.now), (promotion.starts_at, promotion.ends_at))
+        self.assertFalse(promotion.is_running(self.now))
+        self.assertTrue(promotion.is_running(self.now + timedelta(hours=1)))
+        self.assertIsNone(promotion.get_window(self.now + timedelta(hours=2)))
+
+    def test_daily_window_repeats(self):
+        """Test que verifica que una promoción diaria se repite a la misma hora"""
+        promotion = self.make_promotion(timedelta(days=-3, hours=-1), timedelta(days=-3, hours=1), Promotion.DAILY)
+        self.assertTrue(promotion.is_running(self.now))
+        start, end = promotion.get_window(self.now)
+        self.assertEqual((start, end), (self.now - timedelta(hours=1), self.now + timedelta(hours=1)))
+
+        start, _ = promotion.get_window(self.now + timedelta(hours=2))
+        self.assertEqual(start, self.now + timedelta(days=1, hours=-1))
+
+    def test_inactive_promotion_has_no_window(self):
+        """Test que verifica que una promoción desactivada no rige"""
+        promotion = self.make_promotion(timedelta(hours=-1), timedelta(hours=1))
+        promotion.is_active = False
+        self.assertIsNone(promotion.get_window(self.now))
+
+    def test_clean(self):
+        """Test que verifica las validaciones de la promoción"""
+        promotion = self.make_promotion(timedelta(hours=2), timedelta(hours=1))
+        promotion.percentage = 90
+        with self.assertRaises(ValidationError) as error:
+            promotion.clean()
+        self.assertEqual(set(error.exception.message_dict), {"percentage", "ends_at"})
+
+        promotion = self.make_promotion(timedelta(0), timedelta(days=1), Promotion.DAILY)
+        with self.assertRaises(ValidationError):
+            promotion.clean()
+
+
+class PromotionEvaluatorTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        self.products = [
+            Product.objects.create(name=f"Producto {i}", description="Descripción", price=10, quantity=5)
+            for i in range(3)
+        ]
+        self.combo = Combo.objects.create(name="Combo", description="Descripción", price=25)
+        self.combo.products.add(*self.products)
+        self.promotion = Promotion.objects.create(
+            name="Happy hour", percentage=30,
+            starts_at=self.now + timedelta(hours=1), ends_at=self.now + timedelta(hours=2)
+        )
+        self.promotion.products.add(*self.products[:2])
+        self.promotion.combos.add(self.combo)
+
+    def discounts(self):
+        return (
+            list(Product.objects.order_by("id").values_list("on_promotion", "dicount_percentage")),
+            Combo.objects.values_list("on_promotion", "dicount_percentage").get(),
+        )
+
+    def test_applies_and_removes_discount_on_schedule(self):
+        """Test que verifica que la promoción se aplica y se quita según su horario"""
+        self.assertEqual(self.discounts(), ([(False, 0)] * 3, (False, 0)))
+        self.assertEqual(get_next_transition(), self.promotion.starts_at.timestamp())
+
+        # promociones + productos + combos, un UPDATE por modelo y otro que marca la promoción aplicada
+        with self.assertNumQueries(6):
+            updated = apply_promotions(self.now + timedelta(hours=1))
+        self.assertEqual(updated, 3)
+        self.assertEqual(self.discounts(), ([(True, 30), (True, 30), (False, 0)], (True, 30)))
+        self.assertEqual(get_next_transition(), self.promotion.ends_at.timestamp())
+
+        apply_promotions(self.now + timedelta(hours=2))
+        self.assertEqual(self.discounts(), ([(False, 0)] * 3, (False, 0)))
+        self.assertTrue(math.isinf(get_next_transition()))
+
+    def test_unchanged_items_are_not_updated(self):
+        """Test que verifica que una evaluación sin cambios no escribe"""
+        apply_promotions(self.now + timedelta(hours=1))
+        self.assertEqual(apply_promotions(self.now + timedelta(hours=1, minutes=30)), 0)
+
+    def test_overlapping_promotions_use_highest_percentage(self):
+        """Test que verifica que gana el mayor descuento entre promociones vigentes"""
+        other = Promotion.objects.create(
+            name="Noche", percentage=50,
+            starts_at=self.now + timedelta(minutes=30), ends_at=self.now + timedelta(hours=3)
+        )
+        other.products.add(self.products[0])
+
+        apply_promotions(self.now + timedelta(hours=1))
+        self.assertEqual(self.discounts()[0], [(True, 50), (True, 30), (False, 0)])
+
+    def test_due_promotions_only_run_after_next_transition(self):
+        """Test que verifica que antes del próximo cambio no se consulta la base"""
+        with self.assertNumQueries(0):
+            self.assertEqual(apply_due_promotions(self.now + timedelta(minutes=59)), 0)
+        self.assertEqual(apply_due_promotions(self.now + timedelta(hours=1)), 3)
+
+    def test_menu_version_changes_at_transition(self):
+        """Test que verifica que la versión del menú cambia justo al empezar la promoción"""
+        version = get_menu_version()
+        with patch("django.utils.timezone.now", return_value=self.now + timedelta(minutes=59)):
+            self.assertEqual(get_menu_version(), version)
+        with patch("django.utils.timezone.now", return_value=self.now + timedelta(hours=1)):
+            self.assertNotEqual(get_menu_version(), version)
+        self.assertTrue(Product.objects.get(pk=self.products[0].pk).on_promotion)
+
+    def test_removed_targets_lose_discount(self):
+        """Test que verifica que un ítem que sale de la promoción vuelve a su precio"""
+        self.promotion.starts_at = self.now - timedelta(hours=1)
+        self.promotion.save()
+        self.assertEqual(self.discounts()[0][0], (True, 30))
+
+        self.promotion.products.remove(self.products[0])
+        self.assertEqual(self.discounts()[0][:2], [(False, 0), (True, 30)])
+
+        self.products[1].promotions.clear()
+        self.assertEqual(self.discounts()[0][1], (False, 0))
+
+        self.promotion.delete()
+        self.assertEqual(self.discounts()[1], (False, 0))
+
+    def test_manual_discount_survives_expired_and_inactive_promotions(self):
+        """Test que verifica que el evaluador no pisa descuentos manuales de promociones que no rigen"""
+        self.promotion.ends_at = self.now - timedelta(minutes=30)
+        self.promotion.starts_at = self.now - timedelta(hours=1)
+        self.promotion.save()
+        inactive = Promotion.objects.create(
+            name="Pausada", percentage=40, is_active=False,
+            starts_at=self.now - timedelta(hours=1), ends_at=self.now + timedelta(hours=1)
+        )
+        inactive.products.add(self.products[1])
+        Product.objects.filter(pk__in=[p.pk for p in self.products[:2]]).update(on_promotion=True, dicount_percentage=15)
+
+        cache.clear()
+        self.assertEqual(apply_promotions(self.now), 0)
+        self.assertEqual(self.discounts()[0], [(True, 15), (True, 15), (False, 0)])
+
+    def test_discount_is_removed_when_applied_promotion_is_deactivated(self):
+        """Test que verifica que desactivar una promoción aplicada quita su descuento"""
+        apply_promotions(self.now + timedelta(hours=1))
+        promotion = Promotion.objects.get(pk=self.promotion.pk)
+        self.assertTrue(promotion.is_applied)
+
+        promotion.is_active = False
+        promotion.save()
+        self.assertEqual(self.discounts(), ([(False, 0)] * 3, (False, 0)))
+        self.assertFalse(Promotion.objects.get(pk=promotion.pk).is_applied)
+
+    def test_removing_items_from_pending_promotion_keeps_discount(self):
+        """Test que verifica que sacar un ítem de una promoción que no rige no toca su descuento"""
+        Product.objects.filter(pk=self.products[0].pk).update(on_promotion=True, dicount_percentage=15)
+        self.promotion.products.remove(self.products[0])
+        self.promotion.delete()
+        self.assertEqual(self.discounts()[0][0], (True, 15))
+
+    def test_apply_promotions_command(self):
+        """Test que verifica el comando que aplica las promociones"""
+        out = StringIO()
+        call_command("apply_promotions", stdout=out)
+        self.assertIn("0 ítem(s) actualizado(s); próximo cambio:", out.getvalue())
@@ -0,0 +1,38 @@
+from django.test import TestCase
+
+from menu_app.models import Product
+from menu_app.utils.stock import reserve_stock, release_stock, StockShortage
+
+
+class StockEngineTest(TestCase):
+    def setUp(self):
+        self.pizza = Product.objects.create(name="Pizza", description="desc", price=10, quantity=5)
+        self.flan = Product.objects.create(name="Flan", description="desc", price=4, quantity=1)
+
+    def assertStock(self, product, expected):
+        product.refresh_from_db(fields=['quantity'])
+        self.assertEqual(product.quantity, expected)
+
+    def test_reserve_decrements_in_one_query(self):
+        """Test que verifica que reservar descuenta el stock de todos los productos con un UPDATE"""
+        with self.assertNumQueries(4):  # savepoint, UPDATE, release y chequeo de productos agotados
+            reserve_stock({self.pizza.id: 2, self.flan.id: 1})
+        self.assertStock(self.pizza, 3)
+        self.assertStock(self.flan, 0)
+
+    def test_shortage_reports_lines_and_reserves_nothing(self):
+        """Test que verifica que si falta stock no se descuenta nada y se informa cada faltante"""
+        with self.assertRaises(StockShortage) as ctx:
+            reserve_stock({self.pizza.id: 2, self.flan.id: 3})
+
+        self.assertEqual(ctx.exception.shortages, [
+            {'product_id': self.flan.id, 'name': "Flan", 'requested': 3, 'available': 1}
+        ])
+        self.assertStock(self.pizza, 5)
+        self.assertStock(self.flan, 1)
+
+    def test_release_returns_stock(self):
+        """Test que verifica que liberar devuelve las unidades al stock"""
+        reserve_stock({self.pizza.id: 2})
+        release_stock({self.pizza.id: 2, None: 4})
+        self.assertStock(self.pizza, 5)
@@ -11,6 +11,9 @@ from menu_app.views import (
     RemoveComboFromCartView,
     RemoveComboAllFromCartView,
     DecrementComboFromCartView,
+    ProductCommentsView,
+    ComboCommentsView,
+    UpdateCartView,
 )
 
 app_name = 'menu_app'
@@ -22,10 +25,13 @@ urlpatterns = [
     path("accounts/", include("accounts_app.urls", namespace="accounts_app")),
     path("make_rating/<int:product_id>/", MakeRatingView.as_view(), name="make_rating"),
     path("rating/combo/<int:combo_id>/", MakeRatingCombo.as_view(), name="make_rating_combo"),
+    path("<int:pk>/comments/", ProductCommentsView.as_view(), name="product_comments"),
+    path("combo/<int:pk>/comments/", ComboCommentsView.as_view(), name="combo_comments"),
     path('add-combo/<int:pk>/', AddComboToOrderView.as_view(), name='add_combo_to_order'),
     path('remove-combo/<int:pk>/', RemoveComboFromCartView.as_view(), name='remove_combo_from_cart'),
     path('decrement-from-cart/<int:pk>/', DecrementFromCartView.as_view(), name='decrement_from_cart'),
     path('decrement-combo-from-cart/<int:pk>/', DecrementComboFromCartView.as_view(), name='decrement_combo_from_cart'),
     path('remove-combo-from-cart/<int:pk>/', RemoveComboFromCartView.as_view(), name='remove_combo_from_cart'),
     path('remove-combo-all-from-cart/<int:pk>/', RemoveComboAllFromCartView.as_view(), name='remove_combo_all_from_cart'),
+    path('cart/update/', UpdateCartView.as_view(), name='update_cart'),
 ]
@@ -1,52 +1,222 @@
-from menu_app.models import Product, Combo
-from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
 
-def get_cart_products_by_booking(session, booking_id):
-    cart = session.get('cart', {})
-    items = []
-    total = Decimal("0.00")
+from bookings_app.models import Booking
+from menu_app.models import Product, Combo, CartLine
+from menu_app.utils.pricing import price_lines
 
-    products_data = cart.get(str(booking_id), {})
-    
-    for item_key, data in products_data.items():
-        quantity = data.get('quantity', 1)
+# Columnas necesarias para mostrar y cotizar una línea del carrito
+CART_ITEM_FIELDS = ('id', 'name', 'price', 'on_promotion', 'dicount_percentage', 'effective_price')
 
-        # Verificar si es un combo
+CART_ITEM_MODELS = {
+    CartLine.PRODUCT: Product,
+    CartLine.COMBO: Combo,
+}
+
+
+class CartLimitExceeded(Exception):
+    def __init__(self, item_type, item_id, limit):
+        super().__init__(item_type, item_id, limit)
+        self.item_type = item_type
+        self.item_id = item_id
+        self.limit = limit
+
+
+def parse_cart_key(item_key):
+    """Devuelve (tipo, id) de una clave del carrito de sesión, o (None, None) si es inválida."""
+    try:
         if item_key.startswith('combo_'):
-            try:
-                combo_id = int(item_key.replace('combo_', ''))
-                combo = Combo.objects.get(id=combo_id)
-                if combo.on_promotion:
-                    subtotal = Decimal(combo.discounted_price) * Decimal(quantity)
-                else:
-                    subtotal = Decimal(combo.price) * Decimal(quantity)
-                total += subtotal
-                items.append({
-                    'item': combo,
-                    'type': 'combo',
-                    'quantity': quantity,
-                    'subtotal': subtotal
-                })
-            except (Combo.DoesNotExist, ValueError):
-                continue
+            return CartLine.COMBO, int(item_key.replace('combo_', ''))
+        return CartLine.PRODUCT, int(item_key)
+    except ValueError:
+        return None, None
+
+
+class CartStore:
+    """Carrito de un usuario para una reserva, guardado en la tabla CartLine.
 
-        else:
-            # Procesar como producto
+    Cada operación toca solo su línea con un UPDATE atómico, en lugar de
+    reescribir toda la sesión.
+    """
+
+    def __init__(self, user, booking_id):
+        self.user = user
+        self.booking_id = booking_id
+
+    def lines(self):
+        return CartLine.objects.del_carrito(self.user, self.booking_id)
+
+    def line(self, item_type, item_id):
+        return self.lines().filter(item_type=item_type, item_id=item_id)
+
+    def get_quantity(self, item_type, item_id):
+        return self.line(item_type, item_id).values_list('quantity', flat=True).first() or 0
+
+    def increment(self, item_type, item_id, limit=None, retry=True):
+        """Suma una unidad sin superar ``limit``. Devuelve la nueva cantidad, o None si se llegó al límite."""
+        line = self.line(item_type, item_id)
+        if limit is not None:
+            line = line.filter(quantity__lt=limit)
+        if not line.update(quantity=F('quantity') + 1):
+            if (limit is not None and limit < 1) or self.get_quantity(item_type, item_id):
+                return None
             try:
-                product_id = int(item_key)
-                product = Product.objects.get(id=product_id)
-                if product.on_promotion:
-                    subtotal = Decimal(product.discounted_price) * Decimal(quantity)
+                with transaction.atomic():
+                    CartLine.objects.create(
+                        user=self.user, booking_id=self.booking_id,
+                        item_type=item_type, item_id=item_id, quantity=1
+                    )
+            except IntegrityError:
+                # Solo se reintenta (una vez) si otro request creó la línea al mismo tiempo;
+                # cualquier otro error, como una reserva borrada, se propaga
+                if not retry or not self.get_quantity(item_type, item_id):
+                    raise
+                return self.increment(item_type, item_id, limit, retry=False)
+        return self.get_quantity(item_type, item_id)
+
+    def decrement(self, item_type, item_id):
+        """Resta una unidad y borra la línea si llega a 0. Devuelve la nueva cantidad (0 si se borró)."""
+        self.line(item_type, item_id).filter(quantity__gt=0).update(quantity=F('quantity') - 1)
+        self.line(item_type, item_id).filter(quantity__lte=0).delete()
+        return self.get_quantity(item_type, item_id)
+
+    def apply_deltas(self, deltas, limits):
+        """Aplica varios cambios de cantidad en una sola transacción.
+
+        ``deltas`` y ``limits`` se indexan por (tipo, id). Si algún incremento supera
+        su límite se lanza CartLimitExceeded y no se aplica ningún cambio.
+        """
+        try:
+            self._apply_deltas(deltas, limits)
+        except IntegrityError:
+            # Otro request creó una de las líneas nuevas al mismo tiempo: select_for_update
+            # solo bloquea las que ya existían. Al repetir la línea ya está y queda bloqueada.
+            self._apply_deltas(deltas, limits)
+
+    def _apply_deltas(self, deltas, limits):
+        with transaction.atomic():
+            current = {
+                (line.item_type, line.item_id): line
+                for line in self.lines().select_for_update()
+            }
+            to_create, to_update, to_delete = [], [], []
+            for key, delta in deltas.items():
+                line = current.get(key)
+                quantity = (line.quantity if line else 0) + delta
+                if delta > 0 and quantity > limits[key]:
+                    raise CartLimitExceeded(*key, limits[key])
+                if quantity <= 0:
+                    if line:
+                        to_delete.append(line.id)
+                elif line:
+                    line.quantity = quantity
+                    line.updated_at = timezone.now()  # bulk_update no aplica auto_now
+                    to_update.append(line)
                 else:
-                    subtotal = Decimal(product.price) * Decimal(quantity)
-                total += subtotal
-                items.append({
-                    'item': product,
-                    'type': 'product',
-                    'quantity': quantity,
-                    'subtotal': subtotal
-                })
-            except (Product.DoesNotExist, ValueError):
+                    to_create.append(CartLine(
+                        user=self.user, booking_id=self.booking_id,
+                        item_type=key[0], item_id=key[1], quantity=quantity
+                    ))
+
+            if to_delete:
+                CartLine.objects.filter(id__in=to_delete).delete()
+            if to_update:
+                CartLine.objects.bulk_update(to_update, ['quantity', 'updated_at'])
+            if to_create:
+                CartLine.objects.bulk_create(to_create)
+
+    def remove(self, item_type, item_id):
+        self.line(item_type, item_id).delete()
+
+    def clear(self):
+        self.lines().delete()
+
+    def get_lines_with_items(self, fields=CART_ITEM_FIELDS, for_update=False):
+        """Líneas del carrito con su producto o combo, cargados con una consulta por tipo.
+
+        Las líneas cuyo ítem ya no existe se omiten.
+        """
+        lines = self.lines().order_by('id')
+        if for_update:
+            lines = lines.select_for_update()
+        lines = list(lines)
+        found = load_cart_items([(line.item_type, line.item_id) for line in lines], fields)
+        return [
+            (line, found[line.item_type][line.item_id])
+            for line in lines
+            if line.item_id in found[line.item_type]
+        ]
+
+    def get_items(self):
+        return get_cart_products_by_booking(self.user, self.booking_id)
+
+
+def import_session_cart(request):
+    """Pasa a CartLine el carrito que quedó en la sesión (formato anterior) y lo quita de ella."""
+    cart = request.session.pop('cart', None)
+    if not cart or not request.user.is_authenticated:
+        return
+
+    booking_ids = set(
+        Booking.objects.filter(user=request.user, id__in=[k for k in cart if k.isdigit()])
+        .values_list('id', flat=True)
+    )
+    lines = []
+    for booking_key, items in cart.items():
+        if not booking_key.isdigit() or int(booking_key) not in booking_ids:
+            continue
+        for item_key, data in items.items():
+            item_type, item_id = parse_cart_key(item_key)
+            quantity = data.get('quantity', 1)
+            if item_type is None or quantity <= 0:
                 continue
+            lines.append(CartLine(
+                user=request.user, booking_id=int(booking_key),
+                item_type=item_type, item_id=item_id, quantity=quantity
+            ))
+    CartLine.objects.bulk_create(lines, ignore_conflicts=True)
+
+
+def get_cart_store(request, booking_id):
+    """Carrito de la reserva ``booking_id`` del usuario, o None si no existe o es de otro usuario.
+
+    Si la reserva no es válida se olvida la reserva seleccionada en la sesión.
+    """
+    if not booking_id or not Booking.objects.filter(id=booking_id, user=request.user).exists():
+        request.session.pop('booking_selected_id', None)
+        return None
+    if 'cart' in request.session:
+        import_session_cart(request)
+    return CartStore(request.user, booking_id)
+
+
+def load_cart_items(keys, fields=CART_ITEM_FIELDS):
+    """Carga los ítems de las claves (tipo, id) dadas: una consulta por tipo, sin importar cuántas sean."""
+    found = {}
+    for item_type, model in CART_ITEM_MODELS.items():
+        ids = [item_id for key_type, item_id in keys if key_type == item_type]
+        found[item_type] = model.objects.only(*fields).in_bulk(ids) if ids else {}
+    return found
+
+
+def get_cart_products_by_booking(user, booking_id):
+    # Se respeta el orden en que se agregaron las líneas
+    lines = list(
+        CartLine.objects.del_carrito(user, booking_id)
+        .order_by('id').values_list('item_type', 'item_id', 'quantity')
+    )
+
+    found = load_cart_items([(item_type, item_id) for item_type, item_id, _ in lines])
+    present = [
+        (item_type, found[item_type][item_id], quantity)
+        for item_type, item_id, quantity in lines
+        if item_id in found[item_type]
+    ]
 
-    return items, total
\ No newline at end of file
+    subtotals, total = price_lines([(item, quantity) for _, item, quantity in present])
+    items = [
+        {'item': item, 'type': item_type, 'quantity': quantity, 'subtotal': subtotal}
+        for (item_type, item, quantity), subtotal in zip(present, subtotals)
+    ]
+    return items, total
@@ -0,0 +1,12 @@
+from django.utils.timezone import localtime
+
+
+def serialize_comment(comment):
+    """Datos de un comentario (Rating o ComboRating) tal como los muestra el modal del menú."""
+    return {
+        "user": f"{comment.user.name} {comment.user.last_name}" if comment.user else "Anon",
+        "title": comment.title,
+        "text": comment.text,
+        "rating": comment.rating,
+        "created_at": localtime(comment.created_at).strftime("%d/%m/%Y %H:%M"),
+    }
@@ -0,0 +1,36 @@
+from django.core.cache import cache
+
+from menu_app.utils.versions import get_version, bump_version
+
+MENU_VERSION_KEY = 'menu:version'
+MENU_CACHE_TIMEOUT = 60 * 60  # las versiones viejas simplemente expiran
+
+
+def get_menu_version():
+    """Versión actual del menú, después de aplicar las promociones programadas que ya correspondan.
+
+    Así todo lo cacheado con la versión (fragmentos, ETags de la API) vence justo en
+    el inicio o fin de una promoción, sin tareas periódicas.
+    """
+    from menu_app.utils.promotions import apply_due_promotions
+    apply_due_promotions()
+    return get_version(MENU_VERSION_KEY)
+
+
+def bump_menu_version():
+    """Invalida todos los fragmentos del menú."""
+    bump_version(MENU_VERSION_KEY)
+
+
+def get_menu_fragments_key(version, is_authenticated):
+    return f'menu:fragments:{version}:{int(is_authenticated)}'
+
+
+def get_menu_fragments(is_authenticated, build_fragments):
+    """Devuelve los fragmentos del menú de la versión actual, construyéndolos solo si no están en cache."""
+    key = get_menu_fragments_key(get_menu_version(), is_authenticated)
+    fragments = cache.get(key)
+    if fragments is None:
+        fragments = build_fragments()
+        cache.set(key, fragments, MENU_CACHE_TIMEOUT)
+    return fragments
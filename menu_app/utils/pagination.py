@@ -0,0 +1,69 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPaginator:
+    """Paginación por clave (keyset): cada página filtra a partir de la última fila de la anterior.
+
+    A diferencia de OFFSET, el costo de una página no crece con la cantidad de páginas
+    anteriores. ``ordering`` debe identificar cada fila de forma única (terminar en la pk).
+    """
+
+    def __init__(self, queryset, ordering, page_size):
+        self.queryset = queryset
+        self.ordering = ordering
+        self.page_size = page_size
+        self.fields = [name.lstrip('-') for name in ordering]
+
+    def encode_cursor(self, item):
+        values = [getattr(item, name) for name in self.fields]
+        # default=str conserva los microsegundos (DjangoJSONEncoder los recorta)
+        raw = json.dumps(values, default=str).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            values = json.loads(raw)
+            if len(values) != len(self.fields):
+                raise InvalidCursor("Cursor inválido.")
+            opts = self.queryset.model._meta
+            return [self.get_field(opts, name).to_python(value) for name, value in zip(self.fields, values)]
+        except (ValueError, TypeError, ValidationError) as e:
+            raise InvalidCursor("Cursor inválido.") from e
+
+    @staticmethod
+    def get_field(opts, name):
+        field = opts.get_field(name)
+        # Las columnas generadas convierten los valores con el campo de su resultado
+        return field.output_field if field.generated else field
+
+    def get_after_filter(self, values):
+        # (a, b) > (va, vb)  =>  a > va  OR  (a = va AND b > vb), respetando el sentido de cada campo
+        condition = Q()
+        equals = {}
+        for name, value in zip(self.ordering, values):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition |= Q(**equals, **{f'{field}__{lookup}': value})
+            equals[field] = value
+        return condition
+
+    def get_page(self, cursor=None):
+        """Devuelve (items, next_cursor). next_cursor es None en la última página."""
+        queryset = self.queryset.order_by(*self.ordering)
+        if cursor:
+            queryset = queryset.filter(self.get_after_filter(self.decode_cursor(cursor)))
+
+        items = list(queryset[:self.page_size + 1])
+        if len(items) > self.page_size:
+            items = items[:self.page_size]
+            return items, self.encode_cursor(items[-1])
+        return items, None
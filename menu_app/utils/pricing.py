@@ -0,0 +1,25 @@
+"""Cuentas de precios de carritos y pedidos.
+
+Los precios unitarios salen de ``effective_price``, que la base ya guarda como
+Decimal redondeado a centavos. Multiplicarlos por cantidades enteras y sumarlos
+en Decimal es exacto, así que no hace falta convertir ni redondear en el medio:
+el carrito y el pedido guardado llegan siempre al mismo total. Pasar por
+centavos enteros da el mismo resultado pero es más lento (ver
+menu_app/test/benchmarks/bench_pricing.py).
+"""
+from decimal import Decimal
+
+ZERO = Decimal('0.00')
+
+
+def line_subtotal(item, quantity):
+    return item.effective_price * quantity
+
+
+def price_lines(lines):
+    """Precio de todas las líneas (ítem, cantidad) de un carrito o pedido en una llamada.
+
+    Devuelve (subtotales, total) en Decimal con dos decimales; el total es la suma exacta de los subtotales.
+    """
+    subtotals = [line_subtotal(item, quantity) for item, quantity in lines]
+    return subtotals, sum(subtotals, ZERO)
@@ -0,0 +1,107 @@
+import math
+
+from django.core.cache import cache
+from django.db.models import Case, Prefetch, Q, Value, When
+from django.utils import timezone
+
+from menu_app.models import Combo, Product, Promotion
+from menu_app.utils.menu_cache import bump_menu_version
+
+NEXT_TRANSITION_KEY = 'menu:promotions:next_transition'
+
+
+def get_target_discounts(promotions, now):
+    """Descuento que corresponde en ``now`` a los ítems de las promociones, y el próximo cambio.
+
+    Devuelve ({modelo: {pk: porcentaje}}, timestamp, pks de las promociones vigentes).
+    Un ítem en varias promociones vigentes toma el mayor porcentaje. Solo reciben 0
+    los ítems de promociones aplicadas que dejaron de regir (su propio fin): los de
+    promociones futuras o vencidas no se tocan, así conservan un descuento manual.
+    """
+    targets = {Product: {}, Combo: {}}
+    next_transition = math.inf
+    running_pks = set()
+    for promotion in promotions:
+        window = promotion.get_window(now)
+        running = promotion.is_running(now)
+        if window is not None:
+            next_transition = min(next_transition, (window[1] if running else window[0]).timestamp())
+        if running:
+            running_pks.add(promotion.pk)
+        elif not promotion.is_applied:
+            continue
+
+        percentage = promotion.percentage if running else 0
+        for model, items in ((Product, promotion.products.all()), (Combo, promotion.combos.all())):
+            for item in items:
+                targets[model][item.pk] = max(targets[model].get(item.pk, 0), percentage)
+    return targets, next_transition, running_pks
+
+
+def update_discounts(model, discounts):
+    """Aplica {pk: porcentaje} con un único UPDATE que solo toca las filas que cambian."""
+    if not discounts:
+        return 0
+    by_percentage = {}
+    for pk, percentage in discounts.items():
+        by_percentage.setdefault(percentage, []).append(pk)
+
+    unchanged = Q()
+    for percentage, pks in by_percentage.items():
+        unchanged |= Q(pk__in=pks, dicount_percentage=percentage, on_promotion=percentage > 0)
+    on_promotion = [pk for percentage, pks in by_percentage.items() if percentage > 0 for pk in pks]
+
+    return model.objects.filter(pk__in=list(discounts)).exclude(unchanged).update(
+        dicount_percentage=Case(
+            *[When(pk__in=pks, then=Value(percentage)) for percentage, pks in by_percentage.items()],
+            default=Value(0)
+        ),
+        on_promotion=Case(When(pk__in=on_promotion, then=Value(True)), default=Value(False)),
+    )
+
+
+def apply_promotions(now=None, released=None):
+    """Lleva los descuentos de los ítems en promociones programadas a lo que corresponde en ``now``.
+
+    Solo se evalúan las promociones activas con una franja vigente o por venir, y las
+    que tienen el descuento aplicado (para quitarlo al terminar). ``released``
+    ({modelo: pks}) son ítems que acaban de salir de una promoción aplicada: se les
+    quita el descuento salvo que otra vigente los incluya. Guarda el momento del
+    próximo cambio para que ``apply_due_promotions`` no consulte la base hasta entonces.
+    Devuelve la cantidad de ítems actualizados.
+    """
+    now = now or timezone.now()
+    current = Q(is_active=True) & (Q(ends_at__gt=now) | ~Q(recurrence=Promotion.NO_RECURRENCE))
+    promotions = Promotion.objects.filter(current | Q(is_applied=True)).prefetch_related(
+        Prefetch('products', queryset=Product.objects.only('id')),
+        Prefetch('combos', queryset=Combo.objects.only('id')),
+    )
+    targets, next_transition, running_pks = get_target_discounts(promotions, now)
+    for model, pks in (released or {}).items():
+        for pk in pks:
+            targets[model].setdefault(pk, 0)
+
+    updated = sum(update_discounts(model, discounts) for model, discounts in targets.items())
+    if updated:
+        bump_menu_version()  # update() no dispara señales
+    changed = [promotion.pk for promotion in promotions if promotion.is_applied != (promotion.pk in running_pks)]
+    if changed:
+        Promotion.objects.filter(pk__in=changed).update(
+            is_applied=Case(When(pk__in=running_pks, then=Value(True)), default=Value(False))
+        )
+    cache.set(NEXT_TRANSITION_KEY, next_transition, None)
+    return updated
+
+
+def get_next_transition():
+    """Timestamp del próximo inicio o fin de una promoción (inf si no hay), o None si no se calculó."""
+    return cache.get(NEXT_TRANSITION_KEY)
+
+
+def apply_due_promotions(now=None):
+    """Corre el evaluador solo si ya pasó el próximo cambio: en el resto de los casos es una lectura de cache."""
+    now = now or timezone.now()
+    next_transition = get_next_transition()
+    if next_transition is None or now.timestamp() >= next_transition:
+        return apply_promotions(now)
+    return 0
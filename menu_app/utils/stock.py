@@ -0,0 +1,93 @@
+from django.db import transaction
+from django.db.models import Case, F, Q, When
+
+from menu_app.models import Product
+from menu_app.utils.menu_cache import bump_menu_version
+
+
+class StockShortage(Exception):
+    """No alcanza el stock de uno o más productos. ``shortages`` tiene el detalle por línea."""
+
+    def __init__(self, shortages):
+        super().__init__(shortages)
+        self.shortages = shortages
+
+    def get_messages(self):
+        return [
+            f'Solo quedan {s["available"]} unidades de "{s["name"]}" (pediste {s["requested"]}).'
+            for s in self.shortages
+        ]
+
+
+class _IncompleteReservation(Exception):
+    pass
+
+
+def _stock_update(quantities, sign):
+    return Case(
+        *[When(pk=pk, then=F('quantity') + sign * quantity) for pk, quantity in quantities.items()],
+        default=F('quantity')
+    )
+
+
+def get_shortages(quantities):
+    products = Product.objects.only('id', 'name', 'quantity').in_bulk(list(quantities))
+    shortages = []
+    for pk, requested in quantities.items():
+        product = products.get(pk)
+        available = product.quantity if product else 0
+        if available < requested:
+            shortages.append({
+                'product_id': pk,
+                'name': product.name if product else '',
+                'requested': requested,
+                'available': max(available, 0),
+            })
+    return shortages
+
+
+def reserve_stock(quantities):
+    """Descuenta ``{product_id: cantidad}`` del stock con un único UPDATE condicional.
+
+    Cada fila solo se actualiza si tiene stock suficiente, así que dos confirmaciones
+    concurrentes nunca pueden dejarlo negativo. Si falta stock de algún producto no se
+    descuenta nada y se lanza StockShortage con el faltante de cada línea.
+    """
+    quantities = {pk: quantity for pk, quantity in quantities.items() if quantity > 0}
+    if not quantities:
+        return
+
+    enough_stock = Q()
+    for pk, quantity in quantities.items():
+        enough_stock |= Q(pk=pk, quantity__gte=quantity)
+
+    try:
+        with transaction.atomic():
+            updated = Product.objects.filter(enough_stock).update(quantity=_stock_update(quantities, -1))
+            if updated < len(quantities):
+                # Deshace los productos que sí alcanzaban
+                raise _IncompleteReservation
+    except _IncompleteReservation:
+        shortages = get_shortages(quantities)
+        if not shortages:
+            # Otro pedido devolvió stock mientras tanto
+            return reserve_stock(quantities)
+        raise StockShortage(shortages)
+
+    # El menú muestra "sin stock", así que se invalida solo si algún producto se agotó
+    if Product.objects.filter(pk__in=quantities, quantity=0).exists():
+        bump_menu_version()
+
+
+def release_stock(quantities):
+    """Devuelve al stock ``{product_id: cantidad}`` (por ejemplo, al cancelar un pedido)."""
+    quantities = {pk: quantity for pk, quantity in quantities.items() if pk and quantity > 0}
+    if not quantities:
+        return
+
+    Product.objects.filter(pk__in=quantities).update(quantity=_stock_update(quantities, 1))
+
+    # Si algún producto estaba agotado vuelve a mostrarse disponible en el menú
+    restocked = Product.objects.filter(pk__in=quantities).values_list('id', 'quantity')
+    if any(quantity == quantities[pk] for pk, quantity in restocked):
+        bump_menu_version()
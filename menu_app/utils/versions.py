@@ -0,0 +1,47 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _initial_version():
+    # Si la clave de versión se pierde (reinicio, desalojo) arrancamos en un valor
+    # que no puede coincidir con datos cacheados bajo versiones anteriores.
+    return int(time.time() * 1000)
+
+
+def get_version(key):
+    """Versión actual de un conjunto de datos (se crea si no existe)."""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        cache.add(f'{key}:modified', time.time(), None)
+        version = cache.get(key)
+    return version
+
+
+def get_version_modified(key):
+    """Momento (timestamp) del último cambio de versión."""
+    modified = cache.get(f'{key}:modified')
+    if modified is None:
+        modified = time.time()
+        cache.add(f'{key}:modified', modified, None)
+    return modified
+
+
+def _incr_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), None)
+    cache.set(f'{key}:modified', time.time(), None)
+
+
+def bump_version(key):
+    """Invalida todo lo cacheado bajo la versión actual de ``key``.
+
+    Se incrementa enseguida y otra vez al confirmar la transacción, para que un
+    request concurrente que haya cacheado datos previos al commit quede descartado.
+    """
+    _incr_version(key)
+    transaction.on_commit(lambda: _incr_version(key))
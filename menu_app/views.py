@@ -1,8 +1,15 @@
-from decimal import Decimal
+import json
 from django.http import JsonResponse
+from django.template.loader import render_to_string
 from django.views.generic import TemplateView, ListView, DetailView, FormView
-from menu_app.models import Product, Order, OrderContainsProduct, Category, Rating, Combo, ComboRating, OrderContainsCombo
+from menu_app.models import Product, Order, OrderContainsProduct, Category, Rating, Combo, ComboRating, OrderContainsCombo, CartLine
 from menu_app.forms import RatingForm, ComboRatingForm
+from menu_app.utils.menu_cache import get_menu_fragments
+from menu_app.utils.cart import get_cart_store, CartLimitExceeded
+from menu_app.utils.stock import reserve_stock, StockShortage
+from menu_app.utils.comments import serialize_comment
+from menu_app.utils.pagination import KeysetPaginator, InvalidCursor
+from menu_app.utils.pricing import line_subtotal, price_lines
 from accounts_app.models import User
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -10,9 +17,21 @@ from bookings_app.models import Booking
 from django.contrib import messages
 from django.urls import reverse, reverse_lazy
 from django.views import View
+from django.db import IntegrityError, transaction
 from django.utils.timezone import now
 from django.contrib import messages
-from django.utils.timezone import localtime
+
+
+def get_selected_cart(request):
+    """Carrito de la reserva seleccionada en la sesión, o None si no hay una reserva válida del usuario."""
+    return get_cart_store(request, request.session.get('booking_selected_id'))
+
+
+def booking_required_response():
+    return JsonResponse({
+        "success": False,
+        "message": "Seleccione primero una reserva."
+    }, status=400)
 
 
 class MakeRatingCombo(FormView):
@@ -35,14 +54,8 @@ class MakeRatingCombo(FormView):
         rating.save()
 
         # Preparar los datos del comentario para enviar al JS
-        comment_data = {
-            "user": f"{rating.user.name} {rating.user.last_name}" if rating.user else "Anon",
-            "title": rating.title,
-            "text": rating.text,
-            "rating": rating.rating,
-            "created_at": localtime(rating.created_at).strftime("%d/%m/%Y %H:%M"),
-            "product_id": f"combo-{self.combo.id}"  # Nota: coincide con tu data-item-id en el template
-        }
+        comment_data = serialize_comment(rating)
+        comment_data["product_id"] = f"combo-{self.combo.id}"  # Nota: coincide con tu data-item-id en el template
 
         return JsonResponse({"success": True, "comment": comment_data})
 
@@ -71,14 +84,8 @@ class MakeRatingView(FormView):
         rating.product = self.product
         rating.save()
 
-        comment_data = {
-            "user": f"{rating.user.name} {rating.user.last_name}" if rating.user else "Anon",
-            "title": rating.title,
-            "text": rating.text,
-            "rating": rating.rating,
-            "created_at": localtime(rating.created_at).strftime("%d/%m/%Y %H:%M"),
-            "product_id": rating.product.id
-        }
+        comment_data = serialize_comment(rating)
+        comment_data["product_id"] = rating.product.id
 
         return JsonResponse({"success": True, "comment": comment_data})
     
@@ -87,6 +94,56 @@ class MakeRatingView(FormView):
         return super().form_invalid(form)
 
 
+class CommentsPageView(View):
+    """Devuelve los comentarios de un ítem de a páginas, del más nuevo al más viejo.
+
+    El menú ya no incluye los comentarios: el modal los pide al abrirse.
+    ``comment_model`` es Rating o ComboRating; el ítem sale de su ``rated_item_field``.
+    """
+    comment_model = None
+    page_size = 10
+    max_page_size = 50
+
+    def get_comments_queryset(self):
+        item_field = self.comment_model.rated_item_field
+        item_model = self.comment_model._meta.get_field(item_field).related_model
+        item = get_object_or_404(item_model, pk=self.pk)
+        return self.comment_model.objects.filter(**{item_field: item})
+
+    def get_page_size(self):
+        try:
+            page_size = int(self.request.GET.get('limit', self.page_size))
+        except ValueError:
+            page_size = self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get(self, request, pk):
+        self.pk = pk
+        paginator = KeysetPaginator(
+            self.get_comments_queryset().select_related('user'),
+            ordering=('-created_at', '-id'),
+            page_size=self.get_page_size()
+        )
+        try:
+            comments, next_cursor = paginator.get_page(request.GET.get('cursor'))
+        except InvalidCursor as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+        return JsonResponse({
+            "success": True,
+            "comments": [serialize_comment(comment) for comment in comments],
+            "next_cursor": next_cursor,
+        })
+
+
+class ProductCommentsView(CommentsPageView):
+    comment_model = Rating
+
+
+class ComboCommentsView(CommentsPageView):
+    comment_model = ComboRating
+
+
 class MenuListView(ListView):
     model = Category
     template_name = 'menu_app/menu.html'
@@ -95,29 +152,44 @@ class MenuListView(ListView):
     def get_queryset(self):
         return Category.objects.filter(isActive=True).order_by('id')
     
+    def get_products_queryset(self):
+        # Una sola consulta para los productos (con su categoría; el promedio ya está guardado).
+        # Los comentarios se cargan aparte, al abrir el modal.
+        return Product.objects.filter(
+            category__isActive=True
+        ).select_related('category').order_by('category_id', 'id')
+
+    def get_combos_queryset(self):
+        return Combo.objects.filter(is_active=True).prefetch_related('products').order_by('id')
+
+    def build_menu_fragments(self):
+        # Agrupo en Python: solo aparecen las categorías activas que tienen productos
+        categorized_items = {}
+        for product in self.get_products_queryset():
+            categorized_items.setdefault(product.category, []).append(product)
+
+        # 🔹 Combos con rating y comentarios
+        combos = list(self.get_combos_queryset())
+
+        # Se exponen en el contexto solo cuando se reconstruye el menú (cache miss)
+        self.menu_items = {'categorized_items': categorized_items, 'combos': combos}
+
+        # Los fragmentos no dependen del usuario salvo por si está logueado (sin CSRF ni carrito)
+        fragment_context = {**self.menu_items, 'user': self.request.user}
+        return {
+            'categories': render_to_string('menu_app/includes/menu_categories.html', fragment_context),
+            'combos': render_to_string('menu_app/includes/menu_combos.html', fragment_context),
+        }
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        categories = self.get_queryset()
-        categorized_items = {}
-        
-        for category in categories:
-            products = Product.objects.filter(category=category)
-            if products.exists():
-                for product in products:
-                    product.rating_form = RatingForm()
-                    product.comments = product.ratings.select_related('user').order_by('-created_at')
-                    product.calculate_average_rating()  # Aquí calculas y actualizas el promedio
-                categorized_items[category] = products
-                
-        context['categorized_items'] = categorized_items
-        context['rating_form'] = RatingForm()
-         # 🔹 Combos con rating y comentarios
-        context['combos'] = Combo.objects.filter(is_active=True)
-        for combo in context['combos']:
-            combo.rating_form = RatingForm()
-            combo.comments_list = combo.comments.select_related('user').order_by('-created_at')
-            combo.calculate_average_rating()
 
+        self.menu_items = {}
+        context['menu_fragments'] = get_menu_fragments(
+            self.request.user.is_authenticated, self.build_menu_fragments
+        )
+        context.update(self.menu_items)
+        context['rating_form'] = RatingForm()
 
         return context
         
@@ -136,11 +208,6 @@ class ProductDetailView(DetailView):
     template_name = "menu_app/product_detail.html"
     context_object_name = "product"
 
-    def get_object(self, queryset=None):
-        product = super().get_object(queryset)
-        product.calculate_average_rating()  # 👈 recalcula antes de mostrar
-        return product
-
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         product = context['product']
@@ -152,13 +219,9 @@ class MakeOrderView(LoginRequiredMixin, View):
     template_name = 'menu_app/make_order.html'
 
     def get(self, request):
-        from menu_app.utils.cart import get_cart_products_by_booking
-        from django.db.models import Q
         from django.utils import timezone
 
-        local_now = timezone.localtime()
-        hoy = local_now.date()
-        ahora = local_now.time()
+        ahora = timezone.localtime()
 
         reservas_usuario = Booking.objects.filter(user=self.request.user).select_related('time_slot')
         reservas_proximas = Booking.objects.none()  # vacío por defecto
@@ -167,10 +230,7 @@ class MakeOrderView(LoginRequiredMixin, View):
         reservas_proximas = reservas_usuario.filter(
             approved=True,
             approval_date__isnull=False
-        ).filter(
-            Q(date__gt=hoy) |
-            Q(date=hoy, time_slot__end_time__gte=ahora)
-        ).order_by('date', 'time_slot__start_time')
+        ).filter(ends_at__gte=ahora).order_by('starts_at')
 
         reserva_seleccionada = None
 
@@ -191,7 +251,7 @@ class MakeOrderView(LoginRequiredMixin, View):
         carrito_reserva = []
         total_carrito = 0.00
         if reserva_seleccionada:
-            carrito_reserva, total_carrito = get_cart_products_by_booking(request.session, reserva_seleccionada.id)
+            carrito_reserva, total_carrito = get_cart_store(request, reserva_seleccionada.id).get_items()
 
         context = {
             'reservas_proximas': reservas_proximas,
@@ -205,53 +265,31 @@ class MakeOrderView(LoginRequiredMixin, View):
 
 class AddToOrderView(LoginRequiredMixin, View):
     def post(self, request, pk):
-        from menu_app.utils.cart import get_cart_products_by_booking
         product = get_object_or_404(Product, pk=pk)
-        booking_selected_id = request.session.get('booking_selected_id')
+        cart = get_selected_cart(request)
+        if cart is None:
+            return booking_required_response()
 
-        if not booking_selected_id:
-            return JsonResponse({
-                "success": False,
-                "message": "Seleccione primero una reserva."
-            }, status=400)
-
-        cart = request.session.get('cart', {})
-        booking_key = str(booking_selected_id)
-        product_key = str(product.id)
-
-        # Obtener cantidad actual del producto en el carrito (si existe)
-        prod_quantity_cart = cart.get(booking_key, {}).get(product_key, {}).get('quantity', 0)
-
-        # Verificar no pasarse del stock permitido por pedido
-        if (prod_quantity_cart + 1) > product.quantity:
+        # Sumar una unidad sin pasarse del stock permitido por pedido
+        quantity = cart.increment(CartLine.PRODUCT, product.id, limit=product.quantity)
+        if quantity is None:
             return JsonResponse({
                 "success": False,
                 "message": f'No puedes agregar más de {product.quantity} unidades de "{product.name}" por pedido.'
             }, status=400)
 
-        # Actualizar el carrito de la sesión
-        cart.setdefault(booking_key, {}).setdefault(product_key, {"quantity": 0})
-        cart[booking_key][product_key]["quantity"] += 1
-
-        # Guardar cambios en la sesión
-        request.session['cart'] = cart
-        request.session.modified = True
-
         # Calculo el subtotal
-        if product.on_promotion:
-            subtotal = Decimal(product.discounted_price) * Decimal(cart[booking_key][product_key]["quantity"])
-        else:
-            subtotal = Decimal(product.price) * Decimal(cart[booking_key][product_key]["quantity"])
+        subtotal = line_subtotal(product, quantity)
 
         # Calcular el total carrito
-        items, total_cart = get_cart_products_by_booking(request.session, booking_selected_id)
+        items, total_cart = cart.get_items()
             
         
         return JsonResponse({
             "success": True,
             "message": f'Se agregó "{product.name}" al pedido.',
             "product_id": product.id,
-            "quantity": cart[booking_key][product_key]["quantity"],
+            "quantity": quantity,
             "subtotal": subtotal,
             "total_cart": total_cart
         })
@@ -297,26 +335,12 @@ class AddToOrderView(LoginRequiredMixin, View):
 class RemoveComboFromCartView(LoginRequiredMixin, View):
     def post(self, request, pk):
         combo = get_object_or_404(Combo, pk=pk)
-        booking_selected_id = request.session.get('booking_selected_id')
-
-        if not booking_selected_id:
+        cart = get_selected_cart(request)
+        if cart is None:
             return redirect('make_order')
 
-        cart = request.session.get('cart', {})
-        booking_key = str(booking_selected_id)
-        combo_key = f"combo_{combo.id}"
-
-        if booking_key in cart and combo_key in cart[booking_key]:
-            cart[booking_key][combo_key]['quantity'] -= 1
-
-            if cart[booking_key][combo_key]['quantity'] <= 0:
-                del cart[booking_key][combo_key]
-
-            if not cart[booking_key]:
-                del cart[booking_key]
-
-            request.session['cart'] = cart
-            request.session.modified = True
+        if cart.get_quantity(CartLine.COMBO, combo.id):
+            cart.decrement(CartLine.COMBO, combo.id)
 
             messages.success(request, f"Se quitó una unidad de '{combo.name}' del carrito.")
 
@@ -325,39 +349,26 @@ class RemoveComboFromCartView(LoginRequiredMixin, View):
 
 class DecrementFromCartView(LoginRequiredMixin, View):
     def post(self, request, pk):
-        from menu_app.utils.cart import get_cart_products_by_booking
-
         product = get_object_or_404(Product, pk=pk)
-        booking_selected_id = request.session.get('booking_selected_id')
-
-        cart = request.session.get('cart', {})
-        booking_key = str(booking_selected_id)
-        product_key = str(product.id)
+        cart = get_selected_cart(request)
+        if cart is None:
+            return booking_required_response()
 
         product_quantity = None
         product_removed = False
         product_subtotal = 0
 
-        if booking_key in cart and product_key in cart[booking_key]:
-            cart[booking_key][product_key]['quantity'] -= 1
-
-            # Eliminar si la cantidad es 0 o menos
-            if cart[booking_key][product_key]['quantity'] <= 0:
-                del cart[booking_key][product_key]
+        if cart.get_quantity(CartLine.PRODUCT, product.id):
+            # La línea se elimina si la cantidad llega a 0
+            quantity = cart.decrement(CartLine.PRODUCT, product.id)
+            if quantity <= 0:
                 product_removed = True
             else:
-                product_quantity = cart[booking_key][product_key]['quantity']
-                product_subtotal = product_quantity * product.price
-
-            # Si ya no hay productos en la reserva, quitar la reserva del carrito
-            if not cart[booking_key]:
-                del cart[booking_key]
-
-            request.session['cart'] = cart
-            request.session.modified = True
+                product_quantity = quantity
+                product_subtotal = line_subtotal(product, product_quantity)
 
          # Recalcular el carrito actualizado
-        carrito_reserva, total_cart = get_cart_products_by_booking(request.session, booking_selected_id)
+        carrito_reserva, total_cart = cart.get_items()
         
         return JsonResponse({
             "success": True,
@@ -372,27 +383,14 @@ class DecrementFromCartView(LoginRequiredMixin, View):
 
 class DeleteFromCartView(LoginRequiredMixin, View):
     def post(self, request, pk):
-        from menu_app.utils.cart import get_cart_products_by_booking
-
         product = get_object_or_404(Product, pk=pk)
-        booking_selected_id = request.session.get('booking_selected_id')
-
-        cart = request.session.get('cart', {})
-        booking_key = str(booking_selected_id)
-        product_key = str(product.id)
-
-        if booking_key in cart and product_key in cart[booking_key]:
-            del cart[booking_key][product_key]
-
-            # Si ya no hay productos en la reserva, la quito del carrito
-            if not cart[booking_key]:
-                del cart[booking_key]
-
-            request.session['cart'] = cart
-            request.session.modified = True
+        cart = get_selected_cart(request)
+        if cart is None:
+            return booking_required_response()
+        cart.remove(CartLine.PRODUCT, product.id)
 
         # Recalcular el carrito
-        carrito_reserva, total_cart = get_cart_products_by_booking(request.session, booking_selected_id)
+        carrito_reserva, total_cart = cart.get_items()
 
         return JsonResponse({
             "success": True,
@@ -405,79 +403,53 @@ class DeleteFromCartView(LoginRequiredMixin, View):
 
 class ConfirmOrderView(LoginRequiredMixin, View):
     def post(self, request):
-        booking_selected_id = request.session.get('booking_selected_id')
-        if not booking_selected_id:
+        cart = get_selected_cart(request)
+        if cart is None:
             messages.warning(request, "Debe seleccionar una reserva para confirmar un pedido.")
             return redirect('make_order')
 
-        cart = request.session.get('cart', {})
-        booking_selected_cart = cart.get(str(booking_selected_id), {})
-
-        if not booking_selected_cart:
-            messages.warning(request, "El carrito está vacío.")
+        # Todo el pedido se crea en una sola transacción: o se guarda completo o nada
+        try:
+            with transaction.atomic():
+                # Las líneas se bloquean para que un doble envío no confirme el mismo carrito dos veces
+                cart_lines = cart.get_lines_with_items(for_update=True)
+
+                if not cart_lines:
+                    messages.warning(request, "El carrito está vacío.")
+                    return redirect('make_order')
+
+                # Los subtotales se calculan en memoria y el monto total se guarda con el INSERT del pedido
+                order_products, order_combos = [], []
+                subtotals, total = price_lines([(item, line.quantity) for line, item in cart_lines])
+                for (line, item), subtotal in zip(cart_lines, subtotals):
+                    if line.item_type == CartLine.COMBO:
+                        order_combos.append(OrderContainsCombo(combo=item, quantity=line.quantity, subtotal=subtotal))
+                    else:
+                        order_products.append(OrderContainsProduct(product=item, quantity=line.quantity, subtotal=subtotal))
+
+                reserve_stock({line.product.id: line.quantity for line in order_products})
+
+                order = Order.objects.create(
+                    user=request.user,
+                    booking_id=cart.booking_id,
+                    buyDate=now().date(),
+                    amount=total,
+                    state='S',
+                    stock_reserved=True
+                    # El código se generará automáticamente en el método save de Order
+                )
+                for order_line in order_products + order_combos:
+                    order_line.order = order
+                OrderContainsProduct.objects.bulk_create(order_products)
+                OrderContainsCombo.objects.bulk_create(order_combos)
+
+                # Limpiar el carrito para esa reserva
+                cart.clear()
+        except StockShortage as e:
+            for message in e.get_messages():
+                messages.error(request, message)
             return redirect('make_order')
 
-        # Crear la orden
-        booking_obj = get_object_or_404(Booking, id=booking_selected_id)
-        order = Order.objects.create(
-            user=request.user,
-            booking=booking_obj,
-            buyDate=now().date(),
-            amount=0.00,  # se inicializa en 0, se calculará después
-            state='S'
-            # El código se generará automáticamente en el método save de Order
-        )
-
-        total = 0
-        for item_key, data in booking_selected_cart.items():
-            quantity = data.get('quantity', 1)
-
-            if item_key.startswith('combo_'):
-                # Es un combo
-                try:
-                    combo_id = int(item_key.replace('combo_', ''))
-                    combo = get_object_or_404(Combo, id=combo_id)
-
-                    order_combo = OrderContainsCombo.objects.create(
-                        order=order,
-                        combo=combo,
-                        quantity=quantity,
-                    )
-
-                    order_combo.refresh_from_db()
-                    total += order_combo.subtotal
-
-                except (ValueError, Combo.DoesNotExist):
-                    continue  # Ignora si hay algún problema
-
-            else:
-                # Es un producto
-                try:
-                    product_id = int(item_key)
-                    product = get_object_or_404(Product, id=product_id)
-
-                    product.save()
-
-                    order_product = OrderContainsProduct.objects.create(
-                        order=order,
-                        product=product,
-                        quantity=quantity,
-                    )
-
-                    order_product.refresh_from_db()
-                    total += order_product.subtotal
-
-                except (ValueError, Product.DoesNotExist):
-                    continue
-
-        order.amount = total
-        order.save()
-
-        # Limpiar el carrito para esa reserva
-        cart.pop(str(booking_selected_id), None)
-        request.session['cart'] = cart
-        request.session.modified = True
-
         messages.success(request, f'Pedido confirmado. Código: {order.code}')
         return redirect('bookings_app:my_reservation')
     
@@ -485,95 +457,57 @@ class ConfirmOrderView(LoginRequiredMixin, View):
 class AddComboToOrderView(LoginRequiredMixin, View):
     MAX_COMBOS_PER_ORDER = 3
     def post(self, request, pk):
-        from menu_app.utils.cart import get_cart_products_by_booking
         combo = get_object_or_404(Combo, pk=pk)
-        booking_selected_id = request.session.get('booking_selected_id')
+        cart = get_selected_cart(request)
+        if cart is None:
+            return booking_required_response()
 
-        if not booking_selected_id:
-            return JsonResponse({
-                "success": False,
-                "message": "Seleccione primero una reserva."
-            }, status=400)
-
-        cart = request.session.get('cart', {})
-        booking_key = str(booking_selected_id)
-        combo_key = f"combo_{combo.id}"
-
-        # Obtener cantidad actual del combo en el carrito (si existe)
-        combo_quantity_cart = cart.get(booking_key, {}).get(combo_key, {}).get('quantity', 0)
-
-        # Verificar no pasarse del stock permitido por pedido
-        if (combo_quantity_cart + 1) > self.MAX_COMBOS_PER_ORDER:
+        # Sumar una unidad sin pasarse del máximo permitido por pedido
+        quantity = cart.increment(CartLine.COMBO, combo.id, limit=self.MAX_COMBOS_PER_ORDER)
+        if quantity is None:
             return JsonResponse({
                 "success": False,
                 "message": f'No puedes agregar más de {self.MAX_COMBOS_PER_ORDER} unidades de "{combo.name}" por pedido.'
             }, status=400)
 
-        # Actualizar el carrito de la sesión
-        cart.setdefault(booking_key, {}).setdefault(combo_key, {"quantity": 0})
-        cart[booking_key][combo_key]["quantity"] += 1
-
-        # Guardar cambios en la sesión
-        request.session['cart'] = cart
-        request.session.modified = True
-
         # Calculo el subtotal
-        if combo.on_promotion:
-            subtotal = combo.discounted_price * cart[booking_key][combo_key]["quantity"]
-        else:
-            subtotal = combo.price * cart[booking_key][combo_key]["quantity"]
+        subtotal = line_subtotal(combo, quantity)
 
         # Calcular el total carrito
-        items, total_cart = get_cart_products_by_booking(request.session, booking_selected_id)
+        items, total_cart = cart.get_items()
             
         
         return JsonResponse({
             "success": True,
             "message": f'Se agregó "{combo.name}" al pedido.',
             "product_id": combo.id,
-            "quantity": cart[booking_key][combo_key]["quantity"],
+            "quantity": quantity,
             "subtotal": subtotal,
             "total_cart": total_cart
         })
 
 class DecrementComboFromCartView(LoginRequiredMixin, View):
     def post(self, request, pk):
-        from menu_app.utils.cart import get_cart_products_by_booking
-
         combo = get_object_or_404(Combo, pk=pk)
-        booking_selected_id = request.session.get('booking_selected_id')
-
-        cart = request.session.get('cart', {})
-        booking_key = str(booking_selected_id)
-        combo_key = f"combo_{combo.id}"
+        cart = get_selected_cart(request)
+        if cart is None:
+            return booking_required_response()
 
         combo_quantity = None
         combo_removed = False
         combo_subtotal = 0
 
-        if booking_key in cart and combo_key in cart[booking_key]:
-            cart[booking_key][combo_key]['quantity'] -= 1
-
-            # Eliminar si la cantidad es 0 o menos
-            if cart[booking_key][combo_key]['quantity'] <= 0:
-                del cart[booking_key][combo_key]
+        if cart.get_quantity(CartLine.COMBO, combo.id):
+            # La línea se elimina si la cantidad llega a 0
+            quantity = cart.decrement(CartLine.COMBO, combo.id)
+            if quantity <= 0:
                 combo_removed = True
             else:
-                combo_quantity = cart[booking_key][combo_key]['quantity']
-                if combo.on_promotion:
-                    combo_subtotal = combo_quantity * combo.discounted_price
-                else:
-                    combo_subtotal = combo_quantity * combo.price
-
-            # Si ya no hay combos en la reserva, quitar la reserva del carrito
-            if not cart[booking_key]:
-                del cart[booking_key]
-
-            request.session['cart'] = cart
-            request.session.modified = True
+                combo_quantity = quantity
+                combo_subtotal = line_subtotal(combo, combo_quantity)
 
          # Recalcular el carrito actualizado
-        carrito_reserva, total_cart = get_cart_products_by_booking(request.session, booking_selected_id)
+        carrito_reserva, total_cart = cart.get_items()
         
         return JsonResponse({
             "success": True,
@@ -589,23 +523,12 @@ class DecrementComboFromCartView(LoginRequiredMixin, View):
 #Vistas para eliminar todos los producto o combo del carrito
 class RemoveProductFromCartView(LoginRequiredMixin, View):
     def post(self, request, pk):
-        booking_selected_id = request.session.get('booking_selected_id')
-        if not booking_selected_id:
+        cart = get_selected_cart(request)
+        if cart is None:
             return redirect('make_order')
 
-        cart = request.session.get('cart', {})
-        booking_key = str(booking_selected_id)
-        product_key = str(pk)
-
-        if booking_key in cart and product_key in cart[booking_key]:
-            del cart[booking_key][product_key]  # Eliminar todas las unidades del producto
-
-            # Si no queda nada en la reserva, la quitamos
-            if not cart[booking_key]:
-                del cart[booking_key]
-
-            request.session['cart'] = cart
-            request.session.modified = True
+        if cart.get_quantity(CartLine.PRODUCT, pk):
+            cart.remove(CartLine.PRODUCT, pk)  # Eliminar todas las unidades del producto
 
             messages.success(request, "Producto eliminado completamente del carrito.")
 
@@ -613,26 +536,14 @@ class RemoveProductFromCartView(LoginRequiredMixin, View):
 
 class RemoveComboAllFromCartView(LoginRequiredMixin, View):
     def post(self, request, pk):
-        from menu_app.utils.cart import get_cart_products_by_booking
-        
         combo = get_object_or_404(Combo, pk=pk)
-        booking_selected_id = request.session.get('booking_selected_id')
-
-        cart = request.session.get('cart', {})
-        booking_key = str(booking_selected_id)
-        combo_key = f"combo_{combo.id}"
-
-        if booking_key in cart and combo_key in cart[booking_key]:
-            del cart[booking_key][combo_key]  # Eliminar todas las unidades del combo
-
-            if not cart[booking_key]:
-                del cart[booking_key]
-
-            request.session['cart'] = cart
-            request.session.modified = True
+        cart = get_selected_cart(request)
+        if cart is None:
+            return booking_required_response()
+        cart.remove(CartLine.COMBO, combo.id)  # Eliminar todas las unidades del combo
 
          # Recalcular el carrito
-        carrito_reserva, total_cart = get_cart_products_by_booking(request.session, booking_selected_id)
+        carrito_reserva, total_cart = cart.get_items()
 
         return JsonResponse({
             "success": True,
@@ -640,4 +551,97 @@ class RemoveComboAllFromCartView(LoginRequiredMixin, View):
             "product_id": combo.id,
             "total_cart": total_cart,
             "cart_empty": len(carrito_reserva) == 0
-        })
\ No newline at end of file
+        })
+
+
+class UpdateCartView(LoginRequiredMixin, View):
+    """Aplica varios cambios al carrito en un solo request.
+
+    Recibe ``{"changes": [{"type": "product"|"combo", "id": 1, "delta": 2}, ...]}``;
+    los cambios se aplican todos o ninguno, respetando los mismos límites que
+    AddToOrderView y AddComboToOrderView.
+    """
+    MAX_CHANGES = 50
+
+    def error(self, message, status=400, cart=None):
+        data = {"success": False, "message": message}
+        if cart is not None:
+            # El estado real del carrito, para que la página deshaga lo que mostró de antemano
+            data.update(self.cart_data(cart))
+        return JsonResponse(data, status=status)
+
+    @staticmethod
+    def cart_data(cart):
+        carrito_reserva, total_cart = cart.get_items()
+        return {
+            "lines": [
+                {
+                    "type": line['type'],
+                    "id": line['item'].id,
+                    "quantity": line['quantity'],
+                    "subtotal": line['subtotal'],
+                }
+                for line in carrito_reserva
+            ],
+            "total_cart": total_cart,
+            "cart_empty": len(carrito_reserva) == 0
+        }
+
+    def parse_changes(self, request):
+        try:
+            changes = json.loads(request.body or b'{}').get('changes')
+        except (ValueError, AttributeError):
+            return None
+        if not isinstance(changes, list) or not 0 < len(changes) <= self.MAX_CHANGES:
+            return None
+
+        deltas = {}
+        for change in changes:
+            if not isinstance(change, dict):
+                return None
+            item_type, item_id, delta = change.get('type'), change.get('id'), change.get('delta')
+            if item_type not in (CartLine.PRODUCT, CartLine.COMBO):
+                return None
+            if not isinstance(item_id, int) or not isinstance(delta, int) or isinstance(delta, bool):
+                return None
+            deltas[(item_type, item_id)] = deltas.get((item_type, item_id), 0) + delta
+        return deltas
+
+    def post(self, request):
+        cart = get_selected_cart(request)
+        if cart is None:
+            return self.error("Seleccione primero una reserva.")
+
+        deltas = self.parse_changes(request)
+        if deltas is None:
+            return self.error("Cambios inválidos.")
+
+        ids = {CartLine.PRODUCT: [], CartLine.COMBO: []}
+        for item_type, item_id in deltas:
+            ids[item_type].append(item_id)
+        products = Product.objects.only('id', 'name', 'quantity').in_bulk(ids[CartLine.PRODUCT])
+        combos = Combo.objects.only('id', 'name').in_bulk(ids[CartLine.COMBO])
+        if len(products) + len(combos) != len(deltas):
+            return self.error("Alguno de los ítems no existe.", status=404, cart=cart)
+
+        items = {(CartLine.PRODUCT, pk): item for pk, item in products.items()}
+        items.update({(CartLine.COMBO, pk): item for pk, item in combos.items()})
+        limits = {
+            (CartLine.PRODUCT, pk): product.quantity for pk, product in products.items()
+        }
+        limits.update({
+            (CartLine.COMBO, pk): AddComboToOrderView.MAX_COMBOS_PER_ORDER for pk in combos
+        })
+
+        try:
+            cart.apply_deltas(deltas, limits)
+        except CartLimitExceeded as e:
+            item = items[(e.item_type, e.item_id)]
+            return self.error(
+                f'No puedes agregar más de {e.limit} unidades de "{item.name}" por pedido.', cart=cart
+            )
+        except IntegrityError:
+            # Ni el reintento pudo aplicar los cambios (por ejemplo, la reserva se borró en el medio)
+            return self.error("No se pudo actualizar el pedido, intente nuevamente.", status=409)
+
+        return JsonResponse({"success": True, **self.cart_data(cart)})
@@ -3,6 +3,9 @@ ASGI config for restaurante project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Las vistas async (por ejemplo el stream de reservas, bookings_app.views.ReservationEventsView)
+solo liberan el worker mientras esperan cuando la app se sirve por acá.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
@@ -0,0 +1,96 @@
+import hashlib
+import hmac
+import itertools
+import secrets
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+CODE_EPOCH = 1704067200  # 2024-01-01 UTC
+TIME_BITS = 28  # segundos desde CODE_EPOCH: ~8 años antes de dar la vuelta
+FEISTEL_ROUNDS = 4
+
+
+class CodeGenerator:
+    """Genera códigos únicos sin consultar la base.
+
+    Cada código sale de (segundos desde CODE_EPOCH, contador del proceso), que no
+    se repite dentro de un proceso; el contador arranca en un valor al azar para
+    que dos procesos casi nunca coincidan. Ese valor pasa por una permutación de
+    Feistel con clave derivada de SECRET_KEY: la permutación es biyectiva (no agrega
+    colisiones) y hace que los códigos no sean secuenciales ni adivinables.
+    Ante una colisión entre procesos, el unique de la columna es la red de seguridad
+    (ver UniqueCodeMixin).
+    """
+
+    def __init__(self, namespace, alphabet, length, prefix=''):
+        self.namespace = namespace
+        self.alphabet = alphabet
+        self.length = length
+        self.prefix = prefix
+        # Bits que entran en ``length`` caracteres del alfabeto (par, para una Feistel balanceada)
+        bits = (len(alphabet) ** length).bit_length() - 1
+        self.bits = bits - bits % 2
+        self.counter_bits = self.bits - TIME_BITS
+        self._counter = itertools.count(secrets.randbelow(1 << self.counter_bits))
+        self._lock = threading.Lock()
+
+    def _key(self):
+        return hashlib.sha256(f'{self.namespace}:{settings.SECRET_KEY}'.encode()).digest()
+
+    def _round(self, key, round_number, half):
+        digest = hmac.new(key, f'{round_number}:{half}'.encode(), hashlib.sha256).digest()
+        return int.from_bytes(digest[:8], 'big') & ((1 << self.bits // 2) - 1)
+
+    def permute(self, value):
+        half_bits = self.bits // 2
+        mask = (1 << half_bits) - 1
+        left, right = value >> half_bits, value & mask
+        key = self._key()
+        for round_number in range(FEISTEL_ROUNDS):
+            left, right = right, left ^ self._round(key, round_number, right)
+        return (left << half_bits) | right
+
+    def encode(self, value):
+        base = len(self.alphabet)
+        chars = []
+        for _ in range(self.length):
+            value, digit = divmod(value, base)
+            chars.append(self.alphabet[digit])
+        return self.prefix + ''.join(reversed(chars))
+
+    def next_value(self):
+        with self._lock:
+            counter = next(self._counter) & ((1 << self.counter_bits) - 1)
+        seconds = (int(time.time()) - CODE_EPOCH) & ((1 << TIME_BITS) - 1)
+        return (seconds << self.counter_bits) | counter
+
+    def generate(self):
+        return self.encode(self.permute(self.next_value()))
+
+
+class UniqueCodeMixin:
+    """Completa ``code`` con ``code_generator`` al crear y reintenta si el unique del código lo rechaza.
+
+    Cualquier otro IntegrityError se propaga sin reintentar.
+    """
+    code_generator = None
+    code_attempts = 3
+
+    def save(self, *args, **kwargs):
+        if self.code:
+            return super().save(*args, **kwargs)
+
+        for attempt in range(self.code_attempts):
+            self.code = self.code_generator.generate()
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                # Solo es una colisión si el código ya está guardado; el savepoint deja usable la transacción
+                collision = type(self)._default_manager.filter(code=self.code).exists()
+                self.code = ''
+                if not collision or attempt == self.code_attempts - 1:
+                    raise
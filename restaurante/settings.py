@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     'accounts_app',
     'bookings_app',
     'menu_app',
+    'api_app',
     'jazzmin',
     'django.contrib.admin',
     'django.contrib.auth',
@@ -102,6 +103,18 @@ DATABASES = {
 }
 
 
+# Cache (fragmentos del menú, versiones, etc.)
+# LocMemCache es por proceso: con varios workers usar un backend compartido (Redis/Memcached)
+# para que la invalidación de una versión llegue a todos.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'restaurante',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -11,5 +11,6 @@ urlpatterns = [
     path('delete-from-cart/<int:pk>/', DeleteFromCartView.as_view(), name='delete_from_cart'),
     path('confirm-order/', ConfirmOrderView.as_view(), name='confirm_order'),
     path("accounts/", include("accounts_app.urls", namespace="accounts_app")),
-    path("bookings/", include("bookings_app.urls", namespace="bookings_app"))
+    path("bookings/", include("bookings_app.urls", namespace="bookings_app")),
+    path("api/v1/", include("api_app.urls", namespace="api_app")),
 ]